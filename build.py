@@ -12,9 +12,6 @@ from pathlib import Path
 import traceback
 import tempfile
 
-# 全局变量
-fake_ua_static_data = None  # 用于存储fake_useragent静态数据目录路径
-
 def check_pyinstaller():
     """检查PyInstaller是否已安装"""
     if importlib.util.find_spec("PyInstaller") is None:
@@ -56,7 +53,7 @@ def check_dependencies():
     """检查依赖项"""
     print("\n检查依赖项...")
     
-    required_packages = ["PyQt5", "requests", "lxml", "bs4", "fake_useragent", "pycryptodome"]
+    required_packages = ["PyQt5", "requests", "lxml", "bs4", "pycryptodome"]
     missing_packages = []
     
     for package in required_packages:
@@ -152,72 +149,6 @@ def collect_pyqt_files():
         print(f"收集PyQt5文件时出错: {e}")
         return None
 
-def prepare_fake_useragent_data():
-    """准备fake_useragent数据目录"""
-    print("\n准备fake_useragent数据目录...")
-    
-    try:
-        from fake_useragent import UserAgent
-        ua = UserAgent()
-        print(f"fake_useragent初始化成功，示例UA: {ua.chrome[:30]}...")
-        
-        # 获取fake_useragent数据文件位置
-        import fake_useragent
-        fake_ua_dir = os.path.dirname(fake_useragent.__file__)
-        fake_ua_data = os.path.join(fake_ua_dir, "data", "browsers.json")
-        
-        global fake_ua_static_data
-        if os.path.exists(fake_ua_data):
-            fake_ua_static_data = os.path.dirname(fake_ua_data)
-            print(f"找到fake_useragent数据文件: {fake_ua_static_data}")
-        else:
-            # 如果未找到，创建静态数据
-            print("未找到fake_useragent数据文件，将使用在线模式")
-            fake_ua_static_data = None
-        
-        return True
-    except Exception as e:
-        print(f"准备fake_useragent数据时出错: {e}")
-        fake_ua_static_data = None
-        return False
-
-def create_static_browsers_json_content(file_path):
-    """创建一个静态的browsers.json文件内容"""
-    print(f"创建静态browsers.json: {file_path}")
-    
-    # 一个简单的browsers.json内容
-    browsers_data = """{
-    "browsers": {
-        "chrome": [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-        ],
-        "firefox": [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/115.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/115.0"
-        ],
-        "edge": [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36 Edg/122.0.0.0"
-        ],
-        "safari": [
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.3 Safari/605.1.15"
-        ]
-    },
-    "randomize": {
-        "chrome": 90,
-        "firefox": 5,
-        "edge": 3,
-        "safari": 2
-    }
-}"""
-    
-    # 写入静态文件
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(browsers_data)
-    
-    print(f"已创建静态browsers.json文件: {file_path}")
-
 def build_executable():
     """构建可执行文件"""
     start_time = time.time()
@@ -234,9 +165,6 @@ def build_executable():
     # 检查依赖项
     check_dependencies()
     
-    # 预先准备fake_useragent数据目录
-    prepare_fake_useragent_data()
-    
     print("\n开始配置PyInstaller命令...")
     
     # 准备命令
@@ -265,12 +193,12 @@ def build_executable():
     for module in essential_imports:
         cmd.extend(["--hidden-import", module])
     
-    # 添加fake_useragent数据文件
-    try:
-        if fake_ua_static_data and os.path.exists(fake_ua_static_data):
-            cmd.extend(["--add-data", f"{fake_ua_static_data}{os.pathsep}fake_useragent{os.sep}data"])
-    except Exception as e:
-        print(f"添加fake_useragent数据失败: {e}")
+    # 添加内置的User-Agent列表
+    ua_file = os.path.join("src", "api", "user_agents.txt")
+    if os.path.exists(ua_file):
+        cmd.extend(["--add-data", f"{ua_file}{os.pathsep}{os.path.join('src', 'api')}"])
+    else:
+        print("警告: 未找到User-Agent列表文件，将使用内置的默认值")
     
     # 添加PyQt5数据文件
     try:
@@ -7,10 +7,14 @@ import time
 import traceback
 import platform
 from datetime import datetime
+# 启动耗时统计需在导入PyQt5之前开始
+from src.utils.startup_profiler import startup_profiler
 from PyQt5.QtWidgets import QApplication, QMessageBox
-from PyQt5.QtCore import QCoreApplication
+from PyQt5.QtCore import QCoreApplication, QTimer
+startup_profiler.mark('导入PyQt5')
 from src.ui.main_window import MainWindow
 from src.utils.tools import Tools
+startup_profiler.mark('导入主窗口模块')
 
 # 设置应用程序信息
 APP_NAME = "音乐下载器"
@@ -84,6 +88,7 @@ if __name__ == "__main__":
         # 启动应用程序
         app = QApplication(sys.argv)
         app.setStyle('Fusion')
+        startup_profiler.mark('创建QApplication')
         
         # 初始化下载目录
         default_download_path = Tools.get_default_download_path()
@@ -94,6 +99,15 @@ if __name__ == "__main__":
         
         print("正在显示主窗口...")
         window.show()
+        startup_profiler.mark('显示主窗口')
+        
+        # 事件循环开始处理事件时窗口即可响应操作，此时输出启动耗时
+        def on_interactive():
+            # 启动耗时测试模式下记录完成后退出
+            if startup_profiler.finish():
+                app.quit()
+        
+        QTimer.singleShot(0, on_interactive)
         
         print("====== 程序已启动 ======")
         sys.exit(app.exec_())
@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""命令行入口: python -m src"""
+
+import sys
+
+from src.cli import main
+
+
+if __name__ == '__main__':
+    sys.exit(main())
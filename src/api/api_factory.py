@@ -1,37 +1,64 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import threading
+
+from src.api.base_api import MusicAPI
 from src.api.netease_api import NeteaseAPI
 from src.api.gdmusic_api import GDMusicAPI
 
 
 class APIFactory:
-    """API工厂类，用于获取不同平台的API实例"""
+    """API工厂类，用于获取不同平台的API实例，实例在第一次使用时才创建，所有实例共用同一个传输层"""
     
-    def __init__(self):
+    def __init__(self, transport=None):
+        """
+        :param transport: 所有API实例使用的传输层，不指定则使用默认的共享传输层
+        """
+        self.transport = transport or MusicAPI.transport
         self._apis = {}
-        self._init_apis()
+        self._lock = threading.RLock()
+        self._creators = {
+            '网易云音乐': self._create_netease_api,
+            'GD音乐': self._create_gdmusic_api,
+        }
+    
+    def _create_netease_api(self):
+        """创建网易云音乐API，GD音乐API已创建时共用其备选实例"""
+        gdmusic_api = self._apis.get('GD音乐')
+        if gdmusic_api is not None:
+            return gdmusic_api.netease_api
+        return NeteaseAPI(self.transport)
+    
+    def _create_gdmusic_api(self):
+        """创建GD音乐API，网易云音乐API已创建时用作其备选"""
+        return GDMusicAPI(self._apis.get('网易云音乐'), self.transport)
     
-    def _init_apis(self):
-        """初始化所有支持的API"""
-        self._apis['网易云音乐'] = NeteaseAPI()
-        self._apis['GD音乐'] = GDMusicAPI()
-        
     def get_api(self, name):
         """
         获取指定平台的API实例
         :param name: 平台名称
         :return: API实例
         """
-        return self._apis.get(name)
+        api = self._apis.get(name)
+        if api is not None:
+            return api
+        
+        creator = self._creators.get(name)
+        if creator is None:
+            return None
+        with self._lock:
+            if name not in self._apis:
+                self._apis[name] = creator()
+            return self._apis[name]
     
     def get_all_apis(self):
         """
-        获取所有支持的API实例
+        获取所有支持的API实例（尚未创建的会在此时创建）
         :return: API实例字典
         """
-        return self._apis
+        return {name: self.get_api(name) for name in self._creators}
     
     def get_api_names(self):
         """获取支持的API名称列表"""
-        return ['GD音乐', '网易云音乐'] 
\ No newline at end of file
+        return ['GD音乐', '网易云音乐']
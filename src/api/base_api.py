@@ -1,93 +1,204 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import time
 import requests
-import random
+import contextlib
 import traceback
-from fake_useragent import UserAgent
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from abc import ABC, abstractmethod
 
+from src.api.url_cache import URLCache
+from src.api.search_cache import SearchCache
+from src.api.endpoint_health import EndpointHealth
+from src.api.rate_limiter import RateLimiter
+from src.api.transport import Transport
+from src.api.user_agent_pool import UserAgentPool
+from src.utils.downloader import Downloader
+from src.utils.retry_policy import RetryPolicy
+from src.utils.library_index import LibraryIndex
+from src.utils.audio_verifier import AudioVerifier
+
 
 class MusicAPI(ABC):
     """音乐搜索API基类"""
     
-    # 预定义的可靠User-Agent
-    DEFAULT_USER_AGENTS = [
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/119.0',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    ]
+    # 所有API实例共享的链接解析缓存
+    url_cache = URLCache()
+    # 所有API实例共享的搜索结果缓存
+    search_cache = SearchCache()
+    # 所有API实例共享的接口健康状况统计
+    endpoint_health = EndpointHealth()
+    # 所有API实例共享的按主机限速器
+    rate_limiter = RateLimiter()
+    # 所有API实例共享的重试策略（含全局重试预算）
+    retry_policy = RetryPolicy()
+    # 所有API实例共享的本地曲库索引，下载完成时按内容哈希去重
+    library_index = LibraryIndex()
+    # 所有API实例共享的User-Agent池，创建和刷新会话时不再加载数据
+    user_agents = UserAgentPool()
+    # 所有API实例共享的传输层（按主机的连接池），可在创建实例时指定其他传输层
+    transport = Transport(rate_limiter, user_agents)
+    
+    # 多页搜索时同时请求的页数
+    SEARCH_PAGE_CONCURRENCY = 3
+    # 多页搜索最多获取的页数
+    SEARCH_MAX_PAGES = 50
+    
+    # 子类的额外请求头，每次创建会话（包括刷新会话）时应用
+    SESSION_HEADERS = {}
+    # 预热连接时使用的接口地址属性
+    WARM_UP_URL_ATTRS = ('api_url', 'search_url', 'song_url_api')
+    
+    def __init__(self, transport=None):
+        """
+        :param transport: 使用的传输层，不指定则使用所有API实例共享的传输层
+        """
+        if transport is not None:
+            self.transport = transport
+        # 请求会话在第一次使用时才创建，启动时不建立连接池
+        self._session = None
+        self._session_lock = threading.Lock()
     
-    def __init__(self):
-        self.session = self._create_session()
+    @property
+    def session(self):
+        """请求会话，第一次访问时创建"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+    
+    @session.setter
+    def session(self, session):
+        self._session = session
     
     def _create_session(self):
-        """创建并配置请求会话"""
-        session = requests.Session()
-        
-        # 尝试使用fake_useragent，失败则使用预定义的User-Agent
-        try:
-            ua = UserAgent().random
-        except Exception as e:
-            print(f"获取随机User-Agent失败: {e}，使用默认值")
-            ua = random.choice(self.DEFAULT_USER_AGENTS)
-        
-        # 设置基本请求头
-        session.headers.update({
-            'User-Agent': ua,
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.8,en-US;q=0.5,en;q=0.3',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        })
-        
-        # 配置安全选项
-        session.verify = True  # 启用SSL证书验证
-        
-        # 配置重试策略
-        adapter = requests.adapters.HTTPAdapter(
-            max_retries=3,
-            pool_connections=10,
-            pool_maxsize=10
-        )
-        session.mount('http://', adapter)
-        session.mount('https://', adapter)
-        
-        return session
+        """
+        创建请求会话，连接池由共享的传输层提供，会话只持有本后端的请求头配置和Cookie
+        子类未在SESSION_HEADERS中指定User-Agent时，每个请求按主机从共享的User-Agent池中选取
+        """
+        return self.transport.create_session(self.SESSION_HEADERS)
     
-    def _refresh_session(self):
-        """刷新会话，用于处理会话失效的情况"""
-        old_cookies = self.session.cookies.copy()
-        self.session = self._create_session()
-        self.session.cookies.update(old_cookies)
+    def _refresh_session(self, url=None):
+        """
+        刷新会话，用于处理会话失效的情况
+        指定链接时原地刷新：只更换该主机的User-Agent，连接池和Cookie保持不变
+        （出错的连接已由urllib3关闭并丢弃，到该主机和其他主机的其余连接继续复用）；
+        不指定时重建整个会话（只保留Cookie）
+        :param url: 出错的请求链接
+        """
+        if url is None or self._session is None:
+            old_cookies = self.session.cookies.copy()
+            self.session = self._create_session()
+            self.session.cookies.update(old_cookies)
+            return self.session
+        
+        host = urlparse(url).netloc
+        if 'User-Agent' not in self.session.headers:
+            self.user_agents.rotate(host)
+            print(f"已更换请求 {host} 使用的User-Agent")
         return self.session
     
+    def get_warm_up_urls(self):
+        """
+        获取需要预热连接的链接：本后端的接口地址和之前下载过的主机
+        :return: 链接列表
+        """
+        urls = [getattr(self, attr) for attr in self.WARM_UP_URL_ATTRS if getattr(self, attr, None)]
+        return urls + self.transport.learned_urls()
+    
+    def warm_up(self):
+        """
+        预热到接口和下载主机的连接，之后的第一个请求不再等待DNS解析、TCP连接和TLS握手
+        会阻塞到预热完成，应在后台线程中调用
+        :return: 成功预热的主机数
+        """
+        return self.transport.warm_up(self.session, self.get_warm_up_urls())
+    
     def _safe_request(self, method, url, **kwargs):
-        """安全的请求封装，处理异常和重试"""
-        max_retries = kwargs.pop('max_retries', 3)
+        """
+        安全的请求封装，按重试策略处理异常和重试（指数退避、随机抖动、Retry-After、全局重试预算）
+        只有连接错误、超时、429和5xx会重试，其他错误直接抛出
+        """
+        max_retries = kwargs.pop('max_retries', self.retry_policy.max_attempts)
         timeout = kwargs.pop('timeout', 15)
         
         # 确保有超时设置
         if 'timeout' not in kwargs:
             kwargs['timeout'] = timeout
-            
-        for retry in range(max_retries):
+        
+        attempt = 0
+        while True:
+            attempt += 1
+            self.retry_policy.record_request()
             try:
                 response = self.session.request(method, url, **kwargs)
                 response.raise_for_status()
                 return response
             except requests.exceptions.RequestException as e:
-                print(f"请求失败 ({retry+1}/{max_retries}): {e}")
-                if retry == max_retries - 1:  # 最后一次重试
+                print(f"请求失败 ({attempt}/{max_retries}): {e}")
+                delay = self.retry_policy.next_delay(attempt, e, max_retries)
+                if delay is None:
                     print(f"请求最终失败: {url}")
                     raise
                 
                 # 遇到特定错误时刷新会话
                 if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.TooManyRedirects)):
-                    self._refresh_session()
-                    
-        return None  # 不应该到达这里
+                    self._refresh_session(url)
+                
+                time.sleep(delay)
+    
+    def _probe_url(self, url, timeout=10, headers=None):
+        """
+        探测链接的文件大小和类型，同一链接在有效期内只发送一次HEAD请求
+        :param url: 下载链接
+        :param timeout: 超时时间
+        :param headers: 额外的请求头
+        :return: ResolvedURL，请求失败返回None
+        """
+        info = self.url_cache.get_url_info(url)
+        if info is not None:
+            return info
+        
+        try:
+            head_resp = self.session.head(url, headers=headers, allow_redirects=True, timeout=timeout)
+            content_length = int(head_resp.headers.get('Content-Length', 0))
+            content_type = head_resp.headers.get('Content-Type', '')
+            if head_resp.status_code >= 400:
+                print(f"探测链接返回错误状态: {head_resp.status_code}")
+                content_length = 0
+        except Exception as e:
+            print(f"探测链接出错: {e}")
+            return None
+        
+        return self.url_cache.put_url_info(url, content_length, content_type)
+    
+    def _download_file(self, url, save_path, headers=None, timeout=30, progress_callback=None, is_cancelled=None,
+                       expected_duration=None, host_slot=None):
+        """
+        下载文件，支持断点续传；下载时校验音频格式和时长，并计算内容哈希，与曲库中已有的相同文件去重
+        :param url: 下载链接
+        :param save_path: 保存路径
+        :param headers: 额外的请求头
+        :param timeout: 超时时间
+        :param progress_callback: 进度回调 (已下载字节数, 总字节数)
+        :param is_cancelled: 返回是否已取消的函数
+        :param expected_duration: 歌曲时长（秒），用于识别试听片段和不完整的文件
+        :param host_slot: 按下载链接返回上下文管理器的函数，传输期间占用该主机的下载名额
+        :return: 文件大小（字节）
+        :raises InvalidAudio: 下载的内容不是有效的音频
+        """
+        self.transport.remember_host(url)
+        downloader = Downloader(self.session, retry_policy=self.retry_policy)
+        with host_slot(url) if host_slot else contextlib.nullcontext():
+            size = downloader.download(url, save_path, headers=headers, timeout=timeout,
+                                       progress_callback=progress_callback, is_cancelled=is_cancelled,
+                                       verifier=AudioVerifier(expected_duration))
+        self.library_index.deduplicate(save_path, downloader.content_hash)
+        return size
     
     @abstractmethod
     def search(self, keyword, page=1, page_size=20):
@@ -100,21 +211,105 @@ class MusicAPI(ABC):
         """
         pass
     
+    def fetch_page(self, keyword, page, page_size=30):
+        """
+        获取指定页的搜索结果，不修改实例上的翻页状态，可在多个线程中同时调用
+        子类未实现时直接调用search
+        :param keyword: 搜索关键词
+        :param page: 页码
+        :param page_size: 每页数量
+        :return: 搜索结果列表
+        """
+        return self.search(keyword, page, page_size)
+    
+    def search_pages(self, keyword, max_pages=None, page_size=30, on_page=None, is_cancelled=None):
+        """
+        并发获取多页搜索结果，按页码顺序合并并去重
+        某一页结果不足一页、没有新的歌曲或请求失败时，视为已没有更多结果
+        :param keyword: 搜索关键词
+        :param max_pages: 最多获取的页数，None表示获取到没有更多结果为止（不超过SEARCH_MAX_PAGES）
+        :param page_size: 每页数量
+        :param on_page: 每合并一页调用一次 (页码, 该页新增的歌曲列表)
+        :param is_cancelled: 返回是否已取消的函数
+        :return: 合并后的歌曲列表
+        """
+        last_page = min(max_pages or self.SEARCH_MAX_PAGES, self.SEARCH_MAX_PAGES)
+        merged = []
+        seen = set()
+        # 已返回但还不能按顺序合并的页: 页码 -> 结果
+        fetched = {}
+        next_page = 1
+        next_merge = 1
+        
+        executor = ThreadPoolExecutor(max_workers=self.SEARCH_PAGE_CONCURRENCY)
+        pending = {}
+        try:
+            while True:
+                cancelled = is_cancelled and is_cancelled()
+                while not cancelled and next_page <= last_page and len(pending) < self.SEARCH_PAGE_CONCURRENCY:
+                    pending[executor.submit(self.fetch_page, keyword, next_page, page_size)] = next_page
+                    next_page += 1
+                if cancelled or not pending:
+                    break
+                
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = pending.pop(future)
+                    try:
+                        result = future.result() or []
+                    except Exception as e:
+                        print(f"获取第{page}页出错: {e}")
+                        result = []
+                    fetched[page] = result
+                    if len(result) < page_size:
+                        last_page = min(last_page, page)
+                
+                # 按页码顺序合并，保证结果顺序与逐页浏览一致
+                while next_merge <= last_page and next_merge in fetched:
+                    result = fetched.pop(next_merge)
+                    new_songs = []
+                    for song in result:
+                        key = (song.get('source'), str(song.get('id')))
+                        if key not in seen:
+                            seen.add(key)
+                            new_songs.append(song)
+                    if result and not new_songs:
+                        # 接口重复返回已有的结果
+                        last_page = next_merge
+                    merged.extend(new_songs)
+                    if on_page and new_songs:
+                        on_page(next_merge, new_songs)
+                    next_merge += 1
+        finally:
+            # 超出最后一页的请求不再需要
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+        
+        print(f"多页搜索完成: {keyword}，共 {next_merge - 1} 页，{len(merged)} 首歌曲")
+        return merged
+    
     @abstractmethod
-    def get_song_url(self, song_id):
+    def get_song_url(self, song_id, duration=None):
         """
         获取歌曲下载链接
         :param song_id: 歌曲ID
+        :param duration: 歌曲时长（秒），已知时按时长检查文件大小，识别试听片段
         :return: 歌曲下载链接
         """
         pass
     
     @abstractmethod
-    def download(self, song_id, save_path):
+    def download(self, song_id, save_path, progress_callback=None, duration=None, is_cancelled=None,
+                 host_slot=None):
         """
         下载歌曲
         :param song_id: 歌曲ID
         :param save_path: 保存路径
+        :param progress_callback: 进度回调 (已下载字节数, 总字节数)
+        :param duration: 歌曲时长（秒），未知时为None
+        :param is_cancelled: 返回是否已取消的函数，取消时抛出DownloadCancelled（已下载的部分保留，下次继续）
+        :param host_slot: 按下载链接返回上下文管理器的函数，由调度器用于限制每个下载主机的并发传输数
         :return: 保存路径
         """
         pass
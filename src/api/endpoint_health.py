@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+from collections import deque
+
+
+class CircuitBreaker:
+    """
+    熔断器
+    统计最近一段时间内请求的错误率，错误率过高或连续失败时断开（open），
+    断开期间直接拒绝请求；等待一段时间后进入半开（half_open）状态，只放行一个探测请求，
+    探测成功则恢复（closed），失败则再次断开，断开时长随连续断开次数倍增
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    # 统计错误率的时间窗口（秒）
+    WINDOW = 60
+    # 窗口内至少有多少次请求才按错误率判断
+    MIN_REQUESTS = 5
+    ERROR_RATE_THRESHOLD = 0.5
+    # 连续失败多少次直接断开
+    CONSECUTIVE_FAILURES = 3
+    # 断开时长（秒），每次连续断开翻倍，不超过上限
+    OPEN_DURATION = 30
+    MAX_OPEN_DURATION = 10 * 60
+    # 半开状态下探测请求的最长等待时间，超时视为探测结束
+    PROBE_TIMEOUT = 60
+
+    def __init__(self, name):
+        self.name = name
+        self._state = self.CLOSED
+        self._outcomes = deque()
+        self._consecutive_failures = 0
+        self._trip_count = 0
+        self._opened_at = 0
+        self._open_duration = self.OPEN_DURATION
+        self._probe_started = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._update_state(time.time())
+
+    def _update_state(self, now):
+        """断开时间结束后转为半开（调用方需持有锁）"""
+        if self._state == self.OPEN and now - self._opened_at >= self._open_duration:
+            self._state = self.HALF_OPEN
+            self._probe_started = None
+            print(f"熔断器 {self.name} 进入半开状态，允许探测请求")
+        if self._state == self.HALF_OPEN and self._probe_started is not None \
+                and now - self._probe_started >= self.PROBE_TIMEOUT:
+            # 探测请求没有报告结果，允许重新探测
+            self._probe_started = None
+        return self._state
+
+    def is_available(self):
+        """是否可以发送请求（不占用半开状态的探测名额）"""
+        with self._lock:
+            state = self._update_state(time.time())
+            return state == self.CLOSED or (state == self.HALF_OPEN and self._probe_started is None)
+
+    def allow_request(self):
+        """
+        申请发送请求，半开状态下只有第一个请求获得探测名额
+        :return: 是否允许发送
+        """
+        now = time.time()
+        with self._lock:
+            state = self._update_state(now)
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and self._probe_started is None:
+                self._probe_started = now
+                return True
+            return False
+
+    def release(self):
+        """交还半开状态下获得的探测名额（获得许可后没有发送请求时调用）"""
+        with self._lock:
+            if self._update_state(time.time()) == self.HALF_OPEN:
+                self._probe_started = None
+
+    def record_success(self):
+        """记录一次成功的请求"""
+        now = time.time()
+        with self._lock:
+            self._consecutive_failures = 0
+            if self._update_state(now) != self.CLOSED:
+                print(f"熔断器 {self.name} 探测成功，恢复正常")
+                self._state = self.CLOSED
+                self._outcomes.clear()
+                self._trip_count = 0
+                self._probe_started = None
+            self._add_outcome(now, True)
+
+    def record_failure(self):
+        """记录一次失败的请求"""
+        now = time.time()
+        with self._lock:
+            self._consecutive_failures += 1
+            state = self._update_state(now)
+            if state == self.HALF_OPEN:
+                self._trip(now, "探测失败")
+                return
+            if state == self.OPEN:
+                return
+
+            self._add_outcome(now, False)
+            if self._consecutive_failures >= self.CONSECUTIVE_FAILURES:
+                self._trip(now, f"连续失败 {self._consecutive_failures} 次")
+            elif len(self._outcomes) >= self.MIN_REQUESTS and self._error_rate() >= self.ERROR_RATE_THRESHOLD:
+                self._trip(now, f"错误率 {self._error_rate():.0%}")
+
+    def _add_outcome(self, now, ok):
+        """记录请求结果并清理窗口外的记录（调用方需持有锁）"""
+        self._outcomes.append((now, ok))
+        while self._outcomes and now - self._outcomes[0][0] > self.WINDOW:
+            self._outcomes.popleft()
+
+    def _error_rate(self):
+        """窗口内的错误率（调用方需持有锁）"""
+        if not self._outcomes:
+            return 0.0
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return failures / len(self._outcomes)
+
+    def _trip(self, now, reason):
+        """断开熔断器（调用方需持有锁）"""
+        self._open_duration = min(self.MAX_OPEN_DURATION, self.OPEN_DURATION * (2 ** self._trip_count))
+        self._trip_count += 1
+        self._state = self.OPEN
+        self._opened_at = now
+        self._probe_started = None
+        print(f"熔断器 {self.name} 断开 ({reason})，{self._open_duration} 秒内跳过该接口")
+
+    def get_state(self):
+        """
+        获取熔断器状态
+        :return: 状态字典
+        """
+        now = time.time()
+        with self._lock:
+            state = self._update_state(now)
+            open_for = self._open_duration - (now - self._opened_at) if state == self.OPEN else 0
+            return {
+                'state': state,
+                'error_rate': self._error_rate(),
+                'requests_in_window': len(self._outcomes),
+                'consecutive_failures': self._consecutive_failures,
+                'open_for': max(0, open_for),
+            }
+
+
+class EndpointStats:
+    """单个接口的统计信息"""
+
+    __slots__ = ('name', 'successes', 'failures', 'latency', 'last_error', 'breaker')
+
+    def __init__(self, name):
+        self.name = name
+        self.successes = 0
+        self.failures = 0
+        # 响应时间的指数移动平均（秒），None表示尚无数据
+        self.latency = None
+        self.last_error = ''
+        self.breaker = CircuitBreaker(name)
+
+
+class EndpointHealth:
+    """
+    接口健康状况统计
+    记录每个接口的响应时间和成功/失败次数，按响应时间对接口排序；
+    每个接口带有一个熔断器，错误率过高或连续失败的接口被暂时跳过，之后通过探测请求恢复
+    """
+
+    # 响应时间移动平均的权重
+    LATENCY_ALPHA = 0.3
+    # 对冲请求的等待时间 = 平均响应时间 × 系数，限制在上下限之间
+    HEDGE_FACTOR = 1.5
+    MIN_HEDGE_DELAY = 0.3
+    MAX_HEDGE_DELAY = 3.0
+    DEFAULT_HEDGE_DELAY = 1.0
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name):
+        """获取接口统计，不存在时创建"""
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = EndpointStats(name)
+            return stats
+
+    def record_success(self, name, latency):
+        """
+        记录一次成功的请求
+        :param name: 接口名称
+        :param latency: 响应时间（秒）
+        """
+        stats = self._get(name)
+        with self._lock:
+            stats.successes += 1
+            if stats.latency is None:
+                stats.latency = latency
+            else:
+                stats.latency += self.LATENCY_ALPHA * (latency - stats.latency)
+        stats.breaker.record_success()
+
+    def record_failure(self, name, error=None):
+        """
+        记录一次失败的请求（超时、连接错误、无效响应等）
+        :param name: 接口名称
+        :param error: 错误信息
+        """
+        stats = self._get(name)
+        with self._lock:
+            stats.failures += 1
+            stats.last_error = str(error) if error else ''
+        stats.breaker.record_failure()
+
+    def is_available(self, name):
+        """接口当前是否可用（熔断器未断开）"""
+        return self._get(name).breaker.is_available()
+
+    def allow_request(self, name):
+        """
+        申请向接口发送请求，熔断器半开时只放行一个探测请求
+        获得许可后必须调用 record_success 或 record_failure 报告结果
+        :param name: 接口名称
+        :return: 是否允许发送
+        """
+        return self._get(name).breaker.allow_request()
+
+    def release(self, name):
+        """
+        交还 allow_request 获得的探测名额，获得许可后没有发送请求（例如全部命中缓存）时调用；
+        已报告过结果时不产生影响
+        :param name: 接口名称
+        """
+        self._get(name).breaker.release()
+
+    def rank(self, names):
+        """
+        按健康状况对接口排序，熔断器断开的接口不返回
+        按平均响应时间排序，最近连续失败的接口按失败次数降级，尚无数据的接口按默认等待时间估算
+        :param names: 接口名称列表（按默认优先级排列）
+        :return: 排序后的可用接口列表
+        """
+        available = []
+        for index, name in enumerate(names):
+            stats = self._get(name)
+            breaker = stats.breaker.get_state()
+            if breaker['state'] == CircuitBreaker.OPEN:
+                continue
+            latency = stats.latency if stats.latency is not None else self.DEFAULT_HEDGE_DELAY
+            # 最近失败过的接口排名靠后
+            score = latency * (1 + breaker['consecutive_failures'])
+            available.append((score, index, name))
+        return [name for _, _, name in sorted(available)]
+
+    def get_hedge_delay(self, name):
+        """
+        获取对冲等待时间：超过该时间仍未得到结果时，同时请求下一个接口
+        :param name: 接口名称
+        :return: 等待时间（秒）
+        """
+        stats = self._get(name)
+        if stats.latency is None:
+            return self.DEFAULT_HEDGE_DELAY
+        return max(self.MIN_HEDGE_DELAY, min(self.MAX_HEDGE_DELAY, stats.latency * self.HEDGE_FACTOR))
+
+    def get_stats(self):
+        """
+        获取所有接口的统计信息和熔断器状态
+        :return: {接口名称: 统计字典}
+        """
+        with self._lock:
+            items = list(self._stats.items())
+
+        result = {}
+        for name, stats in items:
+            info = {
+                'successes': stats.successes,
+                'failures': stats.failures,
+                'latency': stats.latency,
+                'last_error': stats.last_error,
+            }
+            info.update(stats.breaker.get_state())
+            result[name] = info
+        return result
@@ -6,26 +6,37 @@ import json
 import time
 import random
 import requests
-from urllib.parse import quote
+from urllib.parse import quote, urlparse
 
 from src.api.base_api import MusicAPI
 from src.api.netease_api import NeteaseAPI
+from src.api.url_cache import ResolvedURL
+from src.utils.racing import first_acceptable
+from src.utils.audio_verifier import AudioVerifier
+from src.utils.downloader import DownloadCancelled
 
 
 class GDMusicAPI(MusicAPI):
     """GDMusic API - GD音乐平台API实现，默认使用网易云音乐数据源"""
+    
+    # 请求会话的额外请求头（会话在第一次请求时创建，User-Agent由共享的User-Agent池按主机选取）
+    SESSION_HEADERS = {
+        'Accept': 'application/json, text/plain, */*',
+        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+        'Origin': 'https://music.gdstudio.xyz',
+        'Referer': 'https://music.gdstudio.xyz/',
+    }
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, netease_api=None, transport=None):
+        """
+        :param netease_api: 用作备选的网易云音乐API，不指定则在第一次使用时创建
+        :param transport: 使用的传输层，不指定则使用所有API实例共享的传输层；备选的网易云API与其共用
+        """
+        super().__init__(transport)
         self.name = 'GD音乐'
         
-        # 仅初始化网易云API（用作备选）
-        self.netease_api = NeteaseAPI()
-        
-        # API源映射 - 仅保留网易云音乐
-        self.api_map = {
-            'netease': self.netease_api
-        }
+        # 仅使用网易云API作为备选
+        self._netease_api = netease_api
         
         # 名称映射 - 仅保留网易云音乐
         self.name_map = {
@@ -36,15 +47,6 @@ class GDMusicAPI(MusicAPI):
         self.base_url = 'https://music-api.gdstudio.xyz'
         self.api_url = f'{self.base_url}/api.php'
         
-        # 更新请求头
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Origin': 'https://music.gdstudio.xyz',
-            'Referer': 'https://music.gdstudio.xyz/',
-        })
-        
         # 默认使用的源
         self.current_source = 'netease'
         
@@ -52,6 +54,20 @@ class GDMusicAPI(MusicAPI):
         self.limit = 30
         self.current_page = 1
     
+    @property
+    def netease_api(self):
+        """用作备选的网易云API，第一次使用时才创建，与本实例共用传输层"""
+        if self._netease_api is None:
+            self._netease_api = NeteaseAPI(self.transport)
+        return self._netease_api
+    
+    @property
+    def api_map(self):
+        """API源映射 - 仅保留网易云音乐"""
+        return {
+            'netease': self.netease_api
+        }
+    
     def set_source(self, source_name):
         """设置当前使用的音源"""
         if source_name in self.name_map:
@@ -62,6 +78,17 @@ class GDMusicAPI(MusicAPI):
             return True
         return False
     
+    def get_endpoint_name(self):
+        """GD音乐接口在健康统计中的名称"""
+        return urlparse(self.api_url).netloc
+    
+    def get_breaker_states(self):
+        """
+        获取GD音乐接口及备用接口的熔断器状态和统计信息
+        :return: {接口名称: 状态字典}
+        """
+        return self.endpoint_health.get_stats()
+    
     def search(self, keyword, page=1, limit=30, source=None):
         """
         搜索歌曲
@@ -71,14 +98,48 @@ class GDMusicAPI(MusicAPI):
         :param source: 指定音源，如不指定则使用当前音源
         :return: 搜索结果列表
         """
+        self.current_page = page
+        self.limit = limit
+        return self.fetch_page(keyword, page, limit, source)
+    
+    def fetch_page(self, keyword, page, limit=30, source=None):
+        """
+        获取指定页的搜索结果，不修改当前页码，可在多个线程中同时调用
+        :param keyword: 搜索关键词
+        :param page: 页码
+        :param limit: 每页数量
+        :param source: 指定音源，如不指定则使用当前音源
+        :return: 搜索结果列表
+        """
         if not source:
             source = self.current_source
         
-        self.current_page = page
-        self.limit = limit
-            
+        # 优先使用缓存的搜索结果
+        result = self.search_cache.get(self.name, source, keyword, page, limit)
+        if result is not None:
+            print(f"使用缓存的搜索结果({source}): {keyword}, 页码: {page}, 共 {len(result)} 首")
+            return result
+        
+        result = self._search(keyword, page, limit, source)
+        self.search_cache.put(self.name, source, keyword, page, limit, result)
+        return result
+    
+    def _search(self, keyword, page, limit, source):
+        """
+        通过GD音乐API搜索，失败时使用本地API
+        :return: 搜索结果列表
+        """
         print(f"正在搜索GD音乐({source}): {keyword}, 页码: {page}")
         
+        # GD音乐接口熔断时直接使用本地API
+        endpoint = self.get_endpoint_name()
+        if not self.endpoint_health.allow_request(endpoint):
+            print(f"GD音乐接口暂时不可用，直接使用本地API搜索")
+            return self._fallback_search(keyword, page, limit, source)
+        
+        start = time.time()
+        # 是否已向熔断器报告本次请求的结果
+        reported = False
         try:
             # 使用GD音乐API搜索
             params = {
@@ -100,38 +161,14 @@ class GDMusicAPI(MusicAPI):
                 data = response.json()
             except json.JSONDecodeError as e:
                 print(f"搜索GD音乐({source})返回的数据不是有效的JSON格式: {e}")
+                self.endpoint_health.record_failure(endpoint, e)
                 return self._fallback_search(keyword, page, limit, source)
             
-            # 处理搜索结果
-            result = []
+            self.endpoint_health.record_success(endpoint, time.time() - start)
+            reported = True
             
-            # 检查API返回的数据结构
-            if isinstance(data, list):
-                # 列表结构，直接遍历
-                for song in data:
-                    song_info = self._parse_song_data(song, source)
-                    if song_info:
-                        result.append(song_info)
-            elif isinstance(data, dict):
-                # 可能是嵌套的字典结构
-                if 'data' in data:
-                    songs = data.get('data', [])
-                    for song in songs:
-                        song_info = self._parse_song_data(song, source)
-                        if song_info:
-                            result.append(song_info)
-                elif 'songs' in data and isinstance(data['songs'], list):
-                    songs = data['songs']
-                    for song in songs:
-                        song_info = self._parse_song_data(song, source)
-                        if song_info:
-                            result.append(song_info)
-                elif 'result' in data and isinstance(data['result'], dict) and 'songs' in data['result']:
-                    songs = data['result']['songs']
-                    for song in songs:
-                        song_info = self._parse_song_data(song, source)
-                        if song_info:
-                            result.append(song_info)
+            # 处理搜索结果
+            result = self._parse_search_data(data, source)
             
             if not result:
                 print(f"搜索GD音乐({source})解析结果为空，尝试使用本地API")
@@ -142,8 +179,50 @@ class GDMusicAPI(MusicAPI):
             
         except Exception as e:
             print(f"搜索GD音乐({source})出错: {e}")
+            # 获得许可后必须报告结果，否则半开状态的熔断器要等探测超时才能恢复
+            if not reported:
+                self.endpoint_health.record_failure(endpoint, e)
             return self._fallback_search(keyword, page, limit, source)
     
+    def _parse_search_data(self, data, source):
+        """
+        解析搜索接口返回的数据
+        :param data: 接口返回的JSON数据
+        :param source: 音源
+        :return: 搜索结果列表
+        """
+        result = []
+        
+        # 检查API返回的数据结构
+        if isinstance(data, list):
+            # 列表结构，直接遍历
+            for song in data:
+                song_info = self._parse_song_data(song, source)
+                if song_info:
+                    result.append(song_info)
+        elif isinstance(data, dict):
+            # 可能是嵌套的字典结构
+            if 'data' in data:
+                songs = data.get('data', [])
+                for song in songs:
+                    song_info = self._parse_song_data(song, source)
+                    if song_info:
+                        result.append(song_info)
+            elif 'songs' in data and isinstance(data['songs'], list):
+                songs = data['songs']
+                for song in songs:
+                    song_info = self._parse_song_data(song, source)
+                    if song_info:
+                        result.append(song_info)
+            elif 'result' in data and isinstance(data['result'], dict) and 'songs' in data['result']:
+                songs = data['result']['songs']
+                for song in songs:
+                    song_info = self._parse_song_data(song, source)
+                    if song_info:
+                        result.append(song_info)
+        
+        return result
+    
     def _parse_song_data(self, song, source):
         """解析歌曲数据"""
         try:
@@ -238,7 +317,7 @@ class GDMusicAPI(MusicAPI):
         print(f"尝试使用本地API搜索({source}): {keyword}")
         source_api = self.api_map.get(source)
         if source_api:
-            result = source_api.search(keyword, page, limit)
+            result = source_api.fetch_page(keyword, page, limit)
             if result:
                 # 修改音乐来源为GD音乐，保留原始源信息
                 for song in result:
@@ -249,31 +328,160 @@ class GDMusicAPI(MusicAPI):
                 return result
         return []
     
-    def get_song_url(self, song_id):
+    def _parse_song_id(self, song_id):
+        """
+        解析歌曲ID
+        :param song_id: 歌曲ID，格式为 "source:id" 或 "source:id|br"
+        :return: (音源, 原始ID, 最大比特率)
+        """
+        source = 'netease'  # 默认使用网易云音乐
+        max_br = 320000
+        
+        # 如果ID是"id|br"格式，需要先分离
+        if isinstance(song_id, str) and '|' in song_id:
+            song_id, br_str = song_id.split('|', 1)
+            try:
+                max_br = int(br_str)
+            except:
+                max_br = 320000
+        
+        orig_id = song_id
+        # 处理"source:id"格式
+        if isinstance(song_id, str) and ':' in song_id:
+            source, orig_id = song_id.split(':', 1)
+        
+        return source, orig_id, max_br
+    
+    def _resolve_url(self, source, orig_id, br, allowed=False):
+        """
+        通过GD音乐API解析指定比特率的下载链接，结果保存在共享的链接缓存中
+        :param source: 音源
+        :param orig_id: 原始歌曲ID
+        :param br: 比特率 (kbps)
+        :param allowed: 调用方已通过熔断器获得许可（并负责交还未使用的探测名额）
+        :return: ResolvedURL，url为None表示解析失败
+        """
+        cache_source = f"gd:{source}"
+        cached = self.url_cache.get(cache_source, orig_id, br * 1000)
+        if cached is not None:
+            return cached
+        
+        # GD音乐接口熔断时不发送请求，也不缓存结果
+        endpoint = self.get_endpoint_name()
+        if not allowed and not self.endpoint_health.allow_request(endpoint):
+            return ResolvedURL(None)
+        
+        url = None
+        start = time.time()
+        try:
+            # 使用GD音乐新的公共API格式获取
+            params = {
+                'types': 'url',
+                'source': source,
+                'id': orig_id,
+                'br': br
+            }
+            
+            # 模拟从网页请求，User-Agent由User-Agent池按主机选取
+            headers = {
+                'Accept': 'application/json, text/plain, */*',
+                'Referer': 'https://music.gdstudio.xyz/'
+            }
+            
+            # 重试由统一的重试策略处理，熔断器每次解析只记录一次结果
+            response = self._safe_request('get', self.api_url, params=params, headers=headers, timeout=15)
+            
+            if response is not None:
+                print(f"获取歌曲URL响应 (br={br}): {response.text[:200]}...")
+                data = response.json()
+                
+                # 处理新的API返回格式
+                if 'data' in data and isinstance(data['data'], dict) and 'url' in data['data']:
+                    url = data['data']['url']
+                elif 'url' in data:
+                    url = data['url']
+                self.endpoint_health.record_success(endpoint, time.time() - start)
+        except json.JSONDecodeError as e:
+            print(f"获取GD音乐链接返回的数据不是有效的JSON格式: {e}")
+            self.endpoint_health.record_failure(endpoint, e)
+        except requests.exceptions.RequestException as e:
+            print(f"获取比特率 {br} 的链接时出错: {e}")
+            self.endpoint_health.record_failure(endpoint, e)
+        except Exception as e:
+            print(f"获取比特率 {br} 的链接时出错: {e}")
+            self.endpoint_health.record_failure(endpoint, e)
+        
+        if not (url and isinstance(url, str) and url.startswith('http')):
+            return self.url_cache.put(cache_source, orig_id, br * 1000, None)
+        
+        # 如果URL包含转义字符，需要去除
+        if '\\' in url:
+            url = url.replace('\\', '')
+        
+        print(f"获取到歌曲URL (br={br}): {url[:100]}...")
+        
+        # 检查URL的文件大小和类型
+        info = self._probe_url(url)
+        if info is None:
+            return self.url_cache.put(cache_source, orig_id, br * 1000, url)
+        return self.url_cache.put(cache_source, orig_id, br * 1000, url, info.content_length, info.content_type)
+    
+    def _is_acceptable(self, entry, max_br, br=None, duration=None):
+        """
+        判断解析出的链接是否为合适的MP3文件
+        :param entry: ResolvedURL
+        :param max_br: 用户请求的最大比特率
+        :param br: 链接对应的比特率 (kbps)
+        :param duration: 歌曲时长（秒），已知时按时长和比特率检查文件大小
+        :return: 是否可用
+        """
+        url = entry.url
+        if not url:
+            return False
+        
+        if entry.content_length is None:
+            # 无法检查URL，但仍可能有效
+            return True
+        
+        content_length = entry.content_length
+        content_type = entry.content_type
+        size_mb = content_length / (1024 * 1024)
+        
+        if content_length <= 0 or 'text/' in content_type:
+            print(f"警告: URL不可用 (类型: {content_type or '未知'})，跳过")
+            return False
+        
+        # 检查是否为FLAC格式，如果是FLAC格式但用户请求的是MP3，则跳过
+        is_flac = 'flac' in url.lower() or 'flac' in content_type.lower()
+        if is_flac and max_br <= 320000:
+            print(f"警告: 检测到FLAC格式 ({size_mb:.2f}MB)，但用户请求的是MP3，跳过")
+            return False
+        
+        # 文件大小与歌曲时长不符时多半是试听片段或无损文件；时长未知时由下载时的音频校验判断
+        reason = AudioVerifier.check_size(content_length, duration, br * 1000 if br else None)
+        if reason:
+            print(f"警告: {reason}，跳过")
+            return False
+        
+        print(f"URL返回的文件大小 {size_mb:.2f}MB, 内容类型: {content_type}")
+        return True
+    
+    def get_song_url(self, song_id, duration=None):
         """
         获取歌曲下载链接
         :param song_id: 歌曲ID
+        :param duration: 歌曲时长（秒），已知时按时长检查文件大小，识别试听片段
         :return: 歌曲下载链接
         """
+        source, orig_id, max_br = self._parse_song_id(song_id)
+        
+        # GD音乐接口熔断时直接使用本地API；半开时本次解析作为探测请求
+        endpoint = self.get_endpoint_name()
+        if not self.endpoint_health.allow_request(endpoint):
+            print(f"GD音乐接口暂时不可用，直接使用本地API获取链接")
+            return self._fallback_get_song_url(source, orig_id, duration)
+        
         try:
-            # 检查是否包含源信息
-            source = 'netease'  # 默认使用网易云音乐
-            orig_id = song_id
-            max_br = 320000
-            
-            # 处理ID格式
-            if isinstance(song_id, str) and '|' in song_id:
-                # 如果ID是"id|br"格式，需要先分离
-                song_id, br_str = song_id.split('|', 1)
-                try:
-                    max_br = int(br_str)
-                except:
-                    max_br = 320000
-            
-            # 处理"source:id"格式
-            if isinstance(song_id, str) and ':' in song_id:
-                source, orig_id = song_id.split(':', 1)
-            
             print(f"正在获取歌曲链接: {source}:{orig_id}")
             
             # 定义不同的比特率尝试列表，从高到低，限制最高320
@@ -290,123 +498,29 @@ class GDMusicAPI(MusicAPI):
             # 打印用户请求和实际采用的比特率信息
             print(f"用户请求的最大比特率: {max_br//1000}K, 将尝试的比特率: {bit_rates}")
             
-            # 尝试不同的比特率
-            for br in bit_rates:
-                try:
-                    # 使用GD音乐新的公共API格式获取
-                    params = {
-                        'types': 'url',
-                        'source': source,
-                        'id': orig_id,
-                        'br': br  # 尝试不同比特率
-                    }
-                    
-                    # 添加请求头模拟浏览器
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                        'Accept': 'application/json, text/plain, */*',
-                        'Referer': 'https://music.gdstudio.xyz/'
-                    }
-                    
-                    # 添加重试机制
-                    max_retries = 3
-                    retry_count = 0
-                    response = None
-                    
-                    while retry_count < max_retries:
-                        try:
-                            response = self.session.get(self.api_url, params=params, headers=headers, timeout=15)
-                            response.raise_for_status()
-                            break
-                        except requests.exceptions.RequestException as e:
-                            retry_count += 1
-                            print(f"请求失败 (尝试 {retry_count}/{max_retries}): {e}")
-                            if retry_count == max_retries:
-                                raise
-                            time.sleep(1)  # 等待1秒后重试
-                    
-                    if not response:
-                        continue
-                    
-                    print(f"获取歌曲URL响应 (br={br}): {response.text[:200]}...")
-                    
-                    try:
-                        data = response.json()
-                    except json.JSONDecodeError as e:
-                        print(f"获取GD音乐链接返回的数据不是有效的JSON格式: {e}")
-                        continue
-                    
-                    # 提取URL
-                    url = None
-                    
-                    # 处理新的API返回格式
-                    if 'data' in data and isinstance(data['data'], dict) and 'url' in data['data']:
-                        url = data['data']['url']
-                    elif 'url' in data:
-                        url = data['url']
-                    
-                    if url and isinstance(url, str) and url.startswith('http'):
-                        # 如果URL包含转义字符，需要去除
-                        if '\\' in url:
-                            url = url.replace('\\', '')
-                        
-                        print(f"获取到歌曲URL (br={br}): {url[:100]}...")
-                        
-                        # 检查URL是否可能是有效的音乐文件
-                        try:
-                            head_resp = self.session.head(url, allow_redirects=True, timeout=10)
-                            content_length = int(head_resp.headers.get('Content-Length', 0))
-                            
-                            # 检查内容类型
-                            content_type = head_resp.headers.get('Content-Type', '')
-                            is_audio = 'audio' in content_type or 'octet-stream' in content_type
-                            
-                            # 检查是否为FLAC格式，如果是FLAC格式但用户请求的是MP3，则跳过
-                            is_flac = 'flac' in url.lower() or 'flac' in content_type.lower()
-                            
-                            # 估算比特率MP3大约是44.1kHz × 16bit × 2channels × 大约1/10压缩率 = 141.12 kbps
-                            # 一分钟大约是 (141.12 / 8) × 60 = 1058.4 KB
-                            # 所以10MB大约是10分钟320kbps的歌曲
-                            max_expected_size = 15 * 1024 * 1024  # 15MB上限
-                            
-                            # 调整日志，显示MB而非KB
-                            size_mb = content_length / (1024 * 1024)
-                            
-                            if content_length > max_expected_size:
-                                print(f"警告: URL返回的文件过大 ({size_mb:.2f}MB)，可能是高质量FLAC，跳过")
-                                continue
-                                
-                            if is_flac and max_br <= 320000:
-                                print(f"警告: 检测到FLAC格式 ({size_mb:.2f}MB)，但用户请求的是MP3，跳过")
-                                continue
-                            
-                            if content_length > 1000000 or (is_audio and content_length > 100000):
-                                print(f"URL返回的文件大小合适 ({size_mb:.2f}MB), 内容类型: {content_type}")
-                                print(f"获取到下载URL: {url[:100]}...")
-                                print(f"文件大小: {content_length} 字节")
-                                return url
-                            else:
-                                print(f"警告: URL返回的文件过小 ({content_length/1024:.2f}KB), 内容类型: {content_type}")
-                                # 继续尝试下一个比特率
-                        except Exception as e:
-                            print(f"检查URL时出错: {e}")
-                            # 无法检查URL，但仍可能有效，返回它
-                            return url
-                    
-                    print(f"使用比特率 {br} 未能获取有效URL")
-                
-                except Exception as e:
-                    print(f"获取比特率 {br} 的链接时出错: {e}")
+            # 各比特率同时解析，按从高到低选择第一个合适的链接
+            br, result = first_acceptable(
+                bit_rates,
+                lambda br: (br, self._resolve_url(source, orig_id, br, allowed=True)),
+                lambda result: self._is_acceptable(result[1], max_br, result[0], duration)
+            )
+            entry = result[1] if result is not None else None
+            if entry is not None:
+                print(f"获取到下载URL (br={br}): {entry.url[:100]}...")
+                return entry.url
             
             # 如果所有比特率都尝试失败，使用备选方法
             print(f"所有比特率尝试都失败，使用备选方法")
-            return self._fallback_get_song_url(source, orig_id)
+            return self._fallback_get_song_url(source, orig_id, duration)
                 
         except Exception as e:
             print(f"获取GD音乐链接出错: {e}")
-            return self._fallback_get_song_url(source, orig_id)
+            return self._fallback_get_song_url(source, orig_id, duration)
+        finally:
+            # 全部命中缓存、没有发送请求时交还探测名额
+            self.endpoint_health.release(endpoint)
     
-    def _fallback_get_song_url(self, source, orig_id):
+    def _fallback_get_song_url(self, source, orig_id, duration=None):
         """使用本地API作为备选获取歌曲URL的方法"""
         print(f"尝试使用本地API获取歌曲链接: {source}:{orig_id}")
         source_api = self.api_map.get(source)
@@ -416,18 +530,15 @@ class GDMusicAPI(MusicAPI):
             if isinstance(clean_id, str) and '|' in clean_id:
                 clean_id = clean_id.split('|')[0]
                 
-            url = source_api.get_song_url(clean_id)
+            url = source_api.get_song_url(clean_id, duration=duration)
             if url:
                 print(f"本地API获取到URL: {url[:100]}...")
                 
-                # 验证URL是否返回足够大的文件
-                try:
-                    head_resp = self.session.head(url, allow_redirects=True, timeout=5)
-                    content_length = head_resp.headers.get('Content-Length', 0)
-                    if int(content_length) < 1000000:  # 小于1MB的可能不是完整音乐文件
-                        print(f"警告: 本地API返回的文件过小 ({int(content_length)/1024:.2f}KB)")
-                except:
-                    pass  # 检查失败时继续使用URL
+                # 按歌曲时长检查文件大小（通常已由本地API探测并缓存），格式和完整性在下载时校验
+                info = self._probe_url(url, timeout=5)
+                reason = AudioVerifier.check_link(info.content_length, info.content_type, duration) if info else None
+                if reason:
+                    print(f"警告: 本地API返回的链接可能不完整: {reason}")
                     
                 return url
             else:
@@ -453,67 +564,48 @@ class GDMusicAPI(MusicAPI):
                 
         return None
     
-    def download(self, song_id, save_path):
+    def download(self, song_id, save_path, progress_callback=None, duration=None, is_cancelled=None,
+                 host_slot=None):
         """
         下载歌曲
         :param song_id: 歌曲ID
         :param save_path: 保存路径
+        :param progress_callback: 进度回调 (已下载字节数, 总字节数)
+        :param duration: 搜索结果中的歌曲时长（秒），用于识别试听片段
+        :param is_cancelled: 返回是否已取消的函数，取消时抛出DownloadCancelled
+        :param host_slot: 传输期间占用下载主机名额的函数，见 MusicAPI._download_file
         :return: 保存路径
         """
         try:
             # 检查是否包含源信息
-            source = 'netease'  # 默认使用网易云音乐
-            orig_id = song_id
+            source, orig_id, max_br = self._parse_song_id(song_id)
             
-            if ':' in str(song_id):
-                source, orig_id = song_id.split(':', 1)
+            # GD音乐接口熔断时直接使用本地API下载
+            source_api = self.api_map.get(source)
+            if source_api and not self.endpoint_health.is_available(self.get_endpoint_name()):
+                print(f"GD音乐接口暂时不可用，直接使用本地API下载: {source}:{orig_id}")
+                return source_api.download(orig_id, save_path, progress_callback, duration, is_cancelled,
+                                           host_slot)
                 
-            # 获取下载链接 - 先尝试不同的比特率
+            # 获取下载链接 - 各比特率同时解析（解析结果与get_song_url共享缓存）
             url = None
             bit_rates = [320, 192, 128]  # 去除999，只使用MP3比特率
             
-            for br in bit_rates:
-                try:
-                    # 使用GD音乐API获取特定比特率的URL
-                    params = {
-                        'types': 'url',
-                        'source': source,
-                        'id': orig_id,
-                        'br': br
-                    }
-                    
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                        'Accept': 'application/json, text/plain, */*',
-                        'Referer': 'https://music.gdstudio.xyz/'
-                    }
-                    
-                    response = self.session.get(self.api_url, params=params, headers=headers, timeout=15)
-                    data = response.json()
-                    
-                    if 'data' in data and isinstance(data['data'], dict) and 'url' in data['data']:
-                        url = data['data']['url']
-                    elif 'url' in data:
-                        url = data['url']
-                    
-                    if url and isinstance(url, str) and url.startswith('http'):
-                        # 检查URL是否返回足够大的文件
-                        head_resp = self.session.head(url, allow_redirects=True, timeout=10)
-                        content_length = int(head_resp.headers.get('Content-Length', 0))
-                        
-                        if content_length > 1000000:  # 大于1MB的文件可能是有效的音乐
-                            print(f"找到有效下载链接 (br={br}): {url[:100]}...")
-                            break
-                        else:
-                            print(f"比特率 {br} 的链接文件太小 ({content_length/1024:.2f}KB)，尝试较低比特率")
-                            url = None  # 重置URL继续尝试
-                
-                except Exception as e:
-                    print(f"获取比特率 {br} 的下载链接时出错: {e}")
+            # 只接受能确认大小且与歌曲时长相符的链接
+            br, result = first_acceptable(
+                bit_rates,
+                lambda br: (br, self._resolve_url(source, orig_id, br)),
+                lambda result: result[1].content_length is not None
+                and self._is_acceptable(result[1], max_br, result[0], duration)
+            )
+            entry = result[1] if result is not None else None
+            if entry is not None:
+                print(f"找到有效下载链接 (br={br}): {entry.url[:100]}...")
+                url = entry.url
             
             # 如果所有比特率都失败，尝试原始方法
             if not url:
-                url = self.get_song_url(song_id)
+                url = self.get_song_url(song_id, duration)
             
             if not url:
                 print(f"无法获取歌曲 {orig_id} 的下载链接")
@@ -525,79 +617,49 @@ class GDMusicAPI(MusicAPI):
             if not os.path.exists(os.path.dirname(save_path)):
                 os.makedirs(os.path.dirname(save_path))
                 
-            # 下载文件
+            # 下载文件，数据先写入.part临时文件，重试时从断点继续
             try:
                 headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                     'Accept': '*/*',
                     'Referer': 'https://music.gdstudio.xyz/'
                 }
                 
-                # 添加重试机制
-                max_retries = 3
-                for retry in range(max_retries):
-                    try:
-                        with self.session.get(url, headers=headers, stream=True, timeout=60) as response:
-                            response.raise_for_status()
-                            total_size = int(response.headers.get('content-length', 0))
-                            print(f"文件大小: {total_size} 字节")
-                            
-                            if total_size < 1000000 and total_size > 0:  # 小于1MB且大于0的可能不是完整音乐文件
-                                print(f"警告: 下载的文件可能不完整，大小仅有 {total_size/1024:.2f}KB")
-                                if retry < max_retries - 1:
-                                    print(f"尝试重新下载 (尝试 {retry+1}/{max_retries})")
-                                    continue
-                            
-                            with open(save_path, 'wb') as f:
-                                downloaded_size = 0
-                                for chunk in response.iter_content(chunk_size=8192):
-                                    if chunk:
-                                        f.write(chunk)
-                                        downloaded_size += len(chunk)
-                                
-                                print(f"下载完成，文件大小: {downloaded_size} 字节")
-                                
-                            # 如果下载成功，跳出重试循环
-                            break
-                            
-                    except Exception as e:
-                        print(f"下载尝试 {retry+1}/{max_retries} 失败: {e}")
-                        if retry == max_retries - 1:  # 如果是最后一次尝试
-                            raise
-                        time.sleep(1)  # 等待1秒后重试
+                # 下载时校验音频格式和时长，网页、试听片段等无效内容在收到开头几KB后即中止
+                downloaded_size = self._download_file(url, save_path, headers=headers, timeout=60,
+                                                      progress_callback=progress_callback, is_cancelled=is_cancelled,
+                                                      expected_duration=duration, host_slot=host_slot)
+                print(f"下载完成，文件大小: {downloaded_size} 字节")
                         
+            except DownloadCancelled:
+                raise
             except Exception as e:
                 print(f"下载过程出错: {e}")
+                # 链接可能已过期，不再使用缓存
+                self.url_cache.invalidate_url(url)
                 # 如果当前URL下载失败，尝试本地API下载
                 print(f"尝试使用本地API下载: {source}:{orig_id}")
                 source_api = self.api_map.get(source)
                 if source_api:
-                    return source_api.download(orig_id, save_path)
+                    return source_api.download(orig_id, save_path, progress_callback, duration, is_cancelled,
+                                               host_slot)
                 return None
             
-            # 检查文件是否有效
+            # 文件已通过下载时的音频校验
             if os.path.exists(save_path):
-                file_size = os.path.getsize(save_path)
-                if file_size > 1000000:  # 大于1MB的文件可能是有效的音乐
-                    print(f"下载完成: {save_path}")
-                    return save_path
-                elif file_size > 10 * 1024:  # 大于10KB但小于1MB的文件可能是部分有效
-                    print(f"警告: 下载的文件可能不完整，大小仅有 {file_size/1024:.2f}KB")
-                    # 尝试使用本地API下载
-                    os.remove(save_path)  # 删除不完整的文件
-                else:
-                    print(f"下载文件不完整或无效")
-                    if os.path.exists(save_path):
-                        os.remove(save_path)
+                print(f"下载完成: {save_path}")
+                return save_path
             
             # 如果GD音乐API下载失败，尝试使用本地API下载
             print(f"尝试使用本地API下载: {source}:{orig_id}")
             source_api = self.api_map.get(source)
             if source_api:
-                return source_api.download(orig_id, save_path)
+                return source_api.download(orig_id, save_path, progress_callback, duration, is_cancelled,
+                                           host_slot)
             
             return None
                 
+        except DownloadCancelled:
+            raise
         except Exception as e:
             print(f"下载GD音乐出错: {e}")
             # 使用本地对应的API
@@ -609,7 +671,8 @@ class GDMusicAPI(MusicAPI):
             source_api = self.api_map.get(source)
             if source_api:
                 print(f"尝试使用本地API下载: {source}:{clean_id}")
-                return source_api.download(clean_id, save_path)
+                return source_api.download(clean_id, save_path, progress_callback, duration, is_cancelled,
+                                           host_slot)
             return None
     
     def get_next_page(self, keyword):
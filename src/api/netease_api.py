@@ -6,17 +6,32 @@ import json
 import requests
 import random
 import time
-from urllib.parse import quote
+from urllib.parse import quote, urlparse
 import traceback
 
 from src.api.base_api import MusicAPI
+from src.utils.racing import first_acceptable, hedged_first
+from src.utils.audio_verifier import AudioVerifier, InvalidAudio
+from src.utils.downloader import DownloadCancelled
 
 
 class NeteaseAPI(MusicAPI):
     """网易云音乐API - 使用公开API接口"""
+    
+    # 请求会话的额外请求头（会话在第一次请求时创建，User-Agent由共享的User-Agent池按主机选取）
+    SESSION_HEADERS = {
+        'Referer': 'https://music.163.com/',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    }
+    
+    # 备用接口获取链接的总超时时间（秒）
+    ALT_URL_TIMEOUT = 20
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, transport=None):
+        """
+        :param transport: 使用的传输层，不指定则使用所有API实例共享的传输层
+        """
+        super().__init__(transport)
         self.name = '网易云音乐'
         
         # 使用公开搜索API
@@ -26,16 +41,17 @@ class NeteaseAPI(MusicAPI):
         
         # 备用下载API
         self.alt_song_url_api = 'https://music.163.com/song/media/outer/url'
+        self.download_url_api = 'https://music.163.com/api/song/enhance/download/url'
+        
+        # 第三方镜像API
+        self.mirror_urls = [
+            'https://autumnfish.cn/song/url?id={id}',
+            'https://netease-cloud-music-api-eta-tawny.vercel.app/song/url?id={id}',
+            'https://music.cyrilstudio.top/song/url?id={id}&br=320000',
+        ]
         
         # 添加当前页码属性
         self.current_page = 1
-        
-        # 更新必要的请求头
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36',
-            'Referer': 'https://music.163.com/',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-        })
     
     def search(self, keyword, page=1, page_size=30):
         """
@@ -45,10 +61,35 @@ class NeteaseAPI(MusicAPI):
         :param page_size: 每页数量
         :return: 搜索结果列表
         """
+        # 更新当前页码
+        self.current_page = page
+        return self.fetch_page(keyword, page, page_size)
+    
+    def fetch_page(self, keyword, page, page_size=30):
+        """
+        获取指定页的搜索结果，不修改当前页码，可在多个线程中同时调用
+        :param keyword: 搜索关键词
+        :param page: 页码
+        :param page_size: 每页数量
+        :return: 搜索结果列表
+        """
+        # 优先使用缓存的搜索结果
+        result = self.search_cache.get(self.name, 'netease', keyword, page, page_size)
+        if result is not None:
+            print(f"使用缓存的搜索结果: {keyword}, 页码: {page}, 共 {len(result)} 首")
+            return result
+        
+        result = self._search(keyword, page, page_size)
+        self.search_cache.put(self.name, 'netease', keyword, page, page_size, result)
+        return result
+    
+    def _search(self, keyword, page, page_size):
+        """
+        通过网易云音乐搜索接口搜索
+        :return: 搜索结果列表
+        """
         try:
             print(f"正在搜索网易云音乐: {keyword}")
-            # 更新当前页码
-            self.current_page = page
             
             # 使用简单的搜索API
             params = {
@@ -77,60 +118,7 @@ class NeteaseAPI(MusicAPI):
                     print("未找到相关歌曲")
                     return []
                 
-                result = []
-                for song in songs:
-                    # 基本信息
-                    song_id = song.get('id', '')
-                    song_name = song.get('name', '')
-                    
-                    # 歌手信息
-                    artists = song.get('artists', [])
-                    artist_names = '/'.join([artist.get('name', '') for artist in artists])
-                    
-                    # 专辑信息
-                    album = song.get('album', {})
-                    album_name = album.get('name', '')
-                    
-                    # 时长
-                    duration = int(song.get('duration', 0) / 1000)  # 毫秒转秒
-                    
-                    # 音质信息 - 只处理MP3格式
-                    max_br = 320000  # 默认最高码率
-                    if song.get('hMusic'):
-                        max_br = 320000
-                        quality = '320K'
-                        size = song.get('hMusic', {}).get('size', 0)
-                    elif song.get('mMusic'):
-                        max_br = 192000
-                        quality = '192K'
-                        size = song.get('mMusic', {}).get('size', 0)
-                    elif song.get('lMusic'):
-                        max_br = 128000
-                        quality = '128K'
-                        size = song.get('lMusic', {}).get('size', 0)
-                    else:
-                        quality = '标准'
-                        size = 0
-                    
-                    # 格式化大小
-                    size_text = self._format_size(size)
-                    
-                    # 获取专辑图片
-                    pic_url = album.get('picUrl', '')
-                    
-                    # 添加到结果列表
-                    result.append({
-                        'name': song_name,
-                        'id': song_id,
-                        'singer': artist_names,
-                        'album': album_name,
-                        'duration': duration,
-                        'source': self.name,
-                        'size': size_text,
-                        'quality': quality,
-                        'max_br': max_br,
-                        'pic_url': pic_url
-                    })
+                result = self._parse_songs(songs)
                 
                 print(f"搜索完成，找到 {len(result)} 首歌曲")
                 return result
@@ -143,6 +131,69 @@ class NeteaseAPI(MusicAPI):
             print(f"网易云音乐搜索出错: {e}")
             return []
     
+    def _parse_songs(self, songs):
+        """
+        解析搜索接口返回的歌曲列表
+        :param songs: 接口返回的歌曲数据
+        :return: 搜索结果列表
+        """
+        result = []
+        for song in songs:
+            # 基本信息
+            song_id = song.get('id', '')
+            song_name = song.get('name', '')
+            
+            # 歌手信息
+            artists = song.get('artists', [])
+            artist_names = '/'.join([artist.get('name', '') for artist in artists])
+            
+            # 专辑信息
+            album = song.get('album', {})
+            album_name = album.get('name', '')
+            
+            # 时长
+            duration = int(song.get('duration', 0) / 1000)  # 毫秒转秒
+            
+            # 音质信息 - 只处理MP3格式
+            max_br = 320000  # 默认最高码率
+            if song.get('hMusic'):
+                max_br = 320000
+                quality = '320K'
+                size = song.get('hMusic', {}).get('size', 0)
+            elif song.get('mMusic'):
+                max_br = 192000
+                quality = '192K'
+                size = song.get('mMusic', {}).get('size', 0)
+            elif song.get('lMusic'):
+                max_br = 128000
+                quality = '128K'
+                size = song.get('lMusic', {}).get('size', 0)
+            else:
+                quality = '标准'
+                size = 0
+            
+            # 格式化大小
+            size_text = self._format_size(size)
+            
+            # 获取专辑图片
+            pic_url = album.get('picUrl', '')
+            
+            # 添加到结果列表
+            result.append({
+                'name': song_name,
+                'id': song_id,
+                'singer': artist_names,
+                'album': album_name,
+                'duration': duration,
+                'source': self.name,
+                'size': size_text,
+                'quality': quality,
+                'max_br': max_br,
+                'pic_url': pic_url
+            })
+        
+        return result
+    
     def _format_size(self, size_bytes):
         """格式化文件大小"""
         if not size_bytes or size_bytes == 0:
@@ -158,14 +209,36 @@ class NeteaseAPI(MusicAPI):
         gb = mb / 1024
         return f"{gb:.2f}GB"
     
-    def get_song_url(self, song_id, br=320000):
+    def get_song_url(self, song_id, br=320000, duration=None):
         """
         获取歌曲下载链接
         :param song_id: 歌曲ID
         :param br: 比特率，可选值: 320000, 192000, 128000
+        :param duration: 歌曲时长（秒），已知时按时长检查文件大小，识别试听片段
         :return: 歌曲下载链接
         """
+        url = self._resolve_song_url(song_id, br, duration)
+        if url:
+            return url
+        # 尝试备选URL方式
+        return self._get_alt_song_url(song_id, duration)
+    
+    def _resolve_song_url(self, song_id, br, duration=None):
+        """
+        通过官方接口获取指定比特率的下载链接，结果保存在共享的链接缓存中
+        :param song_id: 歌曲ID
+        :param br: 比特率
+        :param duration: 歌曲时长（秒），已知时按时长和比特率检查文件大小
+        :return: 歌曲下载链接，获取失败返回None
+        """
         try:
+            # 优先使用缓存的解析结果
+            cached = self.url_cache.get('netease', song_id, br)
+            if cached is not None:
+                if cached.url:
+                    print(f"使用缓存的歌曲链接: {song_id}, 比特率: {br/1000:.0f}K")
+                return cached.url
+            
             print(f"正在获取歌曲链接: {song_id}, 比特率: {br/1000:.0f}K")
             
             params = {
@@ -186,128 +259,175 @@ class NeteaseAPI(MusicAPI):
                 
                 if data.get('code') != 200:
                     print(f"获取歌曲URL API返回错误: {data.get('code')}")
-                    # 尝试备选URL方式
-                    return self._get_alt_song_url(song_id)
+                    self.url_cache.put('netease', song_id, br, None)
+                    return None
                 
                 url_data = data.get('data', [{}])[0]
                 url = url_data.get('url', '')
                 
                 if not url:
                     print(f"API返回的URL为空，尝试备选方式")
-                    return self._get_alt_song_url(song_id)
+                    self.url_cache.put('netease', song_id, br, None)
+                    return None
                 
                 # 验证URL是否有效
-                try:
-                    head_resp = self._safe_request('head', url, allow_redirects=True, timeout=10)
-                    content_length = int(head_resp.headers.get('Content-Length', 0))
-                    
-                    if content_length < 10240:  # 小于10KB可能无效
-                        print(f"警告: URL返回的文件过小 ({content_length} 字节)")
-                        if content_length < 1000:  # 非常小，可能无效
-                            return self._get_alt_song_url(song_id)
-                except Exception as e:
-                    print(f"验证URL出错: {e}")
+                info = self._probe_url(url)
+                if info is None:
                     # 即使验证失败，仍返回URL
+                    self.url_cache.put('netease', song_id, br, url)
+                    return url
+                
+                # 按内容类型、歌曲时长和比特率检查，格式和完整性在下载时校验
+                reason = AudioVerifier.check_link(info.content_length, info.content_type, duration, br)
+                if reason:
+                    print(f"警告: {reason}")
+                    self.url_cache.put('netease', song_id, br, None)
+                    return None
                 
+                self.url_cache.put('netease', song_id, br, url, info.content_length, info.content_type)
                 return url
             
             except Exception as e:
                 print(f"获取歌曲URL请求失败: {e}")
-                # 尝试备选URL方式
-                return self._get_alt_song_url(song_id)
+                self.url_cache.put('netease', song_id, br, None)
+                return None
         
         except Exception as e:
             print(f"获取网易云音乐下载链接出错: {e}")
             traceback.print_exc()
-            # 尝试备用链接
-            return self._get_alt_song_url(song_id)
+            return None
     
-    def _get_alt_song_url(self, song_id):
+    def _get_alt_song_url(self, song_id, duration=None):
         """
-        备用方法获取歌曲下载链接
+        备用方法获取歌曲下载链接，结果缓存在比特率0下
         :param song_id: 歌曲ID
+        :param duration: 歌曲时长（秒），用于识别试听片段
         :return: 歌曲下载链接
         """
-        try:
-            # 尝试多个方法获取歌曲URL
-            
-            # 方法1: 从歌曲详情获取
-            detail_url = f"https://music.163.com/api/v1/song/detail?ids=[{song_id}]"
-            detail_resp = self.session.get(detail_url, timeout=10)
-            detail_data = detail_resp.json()
-            
-            if detail_data.get('code') == 200 and detail_data.get('songs'):
-                song_detail = detail_data['songs'][0]
-                song_id = song_detail.get('id')
-                song_name = song_detail.get('name')
-                
-                # 方法2: 尝试从第三方API获取
-                third_party_urls = [
-                    f"https://autumnfish.cn/song/url?id={song_id}",
-                    f"https://netease-cloud-music-api-eta-tawny.vercel.app/song/url?id={song_id}",
-                    f"https://music.cyrilstudio.top/song/url?id={song_id}&br=320000"
-                ]
-                
-                for api_url in third_party_urls:
-                    try:
-                        resp = self.session.get(api_url, timeout=10)
-                        data = resp.json()
-                        
-                        if data.get('code') == 200 and data.get('data'):
-                            url = data['data'][0].get('url')
-                            if url and url.startswith('http'):
-                                # 验证URL返回的文件大小
-                                try:
-                                    head_resp = self.session.head(url, allow_redirects=True, timeout=10)
-                                    content_length = head_resp.headers.get('Content-Length', 0)
-                                    if int(content_length) > 1000000:  # 文件大于1MB才可能是有效的音乐文件
-                                        print(f"第三方API获取到有效URL，预计文件大小: {int(content_length)/1024/1024:.2f}MB")
-                                        return url
-                                except:
-                                    pass
-                    except Exception as e:
-                        print(f"尝试第三方API失败: {e}")
-                
-                # 方法3: 使用直接的URL模式
-                cdn_url = f"https://music.163.com/song/media/outer/url?id={song_id}.mp3"
-                try:
-                    # 尝试模拟浏览器访问
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.45 Safari/537.36',
-                        'Referer': 'https://music.163.com/'
-                    }
-                    head_resp = self.session.head(cdn_url, headers=headers, allow_redirects=True, timeout=10)
-                    final_url = head_resp.url
-                    
-                    # 检查重定向后的URL是否可能是有效的音乐
-                    if "m" in final_url and ".music.126.net" in final_url:
-                        content_length = head_resp.headers.get('Content-Length', 0)
-                        if int(content_length) > 1000000:
-                            print(f"CDN链接重定向到有效音乐URL: {final_url[:100]}...")
-                            return final_url
-                        else:
-                            print(f"CDN链接重定向后文件大小不足: {int(content_length)/1024:.2f}KB")
-                except Exception as e:
-                    print(f"检查CDN链接失败: {e}")
-                
-                # 方法4: 尝试通过其他API获取
-                api_url = f"https://music.163.com/api/song/enhance/download/url?id={song_id}&br=320000"
-                try:
-                    resp = self.session.get(api_url, timeout=10)
-                    data = resp.json()
-                    if data.get('code') == 200 and data.get('data') and data['data'].get('url'):
-                        dl_url = data['data']['url']
-                        print(f"通过官方下载API获取到URL: {dl_url[:100]}...")
-                        return dl_url
-                except Exception as e:
-                    print(f"通过官方下载API获取失败: {e}")
-            
-            print("所有备用方法都已尝试，未能获取有效下载链接")
-            return None
-                
-        except Exception as e:
-            print(f"获取备用下载链接出错: {e}")
+        cached = self.url_cache.get('netease', song_id, 0)
+        if cached is not None:
+            if cached.url:
+                print(f"使用缓存的备用链接: {song_id}")
+            return cached.url
+        
+        url = self._resolve_alt_song_url(song_id, duration)
+        if url:
+            info = self.url_cache.get_url_info(url)
+            if info is not None:
+                self.url_cache.put('netease', song_id, 0, url, info.content_length, info.content_type)
+            else:
+                self.url_cache.put('netease', song_id, 0, url)
+        else:
+            self.url_cache.put('netease', song_id, 0, None)
+        return url
+    
+    def _resolve_alt_song_url(self, song_id, duration=None):
+        """
+        对冲请求各个备用接口获取歌曲下载链接
+        按历史响应时间从快到慢依次发起请求，前一个接口在预期时间内没有结果时同时请求下一个，
+        返回最先得到的有效链接；熔断器断开的接口会被暂时跳过
+        :param song_id: 歌曲ID
+        :param duration: 歌曲时长（秒），用于识别试听片段
+        :return: 歌曲下载链接
+        """
+        endpoints = self._get_alt_endpoints(song_id, duration)
+        names = self.endpoint_health.rank(list(endpoints))
+        if not names:
+            print("所有备用接口都暂时不可用")
             return None
+        
+        def resolve(name):
+            # 熔断器半开时只有一个请求可以探测该接口
+            if not self.endpoint_health.allow_request(name):
+                return None
+            start = time.time()
+            try:
+                url = endpoints[name]()
+            except Exception as e:
+                print(f"备用接口 {name} 请求失败: {e}")
+                self.endpoint_health.record_failure(name, e)
+                return None
+            # 接口正常响应，即使没有该歌曲的链接也记为成功
+            self.endpoint_health.record_success(name, time.time() - start)
+            return url
+        
+        name, url = hedged_first(names, resolve, self.endpoint_health.get_hedge_delay, timeout=self.ALT_URL_TIMEOUT)
+        if url:
+            print(f"备用接口 {name} 获取到链接: {url[:100]}...")
+            return url
+        
+        print("所有备用方法都已尝试，未能获取有效下载链接")
+        return None
+    
+    def _get_alt_endpoints(self, song_id, duration=None):
+        """
+        获取备用接口
+        :param song_id: 歌曲ID
+        :param duration: 歌曲时长（秒），用于识别试听片段
+        :return: {接口名称: 获取链接的函数}，函数在接口异常时抛出异常，没有链接时返回None
+        """
+        endpoints = {}
+        for mirror in self.mirror_urls:
+            host = urlparse(mirror).netloc
+            endpoints[host] = lambda mirror=mirror: self._get_mirror_url(mirror.format(id=song_id), duration)
+        endpoints['music.163.com/outer'] = lambda: self._get_outer_url(song_id, duration)
+        endpoints['music.163.com/download'] = lambda: self._get_download_api_url(song_id)
+        return endpoints
+    
+    def _get_mirror_url(self, api_url, duration=None):
+        """通过第三方API获取链接"""
+        resp = self.session.get(api_url, timeout=10)
+        resp.raise_for_status()
+        data = resp.json()
+        
+        if data.get('code') == 200 and data.get('data'):
+            url = data['data'][0].get('url')
+            if url and url.startswith('http'):
+                # 按歌曲时长和比特率验证URL返回的文件大小
+                info = self._probe_url(url)
+                if info is None:
+                    return None
+                reason = AudioVerifier.check_link(info.content_length, info.content_type, duration,
+                                                  data['data'][0].get('br'))
+                if reason:
+                    print(f"第三方API返回的链接不可用: {reason}")
+                    return None
+                print(f"第三方API获取到有效URL，预计文件大小: {info.content_length/1024/1024:.2f}MB")
+                return url
+        return None
+    
+    def _get_outer_url(self, song_id, duration=None):
+        """通过外链重定向获取CDN链接"""
+        cdn_url = f"{self.alt_song_url_api}?id={song_id}.mp3"
+        # 模拟从网页访问，User-Agent由User-Agent池按主机选取
+        headers = {
+            'Referer': 'https://music.163.com/'
+        }
+        head_resp = self.session.head(cdn_url, headers=headers, allow_redirects=True, timeout=10)
+        final_url = head_resp.url
+        
+        # 检查重定向后的URL是否可能是有效的音乐
+        if "m" in final_url and ".music.126.net" in final_url:
+            content_length = int(head_resp.headers.get('Content-Length', 0))
+            content_type = head_resp.headers.get('Content-Type', '')
+            reason = AudioVerifier.check_link(content_length, content_type, duration)
+            if not reason:
+                print(f"CDN链接重定向到有效音乐URL: {final_url[:100]}...")
+                self.url_cache.put_url_info(final_url, content_length, content_type)
+                return final_url
+            print(f"CDN链接重定向后不可用: {reason}")
+        return None
+    
+    def _get_download_api_url(self, song_id):
+        """通过官方下载API获取链接"""
+        resp = self.session.get(f"{self.download_url_api}?id={song_id}&br=320000", timeout=10)
+        resp.raise_for_status()
+        data = resp.json()
+        if data.get('code') == 200 and data.get('data') and data['data'].get('url'):
+            dl_url = data['data']['url']
+            print(f"通过官方下载API获取到URL: {dl_url[:100]}...")
+            return dl_url
+        return None
     
     def get_song_detail(self, song_id):
         """
@@ -343,11 +463,16 @@ class NeteaseAPI(MusicAPI):
             traceback.print_exc()
             return {}
     
-    def download(self, song_id, save_path):
+    def download(self, song_id, save_path, progress_callback=None, duration=None, is_cancelled=None,
+                 host_slot=None):
         """
         下载歌曲
         :param song_id: 歌曲ID (song_id|max_br)
         :param save_path: 保存路径
+        :param progress_callback: 进度回调 (已下载字节数, 总字节数)
+        :param duration: 搜索结果中的歌曲时长（秒），用于识别试听片段
+        :param is_cancelled: 返回是否已取消的函数，取消时抛出DownloadCancelled
+        :param host_slot: 传输期间占用下载主机名额的函数，见 MusicAPI._download_file
         :return: 保存路径
         """
         try:
@@ -359,46 +484,47 @@ class NeteaseAPI(MusicAPI):
                 # 默认使用320kbps
                 max_br = 320000
             
-            # 获取下载链接 - 尝试不同的比特率
-            url = None
-            bit_rates = [320000, 192000, 128000]  # 从高到低尝试不同比特率
+            # 获取下载链接 - 各比特率同时解析，按从高到低选择第一个有效链接
+            bit_rates = [br for br in (320000, 192000, 128000) if br <= max_br]
+            # 无法验证的链接，作为备选
+            unverified = []
             
-            for br in bit_rates:
-                try:
-                    # 如果请求的比特率高于当前尝试的比特率，降级
-                    if br > max_br:
-                        continue
-                        
-                    temp_url = self.get_song_url(song_id, br)
-                    if not temp_url:
-                        continue
-                        
-                    # 验证URL返回的文件大小
-                    try:
-                        head_resp = self.session.head(temp_url, allow_redirects=True, timeout=10)
-                        content_length = int(head_resp.headers.get('Content-Length', 0))
-                        content_type = head_resp.headers.get('Content-Type', '')
-                        
-                        # 检查是否是有效的音频文件
-                        is_audio = 'audio' in content_type or 'octet-stream' in content_type
-                        
-                        if content_length > 1000000 or (is_audio and content_length > 100000):
-                            print(f"找到有效下载链接 (br={br/1000:.0f}K): {temp_url[:100]}...")
-                            url = temp_url
-                            break
-                        else:
-                            print(f"比特率 {br/1000:.0f}K 的链接文件太小 ({content_length/1024:.2f}KB)，尝试较低比特率")
-                    except Exception as e:
-                        print(f"验证URL时出错: {e}")
-                        # 即使验证失败，也存储这个URL作为备选
-                        if not url:
-                            url = temp_url
-                except Exception as e:
-                    print(f"获取比特率 {br/1000:.0f}K 的URL时出错: {e}")
+            def resolve(br):
+                temp_url = self._resolve_song_url(song_id, br, duration)
+                if not temp_url:
+                    return None
+                
+                # 验证URL返回的文件大小（与获取链接时共享HEAD结果）
+                info = self._probe_url(temp_url)
+                if info is None:
+                    print(f"验证URL时出错")
+                    unverified.append((br, temp_url))
+                return temp_url, info, br
+            
+            def accept(result):
+                if result is None or result[1] is None:
+                    return False
+                info = result[1]
+                # 按内容类型、歌曲时长和比特率检查文件大小，识别网页和试听片段
+                reason = AudioVerifier.check_link(info.content_length, info.content_type, duration, result[2])
+                if reason:
+                    print(f"{reason}，尝试较低比特率")
+                    return False
+                return True
+            
+            br, result = first_acceptable(bit_rates, resolve, accept)
+            if result is not None:
+                url = result[0]
+                print(f"找到有效下载链接 (br={br/1000:.0f}K): {url[:100]}...")
+            elif unverified:
+                # 即使验证失败，也使用比特率最高的链接作为备选
+                url = max(unverified)[1]
+            else:
+                url = None
             
             # 如果还是没有找到有效URL，尝试使用备用方法
             if not url:
-                url = self._get_alt_song_url(song_id)
+                url = self._get_alt_song_url(song_id, duration)
                 
             # 如果所有方法都失败
             if not url:
@@ -411,93 +537,43 @@ class NeteaseAPI(MusicAPI):
             if not os.path.exists(os.path.dirname(save_path)):
                 os.makedirs(os.path.dirname(save_path))
             
-            # 下载文件
+            # 下载文件，数据先写入.part临时文件，重试时从断点继续；内容在下载过程中校验
+            headers = {
+                'Accept': '*/*',
+                'Referer': 'https://music.163.com/'
+            }
             try:
-                # 添加重试机制
-                max_retries = 3
-                for retry in range(max_retries):
-                    try:
-                        headers = {
-                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                            'Accept': '*/*',
-                            'Referer': 'https://music.163.com/'
-                        }
-                        
-                        with self.session.get(url, headers=headers, stream=True, timeout=30) as response:
-                            response.raise_for_status()
-                            total_size = int(response.headers.get('Content-Length', 0))
-                            print(f"文件大小: {total_size} 字节")
-                            
-                            if total_size < 1000000 and total_size > 0:  # 小于1MB且大于0的可能不是完整音乐文件
-                                print(f"警告: 下载的文件可能不完整，大小仅有 {total_size/1024:.2f}KB")
-                                if retry < max_retries - 1:
-                                    # 如果还有重试机会，尝试使用备用方法获取新URL
-                                    alt_url = self._get_alt_song_url(song_id)
-                                    if alt_url and alt_url != url:
-                                        url = alt_url
-                                        print(f"尝试使用备用链接: {url[:100]}...")
-                                        continue
-                            
-                            with open(save_path, 'wb') as f:
-                                downloaded = 0
-                                for chunk in response.iter_content(chunk_size=8192):
-                                    if chunk:
-                                        f.write(chunk)
-                                        downloaded += len(chunk)
-                                
-                                print(f"下载完成，文件大小: {downloaded} 字节")
-                            
-                            # 如果下载成功，跳出重试循环
-                            break
-                    except Exception as e:
-                        print(f"下载尝试 {retry+1}/{max_retries} 失败: {e}")
-                        if retry == max_retries - 1:  # 如果是最后一次尝试
-                            raise
-                        time.sleep(1)  # 等待1秒后重试
-                
-                # 检查文件大小，如果小于10KB可能是无效的
-                if os.path.exists(save_path):
-                    file_size = os.path.getsize(save_path)
-                    
-                    if file_size < 10 * 1024:
-                        print(f"下载的文件过小，可能是无效的: {save_path}")
-                        os.remove(save_path)
-                        
-                        # 最后尝试一次备用下载
-                        backup_url = self._get_alt_song_url(song_id)
-                        if backup_url and backup_url != url:
-                            print(f"尝试使用最终备用链接下载: {backup_url[:100]}...")
-                            with self.session.get(backup_url, headers=headers, stream=True, timeout=30) as response:
-                                response.raise_for_status()
-                                with open(save_path, 'wb') as f:
-                                    for chunk in response.iter_content(chunk_size=8192):
-                                        if chunk:
-                                            f.write(chunk)
+                try:
+                    downloaded = self._download_file(url, save_path, headers=headers, timeout=30,
+                                                     progress_callback=progress_callback, is_cancelled=is_cancelled,
+                                                     expected_duration=duration, host_slot=host_slot)
+                except InvalidAudio:
+                    # 链接返回的不是完整的音频（网页、试听片段等），换用备用链接
+                    self.url_cache.invalidate_url(url)
+                    backup_url = self._get_alt_song_url(song_id, duration)
+                    if not backup_url or backup_url == url:
+                        return None
+                    url = backup_url
+                    print(f"尝试使用备用链接下载: {url[:100]}...")
+                    downloaded = self._download_file(url, save_path, headers=headers, timeout=30,
+                                                     progress_callback=progress_callback, is_cancelled=is_cancelled,
+                                                     expected_duration=duration, host_slot=host_slot)
+                print(f"下载完成，文件大小: {downloaded} 字节")
+            except DownloadCancelled:
+                raise
             except Exception as e:
                 print(f"下载过程出错: {e}")
-                # 如果文件存在但可能不完整，删除它
-                if os.path.exists(save_path):
-                    os.remove(save_path)
+                # 链接可能已过期，不再使用缓存
+                self.url_cache.invalidate_url(url)
+                # 已下载的部分保留在.part文件中，下次下载时从断点继续；
+                # 保存路径只会是下载完成的文件（可能是曲库中已有的文件），不能删除
                 return None
             
-            # 最终检查
-            if os.path.exists(save_path):
-                file_size = os.path.getsize(save_path)
-                if file_size > 1000000:  # 大于1MB的文件可能是有效的音乐
-                    print(f"下载完成: {save_path}")
-                    return save_path
-                elif file_size > 100 * 1024:  # 大于100KB的文件可能是有效的短音乐
-                    print(f"下载完成(小文件): {save_path}")
-                    return save_path
-                else:
-                    print(f"下载失败或文件无效: {save_path}")
-                    if os.path.exists(save_path):
-                        os.remove(save_path)
-                    return None
-            else:
-                print(f"下载失败，文件不存在: {save_path}")
-                return None
+            print(f"下载完成: {save_path}")
+            return save_path
             
+        except DownloadCancelled:
+            raise
         except Exception as e:
             print(f"下载网易云音乐出错: {e}")
             return None
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.utils.retry_policy import RetryPolicy
+
+
+class TokenBucket:
+    """
+    令牌桶限速器
+    按固定速率生成令牌，桶满时最多允许 capacity 个请求突发，
+    收到限流响应时可以暂停发放令牌
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        :param rate: 每秒生成的令牌数
+        :param capacity: 桶容量
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.time()
+        self.paused_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """补充令牌（调用方需持有锁）"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """获取一个令牌，没有令牌时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.time()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(min(max(wait_time, 0.01), 1.0))
+
+    def set_rate(self, rate):
+        """调整令牌生成速率"""
+        with self._lock:
+            self._refill(time.time())
+            self.rate = float(rate)
+
+    def pause(self, seconds):
+        """在指定时间内暂停发放令牌，例如服务器返回了 Retry-After"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.time() + seconds)
+            self.tokens = 0
+
+
+class AIMDLimiter:
+    """
+    加性增、乘性减（AIMD）并发控制
+    请求正常时并发上限缓慢增加，出现限流、服务器错误或响应变慢时减半
+    """
+
+    # 两次减半之间的最小间隔（秒），同一次拥塞导致的多个失败只减半一次
+    DECREASE_INTERVAL = 1.0
+
+    def __init__(self, initial, minimum, maximum):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._last_decrease = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """获取一个并发名额，达到上限时阻塞等待"""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self):
+        """释放并发名额"""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def increase(self):
+        """加性增：每个并发窗口的请求都成功后上限加1"""
+        with self._cond:
+            old_limit = int(self.limit)
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            if int(self.limit) > old_limit:
+                self._cond.notify_all()
+
+    def decrease(self):
+        """
+        乘性减：并发上限减半
+        :return: 是否实际减小
+        """
+        now = time.time()
+        with self._cond:
+            if now - self._last_decrease < self.DECREASE_INTERVAL:
+                return False
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit / 2)
+            return True
+
+
+class HostThrottle:
+    """单个主机的限速和并发控制"""
+
+    # 响应时间超过基准的多少倍视为拥塞
+    LATENCY_FACTOR = 3.0
+    # 低于该响应时间（秒）时不视为拥塞
+    LATENCY_FLOOR = 1.0
+    # 限流时速率最低降到配置值的比例
+    MIN_RATE_RATIO = 0.1
+    # 每次成功后速率恢复配置值的比例
+    RATE_RECOVERY = 0.05
+
+    def __init__(self, host, rate, capacity, concurrency):
+        self.host = host
+        self.max_rate = float(rate)
+        self.bucket = TokenBucket(rate, capacity)
+        self.limiter = AIMDLimiter(*concurrency)
+        self.baseline_latency = None
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """发送请求前调用：先获取令牌，再获取并发名额"""
+        self.bucket.acquire()
+        self.limiter.acquire()
+
+    def release(self):
+        """请求结束（已收到响应头或出错）后调用"""
+        self.limiter.release()
+
+    def on_success(self, latency):
+        """
+        请求成功
+        :param latency: 收到响应头所用的时间（秒）
+        """
+        with self._lock:
+            self.requests += 1
+            if self.baseline_latency is None:
+                self.baseline_latency = latency
+            else:
+                # 基准取最近的较小值，并缓慢上浮以适应网络变化
+                self.baseline_latency = min(self.baseline_latency * 1.05, latency)
+            congested = latency > max(self.LATENCY_FLOOR, self.baseline_latency * self.LATENCY_FACTOR)
+
+        if congested:
+            self.limiter.decrease()
+            return
+
+        self.limiter.increase()
+        if self.bucket.rate < self.max_rate:
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.max_rate * self.RATE_RECOVERY))
+
+    def on_congestion(self, retry_after=None):
+        """
+        收到限流(429)、服务器过载(5xx)或超时
+        :param retry_after: 服务器要求的等待时间（秒）
+        """
+        with self._lock:
+            self.requests += 1
+            self.throttled += 1
+        if self.limiter.decrease():
+            self.bucket.set_rate(max(self.max_rate * self.MIN_RATE_RATIO, self.bucket.rate / 2))
+            print(f"主机 {self.host} 出现拥塞，并发上限降为 {int(self.limiter.limit)}，速率降为 {self.bucket.rate:.2f}/秒")
+        if retry_after:
+            self.bucket.pause(retry_after)
+
+    def get_stats(self):
+        """获取统计信息"""
+        with self._lock:
+            return {
+                'rate': self.bucket.rate,
+                'concurrency_limit': int(self.limiter.limit),
+                'in_flight': self.limiter.in_flight,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'baseline_latency': self.baseline_latency,
+            }
+
+
+class RateLimiter:
+    """
+    按主机的令牌桶限速和AIMD并发控制
+    所有API共享同一个实例，使同一主机的请求总量不超过可持续的速率
+    """
+
+    # (每秒请求数, 突发容量)，以"."开头的表示域名后缀
+    HOST_RATES = {
+        'music.163.com': (5, 10),
+        'music-api.gdstudio.xyz': (4, 8),
+        '.music.126.net': (20, 40),
+    }
+    DEFAULT_RATE = (10, 20)
+    # (初始并发, 最小并发, 最大并发)
+    CONCURRENCY = (8, 1, 32)
+
+    # 视为拥塞的状态码
+    CONGESTION_STATUS = (429, 502, 503, 504)
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        """获取主机的限速器"""
+        with self._lock:
+            throttle = self._hosts.get(host)
+            if throttle is None:
+                rate, capacity = self._get_rate(host)
+                throttle = self._hosts[host] = HostThrottle(host, rate, capacity, self.CONCURRENCY)
+            return throttle
+
+    def _get_rate(self, host):
+        """查找主机的速率配置"""
+        hostname = host.split(':')[0]
+        if hostname in self.HOST_RATES:
+            return self.HOST_RATES[hostname]
+        for pattern, rate in self.HOST_RATES.items():
+            if pattern.startswith('.') and hostname.endswith(pattern):
+                return rate
+        return self.DEFAULT_RATE
+
+    def get_stats(self):
+        """
+        获取各主机的限速状态
+        :return: {主机: 统计字典}
+        """
+        with self._lock:
+            hosts = list(self._hosts.items())
+        return {host: throttle.get_stats() for host, throttle in hosts}
+
+
+class ThrottledSession(requests.Session):
+    """
+    经过按主机限速的请求会话，所有 get/head/request 调用都会经过限速器
+    指定User-Agent池且会话本身没有User-Agent时，按请求的主机从池中选取
+    """
+
+    def __init__(self, rate_limiter, user_agents=None):
+        super().__init__()
+        self.rate_limiter = rate_limiter
+        self.user_agents = user_agents
+
+    def request(self, method, url, *args, **kwargs):
+        host = urlparse(url).netloc
+        if self.user_agents is not None and 'User-Agent' not in self.headers:
+            headers = CaseInsensitiveDict(kwargs.get('headers') or {})
+            if 'User-Agent' not in headers:
+                headers['User-Agent'] = self.user_agents.get(host)
+                kwargs['headers'] = headers
+
+        throttle = self.rate_limiter.get(host)
+        throttle.acquire()
+        start = time.time()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            throttle.release()
+            throttle.on_congestion()
+            raise
+        except Exception:
+            throttle.release()
+            raise
+
+        # 流式下载在收到响应头后即释放并发名额，响应体的读取不计入
+        throttle.release()
+        if response.status_code in RateLimiter.CONGESTION_STATUS:
+            throttle.on_congestion(RetryPolicy.parse_retry_after(response.headers.get('Retry-After')))
+        elif response.status_code < 500:
+            throttle.on_success(time.time() - start)
+        return response
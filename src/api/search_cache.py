@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from src.utils.tools import Tools
+
+
+class SearchCache:
+    """
+    搜索结果缓存
+    按 (平台, 音源, 关键词, 页码, 每页数量) 缓存搜索结果，
+    内存中为LRU缓存，同时持久化到SQLite，均按过期时间和容量淘汰
+    """
+
+    DEFAULT_TTL = 6 * 60 * 60
+    MAX_MEMORY_ENTRIES = 256
+    MAX_DISK_ENTRIES = 5000
+    DB_FILENAME = 'search_cache.db'
+
+    def __init__(self, db_path=None, ttl=None, max_memory_entries=None, max_disk_entries=None):
+        """
+        初始化搜索缓存
+        :param db_path: SQLite数据库路径，默认保存在应用数据目录
+        :param ttl: 缓存有效期（秒）
+        :param max_memory_entries: 内存中最多缓存的条目数
+        :param max_disk_entries: 磁盘中最多缓存的条目数
+        """
+        self.db_path = db_path
+        self.ttl = ttl if ttl is not None else self.DEFAULT_TTL
+        self.max_memory_entries = max_memory_entries or self.MAX_MEMORY_ENTRIES
+        self.max_disk_entries = max_disk_entries or self.MAX_DISK_ENTRIES
+
+        # key -> (结果JSON, 创建时间)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_disabled = False
+
+    @staticmethod
+    def make_key(platform, source, keyword, page, page_size):
+        """生成缓存键"""
+        return json.dumps([platform, source, keyword.strip(), int(page), int(page_size)], ensure_ascii=False)
+
+    def get(self, platform, source, keyword, page, page_size):
+        """
+        获取缓存的搜索结果
+        :return: 结果列表，未命中返回None
+        """
+        key = self.make_key(platform, source, keyword, page, page_size)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(key)
+                    return json.loads(value)
+                del self._memory[key]
+
+            row = self._disk_get(key, now)
+            if row is None:
+                return None
+            value, created_at = row
+            self._memory_put(key, value, created_at)
+            return json.loads(value)
+
+    def put(self, platform, source, keyword, page, page_size, result):
+        """缓存搜索结果，空结果不缓存"""
+        if not result:
+            return
+        key = self.make_key(platform, source, keyword, page, page_size)
+        value = json.dumps(result, ensure_ascii=False)
+        now = time.time()
+
+        with self._lock:
+            self._memory_put(key, value, now)
+            self._disk_put(key, value, now)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+            conn = self._get_conn()
+            if conn is not None:
+                try:
+                    conn.execute('DELETE FROM search_cache')
+                    conn.commit()
+                except sqlite3.Error as e:
+                    print(f"清空搜索缓存失败: {e}")
+
+    def _memory_put(self, key, value, created_at):
+        """写入内存LRU（调用方需持有锁）"""
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _get_conn(self):
+        """打开SQLite数据库（调用方需持有锁），失败时仅使用内存缓存"""
+        if self._conn is not None or self._disk_disabled:
+            return self._conn
+        try:
+            if not self.db_path:
+                self.db_path = os.path.join(Tools.get_app_data_dir(), self.DB_FILENAME)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS search_cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_search_cache_accessed ON search_cache (accessed_at)')
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"打开搜索缓存数据库失败: {e}，仅使用内存缓存")
+            self._conn = None
+            self._disk_disabled = True
+        return self._conn
+
+    def _disk_get(self, key, now):
+        """从磁盘读取（调用方需持有锁）"""
+        conn = self._get_conn()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute('SELECT value, created_at FROM search_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] >= self.ttl:
+                conn.execute('DELETE FROM search_cache WHERE key = ?', (key,))
+                conn.commit()
+                return None
+            conn.execute('UPDATE search_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            conn.commit()
+            return row
+        except sqlite3.Error as e:
+            print(f"读取搜索缓存失败: {e}")
+            return None
+
+    def _disk_put(self, key, value, now):
+        """写入磁盘并淘汰过期和多余的条目（调用方需持有锁）"""
+        conn = self._get_conn()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO search_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, value, now, now)
+            )
+            conn.execute('DELETE FROM search_cache WHERE created_at <= ?', (now - self.ttl,))
+            conn.execute(
+                'DELETE FROM search_cache WHERE key IN ('
+                'SELECT key FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_disk_entries,)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"写入搜索缓存失败: {e}")
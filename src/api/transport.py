@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from src.api.rate_limiter import ThrottledSession
+from src.utils.tools import Tools
+
+
+class Transport:
+    """
+    API共享的传输层
+    各后端的会话挂载同一个连接池适配器（按主机分池），GD音乐和作为备选的网易云API
+    访问同一主机时复用同一批连接；各后端只保留自己的请求头配置和Cookie。
+    连接池由所有后端共用，单个后端不应关闭或清除其中的连接池，出错的连接由urllib3自行丢弃
+    """
+
+    # 缓存的主机连接池数
+    POOL_CONNECTIONS = 10
+    # 每个主机连接池的最大连接数，需容纳并发下载任务的多个分段连接
+    POOL_MAXSIZE = 32
+
+    # 记录下载过的主机的文件名，保存在应用数据目录
+    HOSTS_FILENAME = 'warm_hosts.json'
+    # 最多记录的下载主机数
+    MAX_LEARNED_HOSTS = 8
+    # 预热连接的超时时间（秒）
+    WARM_UP_TIMEOUT = 5
+    # 同时预热的主机数
+    WARM_UP_WORKERS = 8
+    # 在该时间（秒）内预热过的主机不再重复预热
+    WARM_UP_INTERVAL = 60
+
+    # 所有后端共用的基本请求头，后端的请求头配置在此基础上覆盖
+    BASE_HEADERS = {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'zh-CN,zh;q=0.8,en-US;q=0.5,en;q=0.3',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    }
+
+    def __init__(self, rate_limiter, user_agents=None, pool_connections=None, pool_maxsize=None, hosts_path=None):
+        """
+        :param rate_limiter: 按主机的限速器
+        :param user_agents: User-Agent池，后端未指定User-Agent时按主机选取
+        :param pool_connections: 缓存的主机连接池数
+        :param pool_maxsize: 每个主机连接池的最大连接数
+        :param hosts_path: 记录下载主机的文件路径，默认保存在应用数据目录
+        """
+        self.rate_limiter = rate_limiter
+        self.user_agents = user_agents
+        self.pool_connections = pool_connections or self.POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or self.POOL_MAXSIZE
+        self.hosts_path = hosts_path
+        self._adapter = None
+        self._lock = threading.Lock()
+        # 下载过的主机（scheme://host），最近使用的在前，第一次使用时从文件加载
+        self._learned = None
+        # 各主机最近一次预热的时间
+        self._warmed = {}
+
+    @property
+    def adapter(self):
+        """共享的连接池适配器，第一次创建会话时创建"""
+        if self._adapter is None:
+            with self._lock:
+                if self._adapter is None:
+                    # 重试统一由 _safe_request 的重试策略负责，适配器本身不重试
+                    self._adapter = requests.adapters.HTTPAdapter(
+                        max_retries=0,
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize
+                    )
+        return self._adapter
+
+    def create_session(self, headers=None):
+        """
+        创建使用共享连接池的会话，会话的所有请求都经过按主机的限速和并发控制
+        :param headers: 后端的请求头配置，其中指定了User-Agent时不再从User-Agent池选取
+        :return: ThrottledSession
+        """
+        session = ThrottledSession(self.rate_limiter, self.user_agents)
+
+        # 去掉requests默认的User-Agent
+        del session.headers['User-Agent']
+        session.headers.update(self.BASE_HEADERS)
+        if headers:
+            session.headers.update(headers)
+
+        # 配置安全选项
+        session.verify = True  # 启用SSL证书验证
+
+        session.mount('http://', self.adapter)
+        session.mount('https://', self.adapter)
+        return session
+
+    @staticmethod
+    def _origin(url):
+        """获取链接的 scheme://host 部分，无法解析时返回None"""
+        parsed = urlparse(url or '')
+        if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+            return None
+        return f"{parsed.scheme}://{parsed.netloc.lower()}"
+
+    def _load_learned(self):
+        """读取记录的下载主机（调用方需持有锁）"""
+        if self._learned is not None:
+            return self._learned
+        self._learned = []
+        try:
+            if not self.hosts_path:
+                self.hosts_path = os.path.join(Tools.get_app_data_dir(), self.HOSTS_FILENAME)
+            if os.path.exists(self.hosts_path):
+                with open(self.hosts_path, encoding='utf-8') as f:
+                    self._learned = [host for host in json.load(f) if isinstance(host, str)][:self.MAX_LEARNED_HOSTS]
+        except (OSError, ValueError, TypeError) as e:
+            print(f"读取下载主机记录失败: {e}")
+        return self._learned
+
+    def remember_host(self, url):
+        """
+        记录下载链接的主机，下次启动和批量下载前预热到这些主机的连接
+        :param url: 下载链接
+        """
+        origin = self._origin(url)
+        if origin is None:
+            return
+        with self._lock:
+            learned = self._load_learned()
+            if learned and learned[0] == origin:
+                return
+            is_new = origin not in learned
+            if not is_new:
+                learned.remove(origin)
+            learned.insert(0, origin)
+            del learned[self.MAX_LEARNED_HOSTS:]
+            if not is_new:
+                # 只调整了顺序，不必每次下载都写文件
+                return
+            hosts = list(learned)
+        try:
+            with open(self.hosts_path, 'w', encoding='utf-8') as f:
+                json.dump(hosts, f)
+        except (OSError, TypeError) as e:
+            print(f"保存下载主机记录失败: {e}")
+
+    def learned_urls(self):
+        """获取记录的下载主机，最近使用的在前"""
+        with self._lock:
+            return list(self._load_learned())
+
+    def warm_up(self, session, urls):
+        """
+        预热连接：并发地向各主机发送HEAD请求，提前完成DNS解析、TCP连接和TLS握手，
+        连接在请求结束后留在共享的连接池中，之后的第一个请求可以直接复用
+        :param session: 发送请求的会话（使用本传输层创建）
+        :param urls: 需要预热的链接，同一主机只预热一次
+        :return: 成功预热的主机数
+        """
+        now = time.time()
+        origins = []
+        with self._lock:
+            for url in urls:
+                origin = self._origin(url)
+                if origin is None or origin in origins or now - self._warmed.get(origin, 0) < self.WARM_UP_INTERVAL:
+                    continue
+                self._warmed[origin] = now
+                origins.append(origin)
+        if not origins:
+            return 0
+
+        def connect(origin):
+            try:
+                session.head(origin + '/', allow_redirects=False, timeout=self.WARM_UP_TIMEOUT)
+                return True
+            except requests.exceptions.RequestException as e:
+                print(f"预热连接失败 {origin}: {e}")
+                with self._lock:
+                    self._warmed.pop(origin, None)
+                return False
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=min(self.WARM_UP_WORKERS, len(origins))) as executor:
+            warmed = sum(executor.map(connect, origins))
+        print(f"已预热 {warmed}/{len(origins)} 个主机的连接，耗时 {time.time() - start:.2f} 秒")
+        return warmed
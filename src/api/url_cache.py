@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+
+class ResolvedURL:
+    """已解析的下载链接"""
+
+    __slots__ = ('url', 'content_length', 'content_type', 'expires_at')
+
+    def __init__(self, url, content_length=None, content_type='', expires_at=0):
+        """
+        :param url: 下载链接，None表示解析失败（负缓存）
+        :param content_length: 文件大小，None表示未知（HEAD请求失败）
+        :param content_type: 内容类型
+        :param expires_at: 过期时间戳
+        """
+        self.url = url
+        self.content_length = content_length
+        self.content_type = content_type or ''
+        self.expires_at = expires_at
+
+    @property
+    def is_expired(self):
+        return time.time() >= self.expires_at
+
+
+class URLCache:
+    """
+    下载链接解析缓存
+    按 (音源, 歌曲ID, 比特率) 缓存解析出的链接及其 Content-Length / Content-Type，
+    同时按链接缓存HEAD结果，使同一首歌在各个获取链接的路径中只解析一次
+    """
+
+    # 网易云CDN链接有效期约20分钟
+    DEFAULT_TTL = 20 * 60
+    # 解析失败的结果只短暂缓存，避免同一次下载中重复探测
+    NEGATIVE_TTL = 60
+    # 在链接实际过期前提前失效，预留下载时间
+    EXPIRY_MARGIN = 60
+    MAX_ENTRIES = 2000
+
+    # CDN链接路径中的过期时间，例如 http://m701.music.126.net/20240512153045/...
+    _EXPIRY_PATTERN = re.compile(r'^/(\d{14})/')
+    # 网易云CDN的时间戳为北京时间
+    _CDN_TIMEZONE = timezone(timedelta(hours=8))
+
+    def __init__(self, ttl=None, negative_ttl=None):
+        self.ttl = ttl if ttl is not None else self.DEFAULT_TTL
+        self.negative_ttl = negative_ttl if negative_ttl is not None else self.NEGATIVE_TTL
+        self._entries = {}
+        self._url_info = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(source, song_id, br):
+        """
+        生成缓存键
+        :param source: 音源，如 netease
+        :param song_id: 歌曲ID（不含音源前缀和比特率后缀）
+        :param br: 比特率 (bps)，0表示备用方式获取的链接
+        """
+        return (str(source), str(song_id), int(br or 0))
+
+    def get(self, source, song_id, br):
+        """
+        获取缓存的解析结果
+        :return: ResolvedURL，未命中返回None；解析失败的负缓存返回url为None的ResolvedURL
+        """
+        key = self.make_key(source, song_id, br)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.is_expired:
+                del self._entries[key]
+                return None
+            return entry
+
+    def put(self, source, song_id, br, url, content_length=None, content_type='', ttl=None):
+        """
+        缓存解析结果
+        :return: 缓存的ResolvedURL
+        """
+        if url:
+            ttl = self._get_url_ttl(url, ttl)
+        else:
+            ttl = self.negative_ttl
+
+        entry = ResolvedURL(url, content_length, content_type, time.time() + ttl)
+        key = self.make_key(source, song_id, br)
+        with self._lock:
+            self._prune()
+            self._entries[key] = entry
+            if url and content_length is not None:
+                self._url_info[url] = entry
+        return entry
+
+    def get_url_info(self, url):
+        """
+        获取缓存的链接HEAD结果
+        :return: ResolvedURL，未命中返回None
+        """
+        with self._lock:
+            entry = self._url_info.get(url)
+            if entry is None:
+                return None
+            if entry.is_expired:
+                del self._url_info[url]
+                return None
+            return entry
+
+    def put_url_info(self, url, content_length, content_type='', ttl=None):
+        """缓存链接的HEAD结果"""
+        entry = ResolvedURL(url, content_length, content_type, time.time() + self._get_url_ttl(url, ttl))
+        with self._lock:
+            self._prune()
+            self._url_info[url] = entry
+        return entry
+
+    def invalidate_url(self, url):
+        """使某个链接相关的所有缓存失效，例如下载时链接已过期"""
+        if not url:
+            return
+        with self._lock:
+            self._url_info.pop(url, None)
+            for key in [key for key, entry in self._entries.items() if entry.url == url]:
+                del self._entries[key]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._url_info.clear()
+
+    def _get_url_ttl(self, url, ttl=None):
+        """根据链接中的过期时间计算缓存时长"""
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            match = self._EXPIRY_PATTERN.match(urlparse(url).path)
+            if match:
+                expires = datetime.strptime(match.group(1), '%Y%m%d%H%M%S').replace(tzinfo=self._CDN_TIMEZONE)
+                remaining = expires.timestamp() - time.time() - self.EXPIRY_MARGIN
+                ttl = max(0, min(ttl, remaining))
+        except ValueError:
+            pass
+        return ttl
+
+    def _prune(self):
+        """清理过期条目（调用方需持有锁）"""
+        if len(self._entries) + len(self._url_info) < self.MAX_ENTRIES:
+            return
+        now = time.time()
+        for store in (self._entries, self._url_info):
+            for key in [key for key, entry in store.items() if entry.expires_at <= now]:
+                del store[key]
+        # 仍然过多时丢弃最早过期的一半
+        for store in (self._entries, self._url_info):
+            if len(store) > self.MAX_ENTRIES // 2:
+                oldest = sorted(store, key=lambda k: store[k].expires_at)[:len(store) // 2]
+                for key in oldest:
+                    del store[key]
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import random
+import threading
+
+
+class UserAgentPool:
+    """
+    进程内共享的User-Agent池
+    第一次使用时从内置的列表文件加载一次，之后创建或刷新会话都不再读取数据；
+    按主机的轮换策略决定每个请求使用的User-Agent
+    """
+
+    # 内置的User-Agent列表文件（打包时随程序一起发布）
+    DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'user_agents.txt')
+
+    # 列表文件缺失或为空时使用的User-Agent
+    FALLBACK_USER_AGENTS = [
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/119.0',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    ]
+
+    # 轮换策略
+    # 固定：同一主机在进程内始终使用第一次随机选中的User-Agent，与会话的Cookie保持一致
+    STICKY = 'sticky'
+    # 轮换：每个请求依次使用下一个User-Agent
+    ROTATE = 'rotate'
+
+    # 各主机的轮换策略，以"."开头的表示域名后缀
+    HOST_POLICIES = {
+        'music.163.com': STICKY,
+        'music-api.gdstudio.xyz': STICKY,
+        '.music.126.net': ROTATE,
+    }
+    DEFAULT_POLICY = STICKY
+
+    def __init__(self, data_file=None):
+        """
+        :param data_file: User-Agent列表文件，不指定则使用内置文件
+        """
+        self.data_file = data_file or self.DATA_FILE
+        self._agents = None
+        # 固定策略下各主机选中的User-Agent
+        self._sticky = {}
+        # 轮换策略下各主机的下一个序号
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """读取列表文件（调用方需持有锁）"""
+        agents = []
+        try:
+            with open(self.data_file, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        agents.append(line)
+        except OSError as e:
+            print(f"读取User-Agent列表失败: {e}，使用默认值")
+        return agents or list(self.FALLBACK_USER_AGENTS)
+
+    @property
+    def agents(self):
+        """全部User-Agent，第一次访问时加载"""
+        if self._agents is None:
+            with self._lock:
+                if self._agents is None:
+                    self._agents = self._load()
+        return self._agents
+
+    def get_policy(self, host):
+        """查找主机的轮换策略"""
+        hostname = (host or '').split(':')[0]
+        if hostname in self.HOST_POLICIES:
+            return self.HOST_POLICIES[hostname]
+        for pattern, policy in self.HOST_POLICIES.items():
+            if pattern.startswith('.') and hostname.endswith(pattern):
+                return policy
+        return self.DEFAULT_POLICY
+
+    def get(self, host=None):
+        """
+        获取请求指定主机时使用的User-Agent
+        :param host: 主机名（可带端口），不指定则按默认策略
+        :return: User-Agent
+        """
+        agents = self.agents
+        host = host or ''
+        with self._lock:
+            if self.get_policy(host) == self.ROTATE:
+                index = self._cursors.get(host)
+                if index is None:
+                    index = random.randrange(len(agents))
+                self._cursors[host] = (index + 1) % len(agents)
+                return agents[index]
+
+            ua = self._sticky.get(host)
+            if ua is None:
+                ua = self._sticky[host] = random.choice(agents)
+            return ua
+
+    def rotate(self, host):
+        """
+        为固定策略的主机更换User-Agent，下一个请求起使用新的值
+        :param host: 主机名（可带端口）
+        """
+        agents = self.agents
+        host = host or ''
+        with self._lock:
+            old = self._sticky.pop(host, None)
+            if old is not None and len(agents) > 1:
+                self._sticky[host] = random.choice([ua for ua in agents if ua != old])
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+命令行入口 - 无需图形界面即可搜索和批量下载
+
+用法:
+    python -m src search 关键词 [--page 1] [--limit 30] [--pages N]
+    python -m src download ID [ID ...] [--output 目录]
+    python -m src download-list 列表文件 [--output 目录] [--async]
+
+本模块不会导入PyQt5，可在无图形界面的服务器上运行
+"""
+
+import os
+import sys
+import argparse
+
+from src.api.api_factory import APIFactory
+from src.utils.download_scheduler import DownloadScheduler
+from src.utils.tools import Tools
+
+
+DEFAULT_PLATFORM = 'GD音乐'
+
+
+def get_api(platform_name):
+    """
+    获取指定平台的API实例
+    :param platform_name: 平台名称
+    :return: API实例
+    """
+    factory = APIFactory()
+    api = factory.get_api(platform_name)
+    if api is None:
+        raise SystemExit(f"不支持的平台: {platform_name}，可选: {', '.join(factory.get_api_names())}")
+    return api
+
+
+def normalize_song_id(api, song_id):
+    """
+    规范化歌曲ID，GD音乐需要 "source:id" 格式
+    :param api: API实例
+    :param song_id: 用户输入的歌曲ID
+    :return: 规范化后的ID
+    """
+    song_id = str(song_id).strip()
+    if hasattr(api, 'current_source') and ':' not in song_id:
+        song_id = f"{api.current_source}:{song_id}"
+    return song_id
+
+
+def get_song_info(api, song_id):
+    """
+    获取用于生成文件名的歌曲信息
+    :param api: API实例
+    :param song_id: 规范化后的歌曲ID
+    :return: 歌曲信息字典 (name, singer)
+    """
+    raw_id = song_id.split('|', 1)[0].split(':', 1)[-1]
+    detail_api = api if hasattr(api, 'get_song_detail') else getattr(api, 'netease_api', None)
+    detail = {}
+    if detail_api is not None:
+        try:
+            detail = detail_api.get_song_detail(raw_id) or {}
+        except Exception as e:
+            print(f"获取歌曲详情失败: {e}")
+
+    name = detail.get('name') or raw_id
+    artists = detail.get('artists') or detail.get('ar') or []
+    singer = '/'.join(artist.get('name', '') for artist in artists if isinstance(artist, dict))
+    return {'id': song_id, 'name': name, 'singer': singer}
+
+
+def read_list_file(list_file):
+    """
+    读取下载列表文件
+    每行一首歌曲: "ID" 或 "ID<Tab>歌曲名<Tab>歌手"，以#开头的行为注释
+    :param list_file: 列表文件路径
+    :return: [(song_id, name, singer), ...]
+    """
+    entries = []
+    with open(list_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = [part.strip() for part in line.split('\t')]
+            song_id = parts[0]
+            name = parts[1] if len(parts) > 1 else ''
+            singer = parts[2] if len(parts) > 2 else ''
+            entries.append((song_id, name, singer))
+    return entries
+
+
+def cmd_search(args):
+    """搜索歌曲并打印结果"""
+    api = get_api(args.platform)
+    if args.pages == 1:
+        result = api.search(args.keyword, args.page, args.limit)
+    else:
+        # 并发获取多页并合并去重，0表示获取到没有更多结果为止
+        result = api.search_pages(args.keyword, args.pages or None, args.limit)
+    if not result:
+        print("未找到相关歌曲")
+        return 1
+
+    for song in result:
+        duration = Tools.format_time(song.get('duration', 0))
+        print(f"{song.get('id')}\t{song.get('name')}\t{song.get('singer')}\t{song.get('album', '')}\t{duration}\t{song.get('quality', '')}")
+    return 0
+
+
+def run_downloads(api, songs, output, workers):
+    """
+    通过调度器并发下载歌曲
+    :param api: API实例
+    :param songs: 歌曲信息列表，需包含 id/name/singer
+    :param output: 下载目录
+    :param workers: 并发数
+    :return: 退出码
+    """
+    output = Tools.ensure_dir(output)
+    library = api.library_index
+    library.scan(output)
+    scheduler = DownloadScheduler(
+        max_workers=workers,
+        library=library,
+        on_job_finished=lambda job: print(f"下载完成: {job.result_path}"),
+        on_job_failed=lambda job: print(f"下载失败: {job.song.get('name')} ({job.song_id}): {job.error}"),
+    )
+    for priority, song in enumerate(songs):
+        save_path = os.path.join(output, Tools.generate_filename(song))
+        scheduler.add_job(api, song['id'], save_path, priority=priority, song=song)
+
+    scheduler.start()
+    scheduler.wait()
+
+    print(f"下载结束: 成功 {scheduler.finished_count}/{len(songs)}（其中 {scheduler.skipped_count} 首已存在），失败 {scheduler.failed_count}，取消 {scheduler.cancelled_count}")
+    return 0 if scheduler.failed_count == 0 else 1
+
+
+def run_async_downloads(platform_name, songs, output, workers):
+    """
+    通过异步API在单个事件循环线程中并发下载歌曲
+    :param platform_name: 平台名称
+    :param songs: 歌曲信息列表，需包含 id/name/singer
+    :param output: 下载目录
+    :param workers: 并发数
+    :return: 退出码
+    """
+    # 只有异步下载才需要aiohttp，避免每次启动命令行都加载
+    import asyncio
+    from src.api import async_api
+
+    if not async_api.is_available():
+        raise SystemExit("异步下载需要安装aiohttp: pip install aiohttp")
+    api = async_api.create_async_api(platform_name)
+    if api is None:
+        raise SystemExit(f"平台 {platform_name} 不支持异步下载")
+
+    output = Tools.ensure_dir(output)
+    jobs = [(song['id'], os.path.join(output, Tools.generate_filename(song))) for song in songs]
+
+    async def run():
+        try:
+            return await api.download_many(jobs, workers)
+        finally:
+            await api.close()
+            await async_api.AsyncMusicAPI.close_connector()
+
+    results = asyncio.run(run())
+    failed = 0
+    for song, result in zip(songs, results):
+        if result:
+            print(f"下载完成: {result}")
+        else:
+            failed += 1
+            print(f"下载失败: {song.get('name')} ({song['id']})")
+
+    print(f"下载结束: 成功 {len(songs) - failed}/{len(songs)}，失败 {failed}")
+    return 0 if failed == 0 else 1
+
+
+def start_downloads(args, api, songs):
+    """按命令行参数选择同步或异步方式下载"""
+    if args.use_async:
+        return run_async_downloads(args.platform, songs, args.output, args.workers)
+    return run_downloads(api, songs, args.output, args.workers)
+
+
+def cmd_download(args):
+    """按歌曲ID下载"""
+    api = get_api(args.platform)
+    songs = [get_song_info(api, normalize_song_id(api, song_id)) for song_id in args.ids]
+    return start_downloads(args, api, songs)
+
+
+def cmd_download_list(args):
+    """按列表文件下载"""
+    api = get_api(args.platform)
+    songs = []
+    for song_id, name, singer in read_list_file(args.list_file):
+        song_id = normalize_song_id(api, song_id)
+        if name:
+            songs.append({'id': song_id, 'name': name, 'singer': singer})
+        else:
+            songs.append(get_song_info(api, song_id))
+
+    if not songs:
+        print("列表文件中没有歌曲")
+        return 1
+    return start_downloads(args, api, songs)
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog='python -m src', description='音乐下载器命令行工具')
+    parser.add_argument('--platform', default=DEFAULT_PLATFORM, help=f'音乐平台 (默认: {DEFAULT_PLATFORM})')
+    subparsers = parser.add_subparsers(dest='command')
+
+    search_parser = subparsers.add_parser('search', help='搜索歌曲')
+    search_parser.add_argument('keyword', help='搜索关键词')
+    search_parser.add_argument('--page', type=int, default=1, help='页码')
+    search_parser.add_argument('--limit', type=int, default=30, help='每页数量')
+    search_parser.add_argument('--pages', type=int, default=1, help='从第1页起获取的页数，0表示全部 (忽略--page)')
+    search_parser.set_defaults(func=cmd_search)
+
+    download_parser = subparsers.add_parser('download', help='按歌曲ID下载')
+    download_parser.add_argument('ids', nargs='+', help='歌曲ID，可带 |比特率 后缀')
+    download_parser.set_defaults(func=cmd_download)
+
+    list_parser = subparsers.add_parser('download-list', help='按列表文件下载')
+    list_parser.add_argument('list_file', help='列表文件路径')
+    list_parser.set_defaults(func=cmd_download_list)
+
+    for sub in (download_parser, list_parser):
+        sub.add_argument('-o', '--output', default=os.path.join(os.getcwd(), 'downloads'), help='下载目录')
+        sub.add_argument('-j', '--workers', type=int, default=DownloadScheduler.DEFAULT_MAX_WORKERS, help='并发下载数')
+        sub.add_argument('--async', dest='use_async', action='store_true',
+                         help='使用异步API在单个线程中并发下载（需要aiohttp）')
+
+    return parser
+
+
+def main(argv=None):
+    """命令行主函数"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return 2
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
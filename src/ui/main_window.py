@@ -5,151 +5,22 @@ import os
 import sys
 import platform
 import subprocess
-import requests
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QLabel, QLineEdit, QPushButton, QComboBox, 
-                            QTableWidget, QTableWidgetItem, QHeaderView, 
+                            QTableView, QAbstractItemView, QHeaderView, 
                             QFileDialog, QMessageBox, QApplication, QProgressBar,
                             QStatusBar, QDesktopWidget, QRadioButton, QCheckBox)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QIcon, QFont, QColor
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QIcon, QFont
 
 from src.api.api_factory import APIFactory
 from src.api.base_api import MusicAPI
-from src.ui.threads import SearchThread, DownloadThread
+from src.ui.threads import (SearchThread, MultiPageSearchThread, PageFetchThread, DownloadThread,
+                             BatchDownloadThread, WarmUpThread)
+from src.ui.result_model import ResultTableModel
 from src.utils.tools import Tools
-
-
-class SearchThread(QThread):
-    """搜索线程"""
-    # 定义信号
-    result_signal = pyqtSignal(list)
-    error_signal = pyqtSignal(str)
-    
-    def __init__(self, api, keyword):
-        super().__init__()
-        self.api = api
-        self.keyword = keyword
-    
-    def run(self):
-        try:
-            result = self.api.search(self.keyword)
-            self.result_signal.emit(result)
-        except Exception as e:
-            self.error_signal.emit(str(e))
-
-
-class DownloadThread(QThread):
-    """下载线程"""
-    # 定义信号
-    progress_signal = pyqtSignal(int)
-    finished_signal = pyqtSignal(str)
-    error_signal = pyqtSignal(str)
-    
-    def __init__(self, api, song_id, save_path):
-        super().__init__()
-        self.api = api
-        self.song_id = song_id
-        self.save_path = save_path
-    
-    def run(self):
-        try:
-            print(f"下载线程启动: 歌曲ID = {self.song_id}")
-            
-            # 先获取URL
-            url = self.api.get_song_url(self.song_id)
-            if not url:
-                self.error_signal.emit("无法获取歌曲下载链接，请尝试其他音源")
-                return
-            
-            print(f"获取到下载URL: {url[:100]}...")
-            
-            # 发送初始进度
-            self.progress_signal.emit(5)
-            
-            # 创建目录
-            save_dir = os.path.dirname(self.save_path)
-            if not os.path.exists(save_dir):
-                os.makedirs(save_dir)
-                print(f"创建下载目录: {save_dir}")
-            
-            # 使用requests下载
-            try:
-                session = requests.Session()
-                session.headers.update({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36',
-                })
-                
-                # 先检查URL可用性
-                head_resp = session.head(url, timeout=5)
-                if head_resp.status_code >= 400:
-                    print(f"URL检查失败，状态码: {head_resp.status_code}")
-                    raise Exception(f"下载链接无效，状态码: {head_resp.status_code}")
-                
-                # 获取文件大小
-                content_length = int(head_resp.headers.get('Content-Length', 0))
-                print(f"文件大小: {content_length} 字节")
-                
-                # 开始下载
-                with session.get(url, stream=True, timeout=30) as response:
-                    response.raise_for_status()
-                    
-                    # 获取总大小
-                    total_size = int(response.headers.get('Content-Length', 0))
-                    if total_size == 0:
-                        total_size = content_length
-                    
-                    # 已下载的大小
-                    downloaded = 0
-                    
-                    with open(self.save_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                                downloaded += len(chunk)
-                                
-                                # 计算进度
-                                if total_size > 0:
-                                    progress = int(min(downloaded / total_size * 100, 100))
-                                    self.progress_signal.emit(progress)
-                                    print(f"下载进度: {progress}%") if progress % 10 == 0 else None
-                                else:
-                                    # 如果无法获取总大小，使用一个模拟进度
-                                    self.progress_signal.emit(min(int(downloaded / 1024 / 1024 * 10), 95))
-            
-            except requests.RequestException as e:
-                print(f"下载请求出错: {e}")
-                self.error_signal.emit(f"下载请求出错: {e}")
-                return
-            
-            # 检查文件是否有效
-            if os.path.exists(self.save_path):
-                file_size = os.path.getsize(self.save_path)
-                print(f"下载完成，文件大小: {file_size} 字节")
-                
-                if file_size < 1024:  # 小于1KB的文件很可能是错误信息
-                    with open(self.save_path, 'r', errors='ignore') as f:
-                        content = f.read(1000)
-                        if 'error' in content.lower() or '错误' in content or '失败' in content:
-                            print(f"下载的文件包含错误信息: {content}")
-                            os.remove(self.save_path)
-                            self.error_signal.emit("下载失败，接收到错误响应")
-                            return
-                
-                if file_size > 10 * 1024:  # 大于10KB的文件可能是有效的音乐文件
-                    self.progress_signal.emit(100)
-                    self.finished_signal.emit(self.save_path)
-                else:
-                    print(f"下载的文件太小，可能不是有效的音乐文件")
-                    os.remove(self.save_path)
-                    self.error_signal.emit("下载失败，文件太小，不是有效的音乐文件")
-            else:
-                print(f"下载后文件不存在")
-                self.error_signal.emit("下载失败，文件未能保存")
-        
-        except Exception as e:
-            print(f"下载过程中出现异常: {e}")
-            self.error_signal.emit(str(e))
+from src.utils.job_journal import JobJournal
+from src.utils.startup_profiler import startup_profiler
 
 
 class MainWindow(QMainWindow):
@@ -170,6 +41,7 @@ class MainWindow(QMainWindow):
         
         # 设置默认数据源为网易云
         self.current_api.set_source('netease')
+        startup_profiler.mark('主窗口: 创建API')
         
         # 初始化变量
         self.current_song = None
@@ -185,16 +57,48 @@ class MainWindow(QMainWindow):
         # 添加标志位，标记窗口是否正在关闭
         self.is_closing = False
         
+        # 分页状态，由窗口自己维护，不依赖API实例上的页码
+        self.current_page = 1
+        self.page_size = 30
+        # 搜索和翻页请求的编号，用于丢弃过期的结果
+        self.page_request_id = 0
+        self.pending_page_request = None
+        # 多页搜索的页数选项: (显示文本, 最多页数)，None表示获取到没有更多结果为止
+        self.search_page_options = [("单页", 1), ("5页", 5), ("10页", 10), ("全部", None)]
+        # 当前结果是否为多页合并的结果（不分页）
+        self.is_multi_page_result = False
+        # 正在进行的翻页请求，被新的请求取代时取消
+        self.page_thread = None
+        # 后台预取的下一页
+        self.prefetch_thread = None
+        self.prefetch_key = None
+        self.prefetched_result = None
+        
         # 初始化线程变量
         self.search_thread = None
+        # 所有仍在运行的搜索/翻页线程，防止线程对象在运行中被回收
+        self.page_threads = set()
         self.download_thread = None
+        self.batch_download_thread = None
+        # 后台预热连接的线程
+        self.warm_up_thread = None
+        
+        # 批量下载任务日志，程序关闭或崩溃后可以继续未完成的批次
+        self.job_journal = JobJournal()
+        self.batch_id = None
+        # 本地曲库索引（所有API共享），已下载的歌曲不再重复下载
+        self.library_index = MusicAPI.library_index
         
         # 添加状态栏
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
+        # 下载速度和剩余时间
+        self.transfer_label = QLabel()
+        self.status_bar.addPermanentWidget(self.transfer_label)
         
         # 初始化UI
         self.init_ui()
+        startup_profiler.mark('主窗口: 初始化界面')
     
     def init_ui(self):
         """初始化UI"""
@@ -291,6 +195,14 @@ class MainWindow(QMainWindow):
         self.search_btn.clicked.connect(self.search_music)
         self.search_layout.addWidget(self.search_btn)
         
+        # 搜索页数，多页时并发获取并合并显示
+        self.search_pages_combo = QComboBox()
+        self.search_pages_combo.setFixedWidth(70)
+        self.search_pages_combo.setToolTip("一次获取的页数")
+        for text, pages in self.search_page_options:
+            self.search_pages_combo.addItem(text, pages)
+        self.search_layout.addWidget(self.search_pages_combo)
+        
         # 平台标题
         platform_label = QLabel(f"{self.current_api.name}")
         platform_label.setFixedWidth(100)  # 固定宽度
@@ -305,8 +217,10 @@ class MainWindow(QMainWindow):
     
     def create_result_area(self):
         """创建结果显示区域"""
-        self.result_table = QTableWidget(0, 7)  # 7列，增加一列用于复选框
-        self.result_table.setHorizontalHeaderLabels(["歌曲名", "歌手", "专辑", "大小", "音质", "来源", "选择"])
+        # 表格模型按需提供单元格内容，7列，最后一列用于复选框
+        self.result_model = ResultTableModel(self)
+        self.result_table = QTableView()
+        self.result_table.setModel(self.result_model)
         
         # 设置表格属性
         header = self.result_table.horizontalHeader()
@@ -319,18 +233,18 @@ class MainWindow(QMainWindow):
         header.setSectionResizeMode(6, QHeaderView.ResizeToContents)  # 复选框列宽自适应
         
         # 允许多选
-        self.result_table.setSelectionMode(QTableWidget.ExtendedSelection)
-        self.result_table.setSelectionBehavior(QTableWidget.SelectRows)  # 整行选择
+        self.result_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.result_table.setSelectionBehavior(QAbstractItemView.SelectRows)  # 整行选择
         
         # 设置样式
         self.result_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 border: 1px solid #ddd;
                 border-radius: 4px;
                 background-color: #fcfcfc;
                 alternate-background-color: #f5f5f5;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #c2dbff;
                 color: #000;
             }
@@ -360,9 +274,9 @@ class MainWindow(QMainWindow):
         self.result_table.setAlternatingRowColors(True)
         
         # 表格选中事件
-        self.result_table.itemClicked.connect(self.on_table_item_clicked)
+        self.result_table.clicked.connect(self.on_table_item_clicked)
         # 双击直接下载
-        self.result_table.itemDoubleClicked.connect(self.on_table_item_double_clicked)
+        self.result_table.doubleClicked.connect(self.on_table_item_double_clicked)
     
     def create_pagination_area(self):
         """创建分页区域"""
@@ -569,28 +483,117 @@ class MainWindow(QMainWindow):
         self.update_status_bar(f"正在搜索: {keyword}...")
         print(f"开始搜索: {keyword}")
         
-        # 确保之前的搜索线程已结束
-        if self.search_thread and self.search_thread.isRunning():
-            print(f"有正在运行的搜索线程，等待其完成...")
-            self.search_thread.wait(1000)  # 等待1秒
-            
-            if self.search_thread.isRunning():
-                print(f"搜索线程仍在运行，终止它...")
-                self.search_thread.terminate()
-                self.search_thread.wait()
+        # 新的搜索使之前未完成的搜索和翻页请求失效
+        if isinstance(self.search_thread, MultiPageSearchThread):
+            self.search_thread.cancel()
+        self.cancel_page_thread()
+        self.cancel_prefetch()
+        self.page_request_id += 1
+        request_id = self.page_request_id
+        self.pending_page_request = None
+        self.current_page = 1
+        
+        # 多页搜索：各页并发获取，逐页追加到表格
+        max_pages = self.search_pages_combo.currentData()
+        self.is_multi_page_result = max_pages != 1
+        if self.is_multi_page_result:
+            self.start_multi_page_search(keyword, max_pages, request_id)
+            return
         
         # 创建线程
-        self.search_thread = SearchThread(self.current_api, keyword)
+        self.search_thread = self.create_search_thread(keyword, 1)
         
         # 连接信号
-        self.search_thread.result_signal.connect(self.handle_search_result)
-        self.search_thread.error_signal.connect(self.handle_search_error)
+        self.search_thread.result_signal.connect(lambda result, rid=request_id: self.handle_search_result(result, rid))
+        self.search_thread.error_signal.connect(lambda error_msg, rid=request_id: self.handle_search_error(error_msg, rid))
         
         # 启动线程
         self.search_thread.start()
         print(f"搜索线程已启动...")
     
-    def on_table_item_clicked(self, item):
+    def create_search_thread(self, keyword, page):
+        """
+        创建搜索线程（需调用方连接信号后启动）
+        :param keyword: 搜索关键词
+        :param page: 页码
+        :return: 搜索线程
+        """
+        thread = SearchThread(self.current_api, keyword, page, self.page_size)
+        self.page_threads.add(thread)
+        thread.finished.connect(lambda t=thread: self.page_threads.discard(t))
+        return thread
+    
+    def create_page_thread(self, keyword, page):
+        """
+        创建翻页/预取线程（需调用方连接信号后启动），不修改API实例上的翻页状态
+        :param keyword: 搜索关键词
+        :param page: 页码
+        :return: 翻页线程
+        """
+        thread = PageFetchThread(self.current_api, keyword, page, self.page_size)
+        self.page_threads.add(thread)
+        thread.finished.connect(lambda t=thread: self.page_threads.discard(t))
+        return thread
+    
+    def cancel_page_thread(self):
+        """取消尚未完成的翻页请求"""
+        if self.page_thread is not None:
+            self.page_thread.cancel()
+            self.page_thread = None
+    
+    def cancel_prefetch(self):
+        """取消预取并丢弃预取的结果"""
+        if self.prefetch_thread is not None:
+            self.prefetch_thread.cancel()
+            self.prefetch_thread = None
+        self.prefetch_key = None
+        self.prefetched_result = None
+    
+    def start_multi_page_search(self, keyword, max_pages, request_id):
+        """
+        启动多页搜索
+        :param keyword: 搜索关键词
+        :param max_pages: 最多获取的页数，None表示获取到没有更多结果为止
+        :param request_id: 搜索请求编号
+        """
+        # 多页结果合并显示，不再分页
+        self.prev_page_btn.setEnabled(False)
+        self.next_page_btn.setEnabled(False)
+        
+        thread = MultiPageSearchThread(self.current_api, keyword, max_pages, self.page_size)
+        self.page_threads.add(thread)
+        thread.finished.connect(lambda t=thread: self.page_threads.discard(t))
+        thread.page_signal.connect(lambda page, songs, rid=request_id: self.handle_multi_page_result(rid, page, songs))
+        thread.error_signal.connect(lambda error_msg, rid=request_id: self.handle_search_error(error_msg, rid))
+        thread.finished.connect(lambda rid=request_id: self.handle_multi_page_finished(rid))
+        self.search_thread = thread
+        thread.start()
+        print(f"多页搜索线程已启动，最多 {max_pages or '全部'} 页...")
+    
+    def handle_multi_page_result(self, request_id, page, songs):
+        """多页搜索中的一页结果已合并（songs为该页新增的歌曲）"""
+        if self.is_closing or request_id != self.page_request_id:
+            return
+        
+        # 只追加新增的行，已显示的行和勾选状态保持不变
+        self.result_model.append_songs(songs)
+        self.batch_download_btn.setEnabled(True)
+        self.page_info_label.setText(f"共{page}页")
+        self.update_status_bar(f"当前平台: {self.current_api.name} | 已加载 {page} 页 | 找到 {len(self.result_list)} 首歌曲")
+    
+    def handle_multi_page_finished(self, request_id):
+        """多页搜索结束"""
+        if self.is_closing or request_id != self.page_request_id:
+            return
+        
+        if self.result_list:
+            print(f"多页搜索完成，结果数: {len(self.result_list)}")
+        elif not self.is_source_changing:
+            self.page_info_label.setText("无结果")
+            self.update_status_bar(f"当前平台: {self.current_api.name} | 未找到相关歌曲")
+            self.show_message("未找到相关歌曲")
+    
+    def on_table_item_clicked(self, index):
         """表格项点击事件"""
         # 获取所有选中的行
         selected_rows = self.result_table.selectionModel().selectedRows()
@@ -640,10 +643,10 @@ class MainWindow(QMainWindow):
             self.current_song_label.setText("当前未选择歌曲")
             self.download_btn.setEnabled(False)
     
-    def on_table_item_double_clicked(self, item):
+    def on_table_item_double_clicked(self, index):
         """表格项双击事件 - 直接下载"""
         # 获取当前选中的行
-        row = item.row()
+        row = index.row()
         
         # 获取歌曲信息
         self.current_song = self.result_list[row]
@@ -651,13 +654,18 @@ class MainWindow(QMainWindow):
         # 立即开始下载
         self.download_music()
     
-    def handle_search_result(self, result):
+    def handle_search_result(self, result, request_id=None):
         """处理搜索结果"""
         # 如果窗口正在关闭，忽略处理
         if hasattr(self, 'is_closing') and self.is_closing:
             print("窗口正在关闭，忽略搜索结果处理")
             return
         
+        # 已有更新的搜索或翻页请求，忽略过期结果
+        if request_id is not None and request_id != self.page_request_id:
+            print("忽略过期的搜索结果")
+            return
+        
         print(f"搜索结果返回，数量: {len(result)}")
         self.result_list = result
         self.update_result_table()
@@ -666,12 +674,15 @@ class MainWindow(QMainWindow):
             # 启用下一页按钮
             self.next_page_btn.setEnabled(True)
             # 根据当前页码启用/禁用上一页按钮
-            self.prev_page_btn.setEnabled(self.current_api.current_page > 1)
+            self.prev_page_btn.setEnabled(self.current_page > 1)
             # 更新页码信息
-            self.page_info_label.setText(f"第{self.current_api.current_page}页")
+            self.page_info_label.setText(f"第{self.current_page}页")
             
-            print(f"搜索成功，当前页: {self.current_api.current_page}, 结果数: {len(result)}")
-            self.update_status_bar(f"当前平台: {self.current_api.name} | 第{self.current_api.current_page}页 | 找到 {len(result)} 首歌曲")
+            print(f"搜索成功，当前页: {self.current_page}, 结果数: {len(result)}")
+            self.update_status_bar(f"当前平台: {self.current_api.name} | 第{self.current_page}页 | 找到 {len(result)} 首歌曲")
+            
+            # 在后台预取下一页
+            self.prefetch_page(self.current_page + 1)
         else:
             # 禁用分页按钮
             self.next_page_btn.setEnabled(False)
@@ -681,12 +692,16 @@ class MainWindow(QMainWindow):
             print(f"搜索无结果")
             self.update_status_bar(f"当前平台: {self.current_api.name} | 未找到匹配的歌曲")
     
-    def handle_search_error(self, error_msg):
+    def handle_search_error(self, error_msg, request_id=None):
         """处理搜索错误"""
         # 如果窗口正在关闭，忽略处理
         if hasattr(self, 'is_closing') and self.is_closing:
             print("窗口正在关闭，忽略搜索错误处理")
             return
+        
+        # 已有更新的搜索或翻页请求，忽略过期错误
+        if request_id is not None and request_id != self.page_request_id:
+            return
             
         print(f"搜索出错: {error_msg}")
         
@@ -706,55 +721,71 @@ class MainWindow(QMainWindow):
         self.show_message(f'搜索出错: {error_msg}')
     
     def load_next_page(self):
-        """加载下一页结果"""
+        """加载下一页结果（在后台线程中请求，不阻塞界面）"""
         if not self.last_search_keyword:
             return
         
-        # 显示加载状态
-        next_page = self.current_api.current_page + 1
-        self.update_status_bar(f"正在加载第{next_page}页...")
-        
-        # 获取下一页数据
-        next_page_results = self.current_api.get_next_page(self.last_search_keyword)
-        
-        # 处理搜索结果
-        if next_page_results:
-            # 替换结果列表，而不是追加
-            self.result_list = next_page_results
-            
-            # 清除当前选择
-            self.current_song = None
-            
-            # 更新表格
-            self.update_result_table()
-            
-            # 更新页码信息
-            self.page_info_label.setText(f"第{self.current_api.current_page}页")
-            self.prev_page_btn.setEnabled(self.current_api.current_page > 1)
-            
-            print(f"下一页加载完成，结果数: {len(next_page_results)}")
-            self.update_status_bar(f"当前平台: {self.current_api.name} | 第{self.current_api.current_page}页 | 找到 {len(next_page_results)} 首歌曲")
-        else:
-            print(f"下一页没有更多结果")
-            self.update_status_bar(f"当前平台: {self.current_api.name} | 没有更多结果")
-            self.next_page_btn.setEnabled(False)
+        # 连续点击时以最近一次请求的页码为基准
+        page = self.pending_page_request[2] if self.pending_page_request else self.current_page
+        self.request_page(page + 1)
     
     def load_previous_page(self):
-        """加载上一页结果"""
-        if not self.last_search_keyword or self.current_api.current_page <= 1:
+        """加载上一页结果（在后台线程中请求，不阻塞界面）"""
+        page = self.pending_page_request[2] if self.pending_page_request else self.current_page
+        if not self.last_search_keyword or page <= 1:
             return
         
+        self.request_page(page - 1)
+    
+    def request_page(self, page):
+        """
+        在后台请求指定页，之前发出但尚未完成的翻页请求将被丢弃
+        :param page: 页码
+        """
+        keyword = self.last_search_keyword
+        # 之前的翻页请求已被取代
+        self.cancel_page_thread()
+        self.page_request_id += 1
+        request_id = self.page_request_id
+        self.pending_page_request = (request_id, keyword, page)
+        
         # 显示加载状态
-        prev_page = self.current_api.current_page - 1
-        self.update_status_bar(f"正在加载第{prev_page}页...")
+        self.update_status_bar(f"正在加载第{page}页...")
         
-        # 获取上一页数据
-        prev_page_results = self.current_api.get_previous_page(self.last_search_keyword)
+        if self.prefetch_key == (keyword, page):
+            # 该页已预取完成，直接显示
+            if self.prefetched_result is not None:
+                self.handle_page_result(request_id, page, self.prefetched_result)
+                return
+            # 正在预取该页，预取完成后再显示
+            if self.prefetch_thread and self.prefetch_thread.isRunning():
+                return
         
-        # 处理搜索结果
-        if prev_page_results:
+        # 请求的不是预取的页，预取结果已无用
+        self.cancel_prefetch()
+        
+        thread = self.create_page_thread(keyword, page)
+        thread.result_signal.connect(lambda result, rid=request_id, p=page: self.handle_page_result(rid, p, result))
+        thread.error_signal.connect(lambda error_msg, rid=request_id: self.handle_page_error(rid, error_msg))
+        self.page_thread = thread
+        thread.start()
+    
+    def handle_page_result(self, request_id, page, result):
+        """处理翻页结果"""
+        # 如果窗口正在关闭，忽略处理
+        if hasattr(self, 'is_closing') and self.is_closing:
+            return
+        
+        # 已有更新的请求，忽略过期结果
+        if request_id != self.page_request_id:
+            print(f"忽略过期的第{page}页结果")
+            return
+        self.pending_page_request = None
+        
+        if result:
             # 替换结果列表，而不是追加
-            self.result_list = prev_page_results
+            self.result_list = result
+            self.current_page = page
             
             # 清除当前选择
             self.current_song = None
@@ -763,14 +794,83 @@ class MainWindow(QMainWindow):
             self.update_result_table()
             
             # 更新页码信息
-            self.page_info_label.setText(f"第{self.current_api.current_page}页")
-            self.prev_page_btn.setEnabled(self.current_api.current_page > 1)
+            self.page_info_label.setText(f"第{self.current_page}页")
+            self.prev_page_btn.setEnabled(self.current_page > 1)
             self.next_page_btn.setEnabled(True)
             
-            self.update_status_bar(f"当前平台: {self.current_api.name} | 第{self.current_api.current_page}页 | 找到 {len(prev_page_results)} 首歌曲")
+            print(f"第{page}页加载完成，结果数: {len(result)}")
+            self.update_status_bar(f"当前平台: {self.current_api.name} | 第{self.current_page}页 | 找到 {len(result)} 首歌曲")
+            
+            # 在后台预取下一页
+            self.prefetch_page(self.current_page + 1)
+        elif page > self.current_page:
+            print(f"第{page}页没有更多结果")
+            self.update_status_bar(f"当前平台: {self.current_api.name} | 没有更多结果")
+            if page == self.current_page + 1:
+                self.next_page_btn.setEnabled(False)
         else:
             self.update_status_bar(f"当前平台: {self.current_api.name} | 无法加载上一页")
     
+    def handle_page_error(self, request_id, error_msg):
+        """处理翻页错误"""
+        # 如果窗口正在关闭或请求已过期，忽略处理
+        if (hasattr(self, 'is_closing') and self.is_closing) or request_id != self.page_request_id:
+            return
+        self.pending_page_request = None
+        
+        print(f"翻页出错: {error_msg}")
+        self.update_status_bar(f"当前平台: {self.current_api.name} | 加载失败: {error_msg}")
+    
+    def prefetch_page(self, page):
+        """
+        在后台预取指定页，使翻页时可以立即显示
+        :param page: 页码
+        """
+        keyword = self.last_search_keyword
+        if not keyword or self.prefetch_key == (keyword, page):
+            return
+        
+        self.cancel_prefetch()
+        key = (keyword, page)
+        self.prefetch_key = key
+        
+        self.prefetch_thread = self.create_page_thread(keyword, page)
+        self.prefetch_thread.result_signal.connect(lambda result, k=key: self.handle_prefetch_result(k, result))
+        self.prefetch_thread.error_signal.connect(lambda error_msg, k=key: self.handle_prefetch_result(k, None, error_msg))
+        self.prefetch_thread.start()
+    
+    def handle_prefetch_result(self, key, result, error_msg=None):
+        """处理预取结果"""
+        if (hasattr(self, 'is_closing') and self.is_closing) or key != self.prefetch_key:
+            return
+        
+        if error_msg:
+            # 预取失败，翻页时重新请求
+            self.prefetch_key = None
+        else:
+            self.prefetched_result = result
+            print(f"已预取第{key[1]}页，结果数: {len(result)}")
+        
+        # 用户已在等待该页
+        pending = self.pending_page_request
+        if pending and (pending[1], pending[2]) == key:
+            if error_msg:
+                self.handle_page_error(pending[0], error_msg)
+            else:
+                self.handle_page_result(pending[0], key[1], result)
+        elif not error_msg and not result and key == (self.last_search_keyword, self.current_page + 1):
+            # 下一页没有结果，提前禁用下一页按钮
+            self.next_page_btn.setEnabled(False)
+    
+    def restore_page_buttons(self):
+        """按当前的搜索模式和结果恢复翻页按钮，多页合并的结果不分页"""
+        paged = bool(self.result_list) and not self.is_multi_page_result
+        # 已预取到下一页没有结果时不再启用下一页
+        next_empty = self.prefetch_key == (self.last_search_keyword, self.current_page + 1) \
+            and self.prefetched_result == []
+        self.prev_page_btn.setEnabled(paged and self.current_page > 1)
+        self.next_page_btn.setEnabled(paged and not next_empty)
+    
     def download_music(self):
         """
         下载选中的歌曲
@@ -833,33 +933,22 @@ class MainWindow(QMainWindow):
         self.update_status_bar(f"正在下载: {song['name']} - {song['singer']}...")
         print(f"开始下载歌曲: {song['name']} - {song['singer']}, ID: {song['id']}")
         
-        # 准备下载路径
-        file_ext = '.mp3'
-        if '无损' in song.get('quality', '') or 'FLAC' in song.get('quality', ''):
-            file_ext = '.flac'
-        
-        save_path = os.path.join(
-            self.download_path, 
-            f"{song['name']} - {song['singer']}{file_ext}"
-        )
-        
+        # 准备下载参数
+        song_id, save_path = self.prepare_download_job(song)
         print(f"下载路径: {save_path}")
         
-        # 准备歌曲ID参数
-        song_id = song['id']
-        # 对于网易云音乐，可能需要额外的音质信息
-        if 'max_br' in song:
-            song_id = f"{song_id}|{song.get('max_br')}"
-        
         # 创建线程
         self.download_thread = DownloadThread(
             self.current_api, 
             song_id, 
-            save_path
+            save_path,
+            library=self.library_index,
+            song=song
         )
         
         # 连接信号
         self.download_thread.progress_signal.connect(self.update_progress)
+        self.download_thread.stats_signal.connect(self.update_transfer_stats)
         self.download_thread.finished_signal.connect(self.handle_download_complete)
         self.download_thread.error_signal.connect(self.handle_download_error)
         
@@ -873,6 +962,20 @@ class MainWindow(QMainWindow):
         """更新进度条"""
         self.progress_bar.setValue(value)
     
+    def update_transfer_stats(self, speed, eta):
+        """
+        更新下载速度和剩余时间
+        :param speed: 下载速度（字节/秒）
+        :param eta: 剩余时间（秒），未知时为-1
+        """
+        if speed <= 0:
+            self.transfer_label.setText("")
+            return
+        text = f"{Tools.format_file_size(speed)}/s"
+        if eta >= 0:
+            text += f"  剩余 {Tools.format_time(eta)}"
+        self.transfer_label.setText(text)
+    
     def handle_download_complete(self, save_path):
         """处理下载完成"""
         # 如果窗口正在关闭，忽略处理
@@ -890,8 +993,9 @@ class MainWindow(QMainWindow):
         # 重新启用下载按钮
         self.download_btn.setEnabled(True)
         
-        # 重置进度条
+        # 重置进度条和下载速度
         self.progress_bar.setValue(0)
+        self.transfer_label.setText("")
         
         if save_path:
             self.show_message(f'下载成功！\n保存在: {save_path}')
@@ -916,8 +1020,9 @@ class MainWindow(QMainWindow):
         # 重新启用下载按钮
         self.download_btn.setEnabled(True)
         
-        # 重置进度条
+        # 重置进度条和下载速度
         self.progress_bar.setValue(0)
+        self.transfer_label.setText("")
         
         # 显示错误信息
         self.show_message(f'下载出错: {error_msg}')
@@ -937,20 +1042,24 @@ class MainWindow(QMainWindow):
         # 设置关闭标志，防止其他操作
         self.is_closing = True
         
-        # 等待搜索线程结束
-        if self.search_thread and self.search_thread.isRunning():
-            print("等待搜索线程结束...")
-            self.search_thread.wait(1000)  # 等待最多1秒
-            
-            if self.search_thread.isRunning():
-                print("强制终止搜索线程...")
-                self.search_thread.terminate()
-                self.search_thread.wait()
-            print("搜索线程已终止")
+        # 等待搜索和翻页线程结束
+        for thread in list(self.page_threads):
+            if isinstance(thread, (MultiPageSearchThread, PageFetchThread)):
+                thread.cancel()
+            if thread.isRunning():
+                print("等待搜索线程结束...")
+                thread.wait(1000)  # 等待最多1秒
+                
+                if thread.isRunning():
+                    print("强制终止搜索线程...")
+                    thread.terminate()
+                    thread.wait()
+                print("搜索线程已终止")
         
         # 等待下载线程结束
         if self.download_thread and self.download_thread.isRunning():
             print("等待下载线程结束...")
+            self.download_thread.cancel()
             self.download_thread.wait(1000)  # 等待最多1秒
             
             if self.download_thread.isRunning():
@@ -959,6 +1068,29 @@ class MainWindow(QMainWindow):
                 self.download_thread.wait()
             print("下载线程已终止")
         
+        # 等待预热连接线程结束
+        if self.warm_up_thread and self.warm_up_thread.isRunning():
+            print("等待预热连接线程结束...")
+            self.warm_up_thread.wait(1000)  # 等待最多1秒
+            
+            if self.warm_up_thread.isRunning():
+                print("强制终止预热连接线程...")
+                self.warm_up_thread.terminate()
+                self.warm_up_thread.wait()
+            print("预热连接线程已终止")
+        
+        # 取消批量下载中尚未开始的任务
+        if self.batch_download_thread and self.batch_download_thread.isRunning():
+            print("等待批量下载线程结束...")
+            self.batch_download_thread.cancel()
+            self.batch_download_thread.wait(1000)  # 等待最多1秒
+            
+            if self.batch_download_thread.isRunning():
+                print("强制终止批量下载线程...")
+                self.batch_download_thread.terminate()
+                self.batch_download_thread.wait()
+            print("批量下载线程已终止")
+        
         # 调用父类方法
         super().closeEvent(event)
     
@@ -974,6 +1106,55 @@ class MainWindow(QMainWindow):
         super().show()
         self.raise_()
         self.activateWindow()
+        
+        # 窗口显示后在后台预热连接，第一次搜索和下载不再等待建立连接
+        QTimer.singleShot(0, self.warm_up_connections)
+        # 窗口显示后检查是否有上次未完成的批量下载
+        QTimer.singleShot(0, self.resume_pending_batch)
+    
+    def warm_up_connections(self, api=None):
+        """
+        在后台预热到接口和下载主机的连接
+        :param api: API实例，默认为当前API
+        """
+        if self.is_closing or (self.warm_up_thread and self.warm_up_thread.isRunning()):
+            return
+        self.warm_up_thread = WarmUpThread(api or self.current_api)
+        self.warm_up_thread.start()
+    
+    def resume_pending_batch(self):
+        """从任务日志恢复上次未完成的批量下载，已完成的歌曲不再下载"""
+        if self.is_closing or (self.batch_download_thread and self.batch_download_thread.isRunning()):
+            return
+        
+        batch_id = self.job_journal.get_pending_batch()
+        if batch_id is None:
+            return
+        
+        platform_name, rows = self.job_journal.load_batch(batch_id)
+        pending = [row for row in rows if row['state'] != JobJournal.DONE]
+        done_count = len(rows) - len(pending)
+        api = self.api_factory.get_api(platform_name) if platform_name else None
+        if not pending or api is None:
+            self.job_journal.remove_batch(batch_id)
+            return
+        
+        reply = QMessageBox.question(
+            self, 
+            '继续批量下载', 
+            f'上次批量下载还有 {len(pending)} 首歌曲未完成（已完成 {done_count} 首），是否继续下载？',
+            QMessageBox.Yes | QMessageBox.No, 
+            QMessageBox.Yes
+        )
+        
+        if reply != QMessageBox.Yes:
+            self.job_journal.remove_pending()
+            return
+        
+        jobs = [(row['song'], row['song_id'], row['save_path']) for row in pending]
+        journal_ids = [row['id'] for row in pending]
+        print(f"恢复批量下载: 剩余 {len(pending)}/{len(rows)} 首歌曲")
+        self.start_batch_download(api, jobs, batch_id, journal_ids, total=len(rows), done_count=done_count)
 
     def batch_download_music(self):
         """批量下载歌曲"""
@@ -1009,6 +1190,26 @@ class MainWindow(QMainWindow):
     
     def batch_download_songs(self, songs_list):
         """批量下载歌曲列表"""
+        # 准备下载任务
+        jobs = []
+        for song in songs_list:
+            song_id, save_path = self.prepare_download_job(song)
+            jobs.append((song, song_id, save_path))
+        
+        # 先写入任务日志，再开始下载
+        batch_id, journal_ids = self.job_journal.create_batch(self.current_api.name, jobs)
+        self.start_batch_download(self.current_api, jobs, batch_id, journal_ids)
+    
+    def start_batch_download(self, api, jobs, batch_id, journal_ids, total=None, done_count=0):
+        """
+        启动批量下载线程
+        :param api: API实例
+        :param jobs: 任务列表 [(song, song_id, save_path), ...]
+        :param batch_id: 任务日志中的批次ID
+        :param journal_ids: 与jobs一一对应的任务日志ID
+        :param total: 批次的歌曲总数（恢复时包含已完成的歌曲）
+        :param done_count: 已完成的歌曲数
+        """
         # 禁用下载按钮
         self.download_btn.setEnabled(False)
         self.batch_download_btn.setEnabled(False)
@@ -1018,62 +1219,43 @@ class MainWindow(QMainWindow):
         self.prev_page_btn.setEnabled(False)
         self.next_page_btn.setEnabled(False)
         
-        # 创建下载队列
-        self.download_queue = songs_list.copy()
-        self.total_songs = len(self.download_queue)
-        self.downloaded_count = 0
+        # 初始化计数
+        self.total_songs = total if total is not None else len(jobs)
+        self.downloaded_count = done_count
         # 创建失败列表
         self.failed_songs = []
+        self.batch_id = batch_id
         
-        # 开始下载第一首歌曲
-        self.download_next_song()
-    
-    def download_next_song(self):
-        """下载队列中的下一首歌曲"""
-        if not self.download_queue:
-            # 队列为空，下载完成
-            completion_message = f'批量下载完成，共 {self.downloaded_count}/{self.total_songs} 首歌曲下载成功'
-            
-            # 如果有失败的歌曲，添加到提示信息中
-            if self.failed_songs:
-                completion_message += "\n\n下载失败的歌曲："
-                for i, (song, error) in enumerate(self.failed_songs):
-                    if i < 5:  # 仅显示前5首，避免消息框过长
-                        completion_message += f"\n- {song['name']} - {song['singer']}"
-                    else:
-                        completion_message += f"\n...等 {len(self.failed_songs)} 首歌曲下载失败"
-                        break
-            
-            self.show_message(completion_message)
-            
-            # 重置进度条
-            self.progress_bar.setValue(0)
-            
-            # 恢复按钮状态
-            self.batch_download_btn.setEnabled(True)
-            self.search_btn.setEnabled(True)
-            self.prev_page_btn.setEnabled(self.current_api.current_page > 1)
-            self.next_page_btn.setEnabled(True)
-            
-            if self.current_song:
-                self.download_btn.setEnabled(True)
-            
-            # 清除所有复选框
-            self.clear_all_checkboxes()
-            
-            return
+        # 重置进度条和下载速度
+        self.progress_bar.setValue(0)
+        self.transfer_label.setText("")
+        self.update_status_bar(f"正在下载: {self.downloaded_count}/{self.total_songs} 首歌曲")
+        print(f"批量下载: 共 {self.total_songs} 首歌曲")
         
-        # 取出队列中的第一首歌曲
-        song = self.download_queue.pop(0)
-        self.current_song = song
+        # 预热到接口和下载主机的连接，所有批量下载入口都经过这里
+        self.warm_up_connections(api)
         
-        # 重置进度条
-        self.progress_bar.setValue(0)
+        # 创建批量下载线程，由调度器并发下载
+        self.batch_download_thread = BatchDownloadThread(api, jobs, journal=self.job_journal,
+                                                         journal_ids=journal_ids, library=self.library_index,
+                                                         done_count=done_count)
         
-        # 更新状态栏
-        self.update_status_bar(f"正在下载: {song['name']} - {song['singer']}... ({self.downloaded_count+1}/{self.total_songs})")
-        print(f"批量下载: {song['name']} - {song['singer']}, ID: {song['id']}")
+        # 连接信号
+        self.batch_download_thread.progress_signal.connect(self.update_progress)
+        self.batch_download_thread.stats_signal.connect(self.update_transfer_stats)
+        self.batch_download_thread.song_finished_signal.connect(self.handle_batch_download_complete)
+        self.batch_download_thread.song_error_signal.connect(self.handle_batch_download_error)
+        self.batch_download_thread.finished.connect(self.handle_batch_download_finished)
         
+        # 启动线程
+        self.batch_download_thread.start()
+    
+    def prepare_download_job(self, song):
+        """
+        准备歌曲的下载参数
+        :param song: 歌曲信息
+        :return: (歌曲ID参数, 保存路径)
+        """
         # 准备下载路径
         file_ext = '.mp3'
         if '无损' in song.get('quality', '') or 'FLAC' in song.get('quality', ''):
@@ -1084,37 +1266,59 @@ class MainWindow(QMainWindow):
             f"{song['name']} - {song['singer']}{file_ext}"
         )
         
-        print(f"下载路径: {save_path}")
-        
         # 准备歌曲ID参数
         song_id = song['id']
         # 对于网易云音乐，可能需要额外的音质信息
         if 'max_br' in song:
             song_id = f"{song_id}|{song.get('max_br')}"
         
-        # 创建线程
-        self.download_thread = DownloadThread(
-            self.current_api, 
-            song_id, 
-            save_path
-        )
+        return song_id, save_path
+    
+    def handle_batch_download_finished(self):
+        """批量下载全部结束"""
+        # 如果窗口正在关闭，忽略处理
+        if hasattr(self, 'is_closing') and self.is_closing:
+            return
         
-        # 连接信号
-        self.download_thread.progress_signal.connect(self.update_progress)
-        self.download_thread.finished_signal.connect(self.handle_batch_download_complete)
-        self.download_thread.error_signal.connect(self.handle_batch_download_error)
+        # 批次已全部结束，不再需要恢复
+        self.job_journal.remove_batch(self.batch_id)
+        self.batch_id = None
         
-        # 启动线程
-        self.download_thread.start()
+        completion_message = f'批量下载完成，共 {self.downloaded_count}/{self.total_songs} 首歌曲下载成功'
+        
+        # 如果有失败的歌曲，添加到提示信息中
+        if self.failed_songs:
+            completion_message += "\n\n下载失败的歌曲："
+            for i, (song, error) in enumerate(self.failed_songs):
+                if i < 5:  # 仅显示前5首，避免消息框过长
+                    completion_message += f"\n- {song['name']} - {song['singer']}"
+                else:
+                    completion_message += f"\n...等 {len(self.failed_songs)} 首歌曲下载失败"
+                    break
+        
+        self.show_message(completion_message)
+        
+        # 重置进度条和下载速度
+        self.progress_bar.setValue(0)
+        self.transfer_label.setText("")
+        
+        # 恢复按钮状态
+        self.batch_download_btn.setEnabled(True)
+        self.search_btn.setEnabled(True)
+        self.restore_page_buttons()
+        
+        if self.current_song:
+            self.download_btn.setEnabled(True)
+        
+        # 清除所有复选框
+        self.clear_all_checkboxes()
     
-    def handle_batch_download_complete(self, save_path):
+    def handle_batch_download_complete(self, song, save_path):
         """处理批量下载中的单首歌曲下载完成"""
         # 如果窗口正在关闭，忽略处理
         if hasattr(self, 'is_closing') and self.is_closing:
             print("窗口正在关闭，忽略下载完成处理")
             return
-            
-        song = self.current_song
         
         print(f"批量下载完成一首: {song['name']} - {song['singer']}, 路径: {save_path}")
         
@@ -1123,18 +1327,13 @@ class MainWindow(QMainWindow):
         
         # 更新状态栏显示当前进度
         self.update_status_bar(f"正在下载: {self.downloaded_count}/{self.total_songs} 首歌曲")
-        
-        # 继续下载下一首
-        self.download_next_song()
     
-    def handle_batch_download_error(self, error_msg):
+    def handle_batch_download_error(self, song, error_msg):
         """处理批量下载中的单首歌曲下载错误"""
         # 如果窗口正在关闭，忽略处理
         if hasattr(self, 'is_closing') and self.is_closing:
             print("窗口正在关闭，忽略下载错误处理")
             return
-            
-        song = self.current_song
         
         print(f"批量下载出错: {song['name']} - {song['singer']}, 错误: {error_msg}")
         
@@ -1143,9 +1342,6 @@ class MainWindow(QMainWindow):
         
         # 更新状态栏
         self.update_status_bar(f"下载出错: {song['name']} - {song['singer']}, 继续下载其他歌曲...")
-        
-        # 继续下载下一首
-        self.download_next_song()
 
     def select_download_path(self):
         """选择下载路径"""
@@ -1168,10 +1364,10 @@ class MainWindow(QMainWindow):
         # 清除当前的选择状态
         self.current_song = None
         
+        # 表格模型直接引用结果列表，单元格内容在绘制可见行时才生成
+        self.result_model.set_songs(self.result_list, self.current_api.name)
+        
         if not self.result_list:
-            # 清空表格
-            self.result_table.setRowCount(0)
-            
             # 禁用批量下载按钮
             self.batch_download_btn.setEnabled(False)
             
@@ -1183,67 +1379,13 @@ class MainWindow(QMainWindow):
         
         print(f"更新结果表格，结果数: {len(self.result_list)}")
         
-        # 清空表格
-        self.result_table.setRowCount(0)
-        
-        # 添加搜索结果到表格
-        for row, song in enumerate(self.result_list):
-            self.result_table.insertRow(row)
-            
-            # 歌曲名
-            name_item = QTableWidgetItem(song.get('name', ''))
-            name_item.setData(Qt.UserRole, song)  # 存储歌曲完整信息
-            self.result_table.setItem(row, 0, name_item)
-            
-            # 歌手
-            self.result_table.setItem(row, 1, QTableWidgetItem(song.get('singer', '')))
-            
-            # 专辑
-            album_name = ""
-            if isinstance(song.get('album'), str):
-                album_name = song.get('album')
-            elif isinstance(song.get('album'), dict):
-                album_name = song.get('album', {}).get('name', '')
-            self.result_table.setItem(row, 2, QTableWidgetItem(album_name))
-            
-            # 大小
-            size_item = QTableWidgetItem(song.get('size', '未知'))
-            self.result_table.setItem(row, 3, size_item)
-            
-            # 音质
-            quality = song.get('quality', '标准')
-            quality_item = QTableWidgetItem(quality)
-            # 根据音质设置不同颜色
-            if '320K' in quality or '高品' in quality:
-                quality_item.setForeground(QColor(0, 0, 255))  # 蓝色表示高品质
-            self.result_table.setItem(row, 4, quality_item)
-            
-            # 来源
-            source_text = self.current_api.name
-            self.result_table.setItem(row, 5, QTableWidgetItem(source_text))
-            
-            # 选择
-            select_item = QTableWidgetItem()
-            select_item.setCheckState(Qt.Unchecked)
-            self.result_table.setItem(row, 6, select_item)
-        
         # 如果有结果，启用批量下载按钮
-        if len(self.result_list) > 0:
-            self.batch_download_btn.setEnabled(True) 
+        self.batch_download_btn.setEnabled(True)
 
     def get_checked_songs(self):
         """获取所有被选中的歌曲"""
-        checked_songs = []
-        for row in range(self.result_table.rowCount()):
-            check_item = self.result_table.item(row, 6)
-            if check_item and check_item.checkState() == Qt.Checked:
-                song = self.result_list[row]
-                checked_songs.append(song) 
-        return checked_songs
+        return self.result_model.checked_songs()
 
     def clear_all_checkboxes(self):
         """清除所有复选框"""
-        for row in range(self.result_table.rowCount()):
-            check_item = self.result_table.item(row, 6)
-            if check_item:
-                check_item.setCheckState(Qt.Unchecked) 
\ No newline at end of file
+        self.result_model.clear_checks()
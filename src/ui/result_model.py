@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from PyQt5.QtGui import QColor
+
+
+class ResultTableModel(QAbstractTableModel):
+    """
+    搜索结果表格模型
+    直接引用搜索结果列表，单元格内容在视图绘制时按需生成，只有可见的行会被访问；
+    勾选状态保存在位图（整数）中，清除勾选和获取勾选歌曲不需要遍历所有行
+    """
+
+    HEADERS = ["歌曲名", "歌手", "专辑", "大小", "音质", "来源", "选择"]
+    # 列序号
+    COLUMN_NAME = 0
+    COLUMN_SINGER = 1
+    COLUMN_ALBUM = 2
+    COLUMN_SIZE = 3
+    COLUMN_QUALITY = 4
+    COLUMN_SOURCE = 5
+    COLUMN_CHECK = 6
+
+    # 高品质音质的显示颜色
+    HIGH_QUALITY_COLOR = QColor(0, 0, 255)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._songs = []
+        self._source_name = ''
+        # 勾选状态位图，第n位表示第n行
+        self._checked = 0
+        self._checked_count = 0
+
+    def set_songs(self, songs, source_name=''):
+        """
+        替换全部歌曲，同时清除勾选状态
+        :param songs: 歌曲信息列表
+        :param source_name: 来源列显示的平台名称
+        """
+        self.beginResetModel()
+        self._songs = songs
+        self._source_name = source_name
+        self._checked = 0
+        self._checked_count = 0
+        self.endResetModel()
+
+    def append_songs(self, songs):
+        """
+        在末尾追加歌曲（多页搜索逐页到达时），只通知新增的行
+        :param songs: 歌曲信息列表
+        """
+        if not songs:
+            return
+        start = len(self._songs)
+        self.beginInsertRows(QModelIndex(), start, start + len(songs) - 1)
+        self._songs.extend(songs)
+        self.endInsertRows()
+
+    def song(self, row):
+        """获取指定行的歌曲信息，行号无效时返回None"""
+        if 0 <= row < len(self._songs):
+            return self._songs[row]
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._songs)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and 0 <= section < len(self.HEADERS):
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == self.COLUMN_CHECK:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        row, column = index.row(), index.column()
+        song = self.song(row)
+        if song is None:
+            return QVariant()
+
+        if role == Qt.DisplayRole:
+            return self._display_text(song, column)
+        if role == Qt.CheckStateRole and column == self.COLUMN_CHECK:
+            return Qt.Checked if self.is_checked(row) else Qt.Unchecked
+        if role == Qt.ForegroundRole and column == self.COLUMN_QUALITY:
+            quality = song.get('quality', '标准')
+            # 根据音质设置不同颜色
+            if '320K' in quality or '高品' in quality:
+                return self.HIGH_QUALITY_COLOR
+        if role == Qt.UserRole:
+            return song
+        return QVariant()
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole or index.column() != self.COLUMN_CHECK:
+            return False
+        self.set_checked(index.row(), value == Qt.Checked)
+        return True
+
+    def _display_text(self, song, column):
+        """生成单元格文本"""
+        if column == self.COLUMN_NAME:
+            return song.get('name', '')
+        if column == self.COLUMN_SINGER:
+            return song.get('singer', '')
+        if column == self.COLUMN_ALBUM:
+            album = song.get('album')
+            if isinstance(album, str):
+                return album
+            if isinstance(album, dict):
+                return album.get('name', '')
+            return ''
+        if column == self.COLUMN_SIZE:
+            return song.get('size', '未知')
+        if column == self.COLUMN_QUALITY:
+            return song.get('quality', '标准')
+        if column == self.COLUMN_SOURCE:
+            return self._source_name
+        return QVariant()
+
+    def is_checked(self, row):
+        """指定行是否被勾选"""
+        return bool(self._checked >> row & 1)
+
+    def set_checked(self, row, checked):
+        """
+        设置指定行的勾选状态
+        :param row: 行号
+        :param checked: 是否勾选
+        """
+        if not 0 <= row < len(self._songs) or self.is_checked(row) == checked:
+            return
+        if checked:
+            self._checked |= 1 << row
+            self._checked_count += 1
+        else:
+            self._checked &= ~(1 << row)
+            self._checked_count -= 1
+        index = self.index(row, self.COLUMN_CHECK)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+
+    @property
+    def checked_count(self):
+        """勾选的歌曲数"""
+        return self._checked_count
+
+    def checked_rows(self):
+        """按行号顺序返回所有勾选的行，只遍历被勾选的位"""
+        rows = []
+        bits = self._checked
+        while bits:
+            lowest = bits & -bits
+            rows.append(lowest.bit_length() - 1)
+            bits ^= lowest
+        return rows
+
+    def checked_songs(self):
+        """获取所有勾选的歌曲"""
+        return [self._songs[row] for row in self.checked_rows()]
+
+    def clear_checks(self):
+        """清除所有勾选，视图只重绘可见的行"""
+        if not self._checked:
+            return
+        self._checked = 0
+        self._checked_count = 0
+        self.dataChanged.emit(self.index(0, self.COLUMN_CHECK),
+                              self.index(len(self._songs) - 1, self.COLUMN_CHECK),
+                              [Qt.CheckStateRole])
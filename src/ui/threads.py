@@ -2,10 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import os
-import time
 import traceback
+import requests
 from PyQt5.QtCore import QThread, pyqtSignal
 
+from src.utils.download_scheduler import DownloadScheduler
+from src.utils.downloader import Downloader, DownloadCancelled
+from src.utils.audio_verifier import AudioVerifier, InvalidAudio
+from src.utils.progress_reporter import ProgressReporter
+
 
 class SearchThread(QThread):
     """搜索线程"""
@@ -39,25 +44,135 @@ class SearchThread(QThread):
             self.error_signal.emit(error_msg)
 
 
+class PageFetchThread(QThread):
+    """翻页和预取线程 - 获取指定页，不修改API实例上的翻页状态，可以取消"""
+    # 定义信号
+    result_signal = pyqtSignal(list)
+    error_signal = pyqtSignal(str)
+    
+    def __init__(self, api, keyword, page, page_size=30):
+        """
+        初始化翻页线程
+        :param api: API实例
+        :param keyword: 搜索关键词
+        :param page: 页码
+        :param page_size: 每页数量
+        """
+        super().__init__()
+        self.api = api
+        self.keyword = keyword
+        self.page = page
+        self.page_size = page_size
+        self._cancelled = False
+    
+    def cancel(self):
+        """取消请求：尚未发出的请求不再发出，已返回的结果不再发送"""
+        self._cancelled = True
+    
+    def run(self):
+        """获取指定页"""
+        if self._cancelled:
+            return
+        try:
+            result = self.api.fetch_page(self.keyword, self.page, self.page_size)
+            if not self._cancelled:
+                self.result_signal.emit(result)
+        except Exception as e:
+            if self._cancelled:
+                return
+            error_msg = f"加载第{self.page}页出错: {str(e)}"
+            print(error_msg)
+            self.error_signal.emit(error_msg)
+
+
+class MultiPageSearchThread(QThread):
+    """多页搜索线程 - 并发获取多页结果，每合并一页发送一次新增的歌曲"""
+    # 定义信号
+    page_signal = pyqtSignal(int, list)
+    error_signal = pyqtSignal(str)
+    
+    def __init__(self, api, keyword, max_pages=None, page_size=30):
+        """
+        初始化多页搜索线程
+        :param api: API实例
+        :param keyword: 搜索关键词
+        :param max_pages: 最多获取的页数，None表示获取到没有更多结果为止
+        :param page_size: 每页数量
+        """
+        super().__init__()
+        self.api = api
+        self.keyword = keyword
+        self.max_pages = max_pages
+        self.page_size = page_size
+        self.is_cancelled = False
+    
+    def cancel(self):
+        """取消搜索，已发出的请求结束后不再请求新的页"""
+        self.is_cancelled = True
+    
+    def run(self):
+        """执行搜索"""
+        try:
+            self.api.search_pages(
+                self.keyword,
+                self.max_pages,
+                self.page_size,
+                on_page=self.page_signal.emit,
+                is_cancelled=lambda: self.is_cancelled
+            )
+        except Exception as e:
+            error_msg = f"搜索出错: {str(e)}"
+            print(error_msg)
+            print(traceback.format_exc())
+            self.error_signal.emit(error_msg)
+
+
+class WarmUpThread(QThread):
+    """连接预热线程 - 在后台提前建立到接口和下载主机的连接"""
+    
+    def __init__(self, api):
+        """
+        初始化连接预热线程
+        :param api: API实例
+        """
+        super().__init__()
+        self.api = api
+    
+    def run(self):
+        """执行预热，失败不影响之后的请求"""
+        try:
+            self.api.warm_up()
+        except Exception as e:
+            print(f"预热连接出错: {str(e)}")
+
+
 class DownloadThread(QThread):
     """下载线程"""
     # 定义信号
     progress_signal = pyqtSignal(int)
+    # 下载速度（字节/秒）和剩余时间（秒，未知时为-1）
+    stats_signal = pyqtSignal(float, float)
     finished_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
     
-    def __init__(self, api, song_id, save_path):
+    def __init__(self, api, song_id, save_path, library=None, song=None):
         """
         初始化下载线程
         :param api: API实例
         :param song_id: 歌曲ID
         :param save_path: 保存路径
+        :param library: 本地曲库索引，已下载的歌曲直接跳过
+        :param song: 歌曲信息字典，用于在曲库中按歌曲名查找和记录
         """
         super().__init__()
         self.api = api
         self.song_id = song_id
         self.save_path = save_path
+        self.library = library
+        self.song = song
         self.is_cancelled = False
+        # 合并每块数据的进度更新，限制发送到界面线程的信号频率
+        self.reporter = ProgressReporter(self._on_progress_report)
     
     def cancel(self):
         """取消下载"""
@@ -74,38 +189,42 @@ class DownloadThread(QThread):
             if not os.path.exists(save_dir):
                 os.makedirs(save_dir)
             
+            # 曲库中已有的歌曲不发送任何网络请求
+            existing = self.library.lookup(self.song_id, self.save_path, self.song) if self.library else None
+            if existing:
+                print(f"歌曲已存在，跳过下载: {existing}")
+                self.progress_signal.emit(100)
+                self.finished_signal.emit(existing)
+                return
+            
+            # 搜索结果中的歌曲时长，用于校验下载的音频
+            duration = self.song.get('duration') if self.song else None
+            
             # 尝试使用API的下载方法
-            if hasattr(self.api, 'download'):
-                max_retries = 3
-                for retry in range(max_retries):
-                    if self.is_cancelled:
-                        break
-                        
-                    try:
-                        # 模拟进度更新
-                        self.progress_signal.emit(5 + retry * 5)
-                        
-                        # 直接调用download方法，内部获取链接
-                        saved_path = self.api.download(self.song_id, self.save_path)
-                        if saved_path:
-                            self.progress_signal.emit(100)
-                            self.finished_signal.emit(saved_path)
-                            return
-                        
-                        if retry < max_retries - 1:
-                            print(f"下载重试 ({retry+1}/{max_retries})...")
-                            time.sleep(1)  # 短暂延迟后重试
-                    except Exception as e:
-                        print(f"下载尝试 {retry+1}/{max_retries} 失败: {e}")
-                        if retry == max_retries - 1:
-                            raise
-                        time.sleep(1)
+            # 网络错误的重试由API内部的重试策略处理，这里只调用一次
+            if hasattr(self.api, 'download') and not self.is_cancelled:
+                # 模拟进度更新
+                self.progress_signal.emit(5)
+                
+                # 直接调用download方法，内部获取链接
+                try:
+                    saved_path = self.api.download(self.song_id, self.save_path, self.reporter.update,
+                                                   duration=duration, is_cancelled=lambda: self.is_cancelled)
+                except DownloadCancelled:
+                    # 保留.part文件，下次下载时继续
+                    self._cleanup()
+                    return
+                if saved_path:
+                    self._add_to_library(saved_path)
+                    self.progress_signal.emit(100)
+                    self.finished_signal.emit(saved_path)
+                    return
                 
                 # 如果API的download方法失败，尝试自己实现下载
-                if not os.path.exists(self.save_path) or os.path.getsize(self.save_path) < 10 * 1024:
+                if not os.path.exists(self.save_path):
                     url = None
                     if hasattr(self.api, 'get_song_url'):
-                        url = self.api.get_song_url(self.song_id)
+                        url = self.api.get_song_url(self.song_id, duration=duration)
                         
                     if not url:
                         self.error_signal.emit("下载失败，无法获取下载链接")
@@ -117,128 +236,48 @@ class DownloadThread(QThread):
             
             # 无法使用API的download方法，或者API的download方法失败后
             # 使用自己的下载实现
-            import requests
-            
             # 获取下载链接
             url = None
             if hasattr(self.api, 'get_song_url'):
-                url = self.api.get_song_url(self.song_id)
+                url = self.api.get_song_url(self.song_id, duration=duration)
             
             if not url:
                 self.error_signal.emit("下载失败，无法获取下载链接")
                 self._cleanup()
                 return
             
-            # 使用API的session进行下载
+            # 使用API的session进行下载，已下载的部分保存在.part文件中，重试时从断点继续
             session = self.api.session if hasattr(self.api, 'session') else requests.Session()
+            downloader = Downloader(session)
             
-            # 添加超时和重试机制
-            max_retries = 3
-            for retry in range(max_retries):
-                if self.is_cancelled:
-                    break
-                    
-                try:
-                    # 检查URL有效性
-                    self.progress_signal.emit(5)
-                    head_resp = session.head(url, timeout=10, allow_redirects=True)
-                    if head_resp.status_code >= 400:
-                        if retry < max_retries - 1:
-                            print(f"URL无效 ({head_resp.status_code})，重试中...")
-                            time.sleep(1)
-                            continue
-                        else:
-                            self.error_signal.emit(f"下载链接无效 (HTTP {head_resp.status_code})")
-                            self._cleanup()
-                            return
-                    
-                    total_size = int(head_resp.headers.get('content-length', 0))
-                    if total_size > 0 and total_size < 10 * 1024:  # 小于10KB
-                        print(f"警告：文件过小 ({total_size} 字节)")
-                    
-                    # 开始下载
-                    self.progress_signal.emit(10)
-                    downloaded = 0
-                    chunk_size = 16384  # 更大的块大小，提高效率
-                    
-                    with session.get(url, stream=True, timeout=60) as response:
-                        response.raise_for_status()
-                        
-                        # 更新实际大小
-                        total_size = int(response.headers.get('content-length', total_size))
-                        
-                        with open(self.save_path, 'wb') as f:
-                            if total_size > 0:
-                                # 有总大小，可以显示进度
-                                for chunk in response.iter_content(chunk_size=chunk_size):
-                                    if self.is_cancelled:
-                                        break
-                                        
-                                    if chunk:
-                                        f.write(chunk)
-                                        downloaded += len(chunk)
-                                        progress = int(min(10 + downloaded * 90 / total_size, 100))
-                                        self.progress_signal.emit(progress)
-                            else:
-                                # 无法获取总大小，只能模拟进度
-                                for i, chunk in enumerate(response.iter_content(chunk_size=chunk_size)):
-                                    if self.is_cancelled:
-                                        break
-                                        
-                                    if chunk:
-                                        f.write(chunk)
-                                        downloaded += len(chunk)
-                                        # 每10块更新一次进度，最多到95%
-                                        if i % 5 == 0:
-                                            progress = min(10 + i, 95)
-                                            self.progress_signal.emit(progress)
-                    
-                    # 如果因取消而中断
-                    if self.is_cancelled:
-                        self._cleanup()
-                        return
-                    
-                    # 校验文件
-                    if os.path.exists(self.save_path):
-                        file_size = os.path.getsize(self.save_path)
-                        if file_size > 100 * 1024:  # 大于100KB的文件可能是有效的音乐
-                            self.progress_signal.emit(100)
-                            self.finished_signal.emit(self.save_path)
-                            return
-                        elif file_size > 10 * 1024:  # 大于10KB可能是短音频
-                            print(f"警告：下载的文件较小 ({file_size} 字节)")
-                            self.progress_signal.emit(100)
-                            self.finished_signal.emit(self.save_path)
-                            return
-                        else:
-                            print(f"下载的文件过小 ({file_size} 字节)，可能无效")
-                            if retry < max_retries - 1:
-                                os.remove(self.save_path)
-                                time.sleep(1)
-                                continue
-                    
-                    # 文件验证失败但已尝试最大次数
-                    self.error_signal.emit("下载文件不完整或无效")
-                    self._cleanup()
-                    return
-                    
-                except requests.RequestException as e:
-                    if retry < max_retries - 1:
-                        print(f"下载出错，正在重试 ({retry+1}/{max_retries}): {e}")
-                        time.sleep(1)
-                    else:
-                        error_msg = f"下载失败: {e}"
-                        print(error_msg)
-                        print(traceback.format_exc())
-                        self.error_signal.emit(error_msg)
-                        self._cleanup()
-                except Exception as e:
-                    error_msg = f"下载出错: {e}"
-                    print(error_msg)
-                    print(traceback.format_exc())
-                    self.error_signal.emit(error_msg)
-                    self._cleanup()
-                    return
+            try:
+                self.progress_signal.emit(10)
+                downloader.download(
+                    url,
+                    self.save_path,
+                    timeout=60,
+                    progress_callback=self.reporter.update,
+                    is_cancelled=lambda: self.is_cancelled,
+                    verifier=AudioVerifier(duration)
+                )
+                if self.library is not None:
+                    self.library.deduplicate(self.save_path, downloader.content_hash)
+            except DownloadCancelled:
+                # 保留.part文件，下次下载时继续
+                self._cleanup()
+                return
+            except (requests.RequestException, IOError, InvalidAudio) as e:
+                error_msg = f"下载失败: {e}"
+                print(error_msg)
+                print(traceback.format_exc())
+                self.error_signal.emit(error_msg)
+                self._cleanup()
+                return
+            
+            # 文件已在下载时通过音频校验
+            self._add_to_library(self.save_path)
+            self.progress_signal.emit(100)
+            self.finished_signal.emit(self.save_path)
             
         except Exception as e:
             error_msg = f"下载过程出错: {e}"
@@ -248,13 +287,102 @@ class DownloadThread(QThread):
             self.progress_signal.emit(0)
             self._cleanup()
     
+    def _add_to_library(self, path):
+        """把下载完成的文件记录到曲库索引"""
+        if self.library is not None:
+            self.library.add(path, self.song_id, self.song)
+    
+    def _on_progress_report(self, percent, speed, eta):
+        """节流后的下载进度，前10%用于获取下载链接"""
+        self.progress_signal.emit(int(min(10 + percent * 0.9, 100)))
+        self.stats_signal.emit(speed, eta)
+    
     def _cleanup(self):
-        """清理临时文件"""
+        """清理无效的下载文件（未完成的.part文件会保留用于续传）"""
         try:
             if os.path.exists(self.save_path):
-                file_size = os.path.getsize(self.save_path)
-                if file_size < 100 * 1024:  # 小于100KB的文件可能无效
+                reason = AudioVerifier.verify_file(self.save_path)
+                if reason:
                     os.remove(self.save_path)
-                    print(f"已删除可能不完整的文件: {self.save_path}")
+                    print(f"已删除无效的文件: {self.save_path} ({reason})")
         except Exception as e:
-            print(f"清理文件时出错: {e}") 
\ No newline at end of file
+            print(f"清理文件时出错: {e}") 
+
+class BatchDownloadThread(QThread):
+    """批量下载线程 - 通过调度器并发下载多首歌曲"""
+    # 定义信号
+    progress_signal = pyqtSignal(int)
+    # 整体下载速度（字节/秒）和剩余时间（秒，未知时为-1）
+    stats_signal = pyqtSignal(float, float)
+    song_finished_signal = pyqtSignal(dict, str)
+    song_error_signal = pyqtSignal(dict, str)
+    
+    def __init__(self, api, jobs, max_workers=None, max_per_host=None, journal=None, journal_ids=None,
+                 library=None, done_count=0):
+        """
+        初始化批量下载线程
+        :param api: API实例
+        :param jobs: 任务列表 [(song, song_id, save_path), ...]
+        :param max_workers: 全局并发下载数
+        :param max_per_host: 每个下载主机同时传输的任务数
+        :param journal: 任务日志，记录每首歌曲的下载状态
+        :param journal_ids: 与jobs一一对应的任务日志ID
+        :param library: 本地曲库索引，已下载的歌曲直接跳过
+        :param done_count: 恢复的批次中此前已完成的歌曲数，计入整体进度
+        """
+        super().__init__()
+        self.api = api
+        self.jobs = jobs
+        self.journal_ids = journal_ids or [None] * len(jobs)
+        self.library = library
+        # 汇总所有任务的字节进度，节流后发送整体进度、速度和剩余时间
+        self.reporter = ProgressReporter(self._on_progress_report, total_jobs=len(jobs) + done_count,
+                                         done_jobs=done_count)
+        self.scheduler = DownloadScheduler(
+            max_workers=max_workers,
+            max_per_host=max_per_host,
+            on_job_finished=self._on_job_finished,
+            on_job_failed=self._on_job_failed,
+            on_job_progress=lambda job, downloaded, total: self.reporter.update(downloaded, total, job),
+            journal=journal,
+            library=library
+        )
+    
+    def cancel(self):
+        """取消下载：尚未开始的任务不再开始，正在下载的任务中止"""
+        self.scheduler.cancel()
+    
+    def run(self):
+        """执行批量下载"""
+        try:
+            self.progress_signal.emit(0)
+            
+            # 先增量扫描保存目录，使目录中已有（包括手动放入）的歌曲也能被跳过
+            if self.library is not None:
+                for directory in sorted({os.path.dirname(save_path) for _, _, save_path in self.jobs}):
+                    self.library.scan(directory)
+            
+            for priority, ((song, song_id, save_path), journal_id) in enumerate(zip(self.jobs, self.journal_ids)):
+                self.scheduler.add_job(self.api, song_id, save_path, priority=priority, song=song,
+                                       journal_id=journal_id)
+            
+            self.scheduler.start()
+            self.scheduler.wait()
+        except Exception as e:
+            print(f"批量下载过程出错: {e}")
+            print(traceback.format_exc())
+    
+    def _on_job_finished(self, job):
+        """单个任务完成"""
+        self.reporter.job_finished(job)
+        self.song_finished_signal.emit(job.song, job.result_path)
+    
+    def _on_job_failed(self, job):
+        """单个任务失败"""
+        self.reporter.job_finished(job)
+        self.song_error_signal.emit(job.song, job.error or "下载失败")
+    
+    def _on_progress_report(self, percent, speed, eta):
+        """节流后的整体进度"""
+        self.progress_signal.emit(percent)
+        self.stats_signal.emit(speed, eta)
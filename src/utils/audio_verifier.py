@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+import threading
+
+
+class InvalidAudio(Exception):
+    """下载的内容不是有效的音频，重试同一链接没有意义"""
+    pass
+
+
+class AudioVerifier:
+    """
+    边下载边校验音频
+    在数据到达时解析ID3标签、MP3帧头（含Xing/Info/VBRI头）或FLAC的STREAMINFO，
+    收到开头几KB后即可识别网页/文本等错误内容并中止下载；
+    能计算时长时与搜索结果中的时长比对，识别试听片段和截断的文件
+    """
+
+    # 识别格式最多使用的音频数据（不含ID3标签）
+    HEAD_SIZE = 16 * 1024
+    # 收到这么多数据仍无法识别格式时中止
+    SNIFF_SIZE = 4 * 1024
+    # 时长允许的误差：秒数和比例，取较大者
+    DURATION_TOLERANCE = 10
+    DURATION_TOLERANCE_RATIO = 0.2
+    # 比特率未知时按最低比特率 (bps) 估算文件大小的下限
+    MIN_BITRATE = 128000
+
+    # MPEG版本 -> 采样率表
+    SAMPLE_RATES = {
+        3: (44100, 48000, 32000),   # MPEG1
+        2: (22050, 24000, 16000),   # MPEG2
+        0: (11025, 12000, 8000),    # MPEG2.5
+    }
+    # Layer III 比特率表 (kbps)
+    BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+    BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+
+    def __init__(self, expected_duration=None):
+        """
+        :param expected_duration: 搜索结果中的歌曲时长（秒），未知时不比对时长
+        """
+        self.expected_duration = expected_duration if expected_duration and expected_duration > 0 else None
+        self.total_size = 0
+        self.format = None
+        self.duration = None
+        self.bitrate = None
+        self.audio_offset = 0
+
+        self._head = bytearray()
+        self._received = 0
+        self._vbr_bytes = None
+        self._lock = threading.Lock()
+
+    def set_total_size(self, total_size):
+        """设置文件总大小（来自Content-Length），已识别格式时立即比对时长"""
+        self.total_size = total_size or 0
+        if self.format:
+            self._check_duration()
+
+    def update(self, position, data):
+        """
+        写入一段数据，只处理文件开头连续到达的部分
+        :param position: 数据在文件中的偏移量
+        :param data: 数据
+        """
+        if self.format:
+            return
+        with self._lock:
+            if self.format or position != self._received:
+                return
+            self._received += len(data)
+            self._head += data
+            self._parse()
+
+    def prime(self, path, size):
+        """续传时从临时文件读取已下载的开头部分"""
+        if size <= 0:
+            return
+        try:
+            with open(path, 'rb') as f:
+                self.update(0, f.read(min(size, self.SNIFF_SIZE + self.HEAD_SIZE + 1024 * 1024)))
+        except OSError as e:
+            print(f"读取已下载部分失败: {e}")
+
+    def finish(self, total_size):
+        """
+        下载完成后的最终检查
+        :param total_size: 实际下载的字节数
+        """
+        if not self.format:
+            with self._lock:
+                self._parse(final=True)
+        self.total_size = total_size
+        if self._vbr_bytes and total_size < self.audio_offset + self._vbr_bytes * 0.95:
+            raise InvalidAudio(f"音频数据不完整: {total_size}/{self.audio_offset + self._vbr_bytes} 字节")
+        self._check_duration()
+
+    def _parse(self, final=False):
+        """尝试识别格式（调用方需持有锁）"""
+        head = bytes(self._head)
+
+        stripped = head[:256].lstrip()
+        if stripped[:1] in (b'<', b'{', b'[') or stripped[:9].lower() == b'<!doctype':
+            raise InvalidAudio("服务器返回的是网页或文本，不是音频")
+
+        if head[:3] == b'ID3':
+            if len(head) < 10:
+                return
+            size = self._syncsafe(head[6:10]) + 10
+            if head[5] & 0x10:
+                size += 10
+            self.audio_offset = size
+        elif not self.audio_offset and len(head) < 4 and not final:
+            return
+
+        audio = head[self.audio_offset:]
+        if not audio and not final:
+            return
+
+        if audio[:4] == b'fLaC':
+            if len(audio) < 42:
+                if final:
+                    raise InvalidAudio("FLAC文件不完整")
+                return
+            self._parse_flac(audio)
+        elif audio[4:8] == b'ftyp':
+            # M4A/AAC，只识别格式
+            self.format = 'm4a'
+        else:
+            found = self._parse_mp3(audio, final)
+            if not found:
+                if final or len(audio) >= self.SNIFF_SIZE + self.HEAD_SIZE \
+                        or (not self.audio_offset and len(audio) >= self.SNIFF_SIZE and not self._has_sync(audio)):
+                    raise InvalidAudio("无法识别的音频格式")
+                return
+
+        print(f"音频格式: {self.format}" + (f", 时长 {self.duration:.0f} 秒" if self.duration else ""))
+        self._head = bytearray()
+        self._check_duration()
+
+    def _parse_flac(self, audio):
+        """解析FLAC的STREAMINFO块"""
+        block_type = audio[4] & 0x7F
+        if block_type != 0:
+            raise InvalidAudio("FLAC文件缺少STREAMINFO")
+        info = audio[8:8 + 34]
+        sample_rate = (info[10] << 12) | (info[11] << 4) | (info[12] >> 4)
+        total_samples = ((info[13] & 0x0F) << 32) | struct.unpack('>I', info[14:18])[0]
+        self.format = 'flac'
+        if sample_rate and total_samples:
+            self.duration = total_samples / sample_rate
+
+    @staticmethod
+    def _has_sync(data):
+        """数据中是否有可能的MP3帧同步字"""
+        for i in range(len(data) - 1):
+            if data[i] == 0xFF and data[i + 1] & 0xE0 == 0xE0:
+                return True
+        return False
+
+    def _frame_info(self, data, pos):
+        """
+        解析MP3帧头
+        :return: (帧长度, 比特率kbps, 采样率, 每帧采样数, 版本, 声道模式)，不是有效帧头时返回None
+        """
+        if pos + 4 > len(data):
+            return None
+        b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+        if data[pos] != 0xFF or b1 & 0xE0 != 0xE0:
+            return None
+        version = (b1 >> 3) & 0x03
+        layer = (b1 >> 1) & 0x03
+        bitrate_index = b2 >> 4
+        rate_index = (b2 >> 2) & 0x03
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            return None
+        bitrate = (self.BITRATES_V1 if version == 3 else self.BITRATES_V2)[bitrate_index]
+        sample_rate = self.SAMPLE_RATES[version][rate_index]
+        samples = 1152 if version == 3 else 576
+        padding = (b2 >> 1) & 0x01
+        frame_length = samples // 8 * bitrate * 1000 // sample_rate + padding
+        return frame_length, bitrate, sample_rate, samples, version, b3 >> 6
+
+    def _parse_mp3(self, audio, final):
+        """查找连续的两个MP3帧头，并读取Xing/Info/VBRI头中的帧数"""
+        limit = min(len(audio), self.HEAD_SIZE)
+        for pos in range(limit - 3):
+            frame = self._frame_info(audio, pos)
+            if frame is None:
+                continue
+            frame_length, bitrate, sample_rate, samples, version, mode = frame
+            next_pos = pos + frame_length
+            if next_pos + 4 > len(audio):
+                if final:
+                    break
+                return False
+            if self._frame_info(audio, next_pos) is None:
+                continue
+
+            self.format = 'mp3'
+            self.audio_offset += pos
+            self.bitrate = bitrate
+            frames, vbr_bytes = self._parse_vbr_header(audio, pos, version, mode)
+            if frames:
+                self.duration = frames * samples / sample_rate
+                self._vbr_bytes = vbr_bytes
+            return True
+        return False
+
+    @staticmethod
+    def _parse_vbr_header(audio, pos, version, mode):
+        """
+        读取Xing/Info或VBRI头
+        :return: (帧数, 音频字节数)，没有时为 (None, None)
+        """
+        side_info = (32 if mode != 3 else 17) if version == 3 else (17 if mode != 3 else 9)
+        xing = pos + 4 + side_info
+        if audio[xing:xing + 4] in (b'Xing', b'Info') and len(audio) >= xing + 16:
+            flags = struct.unpack('>I', audio[xing + 4:xing + 8])[0]
+            offset = xing + 8
+            frames = vbr_bytes = None
+            if flags & 0x01:
+                frames = struct.unpack('>I', audio[offset:offset + 4])[0]
+                offset += 4
+            if flags & 0x02 and len(audio) >= offset + 4:
+                vbr_bytes = struct.unpack('>I', audio[offset:offset + 4])[0]
+            return frames, vbr_bytes
+
+        vbri = pos + 36
+        if audio[vbri:vbri + 4] == b'VBRI' and len(audio) >= vbri + 18:
+            vbr_bytes, frames = struct.unpack('>II', audio[vbri + 10:vbri + 18])
+            return frames, vbr_bytes
+        return None, None
+
+    def _check_duration(self):
+        """与搜索结果中的时长比对"""
+        duration = self.duration
+        if duration is None and self.format == 'mp3' and self.bitrate and self.total_size:
+            # 固定码率：由文件大小估算时长
+            duration = (self.total_size - self.audio_offset) * 8 / (self.bitrate * 1000)
+        if duration is None or self.expected_duration is None:
+            return
+        tolerance = max(self.DURATION_TOLERANCE, self.expected_duration * self.DURATION_TOLERANCE_RATIO)
+        if abs(duration - self.expected_duration) > tolerance:
+            raise InvalidAudio(
+                f"音频时长 {duration:.0f} 秒与歌曲时长 {self.expected_duration:.0f} 秒不符，可能是试听片段或不完整的文件"
+            )
+
+    @staticmethod
+    def _syncsafe(data):
+        """解析ID3的syncsafe整数"""
+        return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+    @classmethod
+    def check_size(cls, content_length, duration, bitrate):
+        """
+        按歌曲时长和比特率判断链接返回的文件大小是否合理（下载前的HEAD检查）
+        :param content_length: 文件大小（字节），0或None表示未知
+        :param duration: 歌曲时长（秒），未知时不检查
+        :param bitrate: 比特率 (bps)，未知时只按最低比特率检查文件是否过小
+        :return: 不合理的原因，合理或无法判断时返回None
+        """
+        if not content_length or not duration or duration <= 0:
+            return None
+        expected = duration * (bitrate or cls.MIN_BITRATE) / 8
+        if content_length < expected * 0.5:
+            return f"文件大小 {content_length / 1024:.0f}KB 远小于 {duration:.0f} 秒歌曲的预期大小，可能是试听片段"
+        if bitrate and content_length > expected * 2 + 1024 * 1024:
+            return f"文件大小 {content_length / 1024 / 1024:.1f}MB 远大于 {bitrate // 1000}kbps 的预期大小，可能是无损格式"
+        return None
+
+    @classmethod
+    def check_link(cls, content_length, content_type, duration=None, bitrate=None):
+        """
+        按HEAD探测的结果判断链接是否可能是完整的音频（下载前的检查），格式和时长在下载时校验
+        :param content_length: 文件大小（字节）
+        :param content_type: 内容类型
+        :param duration: 歌曲时长（秒），未知时不检查文件大小
+        :param bitrate: 比特率 (bps)，未知时只检查文件是否过小
+        :return: 不可用的原因，可用或无法判断时返回None
+        """
+        if not content_length or content_length <= 0:
+            return "链接不可用或没有返回文件大小"
+        if 'text/' in (content_type or ''):
+            return f"链接返回的是网页或文本 ({content_type})"
+        return cls.check_size(content_length, duration, bitrate)
+
+    @classmethod
+    def verify_file(cls, path, expected_duration=None):
+        """
+        校验已有的文件
+        :param path: 文件路径
+        :param expected_duration: 歌曲时长（秒）
+        :return: 无效的原因，有效时返回None
+        """
+        verifier = cls(expected_duration)
+        try:
+            size = os.path.getsize(path)
+            verifier.prime(path, size)
+            verifier.finish(size)
+        except OSError as e:
+            return str(e)
+        except InvalidAudio as e:
+            return str(e)
+        return None
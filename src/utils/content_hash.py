@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import threading
+
+
+class ContentHasher:
+    """
+    边下载边计算的文件内容哈希
+    文件按固定大小分块，每块单独计算SHA-1，最终哈希为各块摘要依次拼接后的SHA-1。
+    分段下载时各段从块边界开始、段内按顺序到达，因此无需在下载完成后再读取一遍文件
+    """
+
+    BLOCK_SIZE = 1024 * 1024
+    READ_SIZE = 64 * 1024
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size or self.BLOCK_SIZE
+        # 块序号 -> [哈希对象, 已计算的字节数]
+        self._blocks = {}
+        self._lock = threading.Lock()
+        self.valid = True
+
+    def update(self, position, data):
+        """
+        写入一段数据
+        :param position: 数据在文件中的偏移量
+        :param data: 数据
+        """
+        view = memoryview(data)
+        while view and self.valid:
+            index, offset = divmod(position, self.block_size)
+            size = min(len(view), self.block_size - offset)
+            with self._lock:
+                block = self._blocks.get(index)
+                if block is None:
+                    block = self._blocks[index] = [hashlib.sha1(), 0]
+            if block[1] != offset:
+                # 块内数据不连续（例如旧的未对齐分段），放弃计算
+                self.valid = False
+                return
+            block[0].update(view[:size])
+            block[1] += size
+            view = view[size:]
+            position += size
+
+    def prime(self, path, start, end):
+        """
+        续传前从临时文件读取已下载的部分，只在断点续传时需要
+        :param path: 临时文件路径
+        :param start: 起始位置
+        :param end: 结束位置（不含）
+        """
+        if end <= start:
+            return
+        try:
+            with open(path, 'rb') as f:
+                f.seek(start)
+                position = start
+                while position < end:
+                    data = f.read(min(self.READ_SIZE, end - position))
+                    if not data:
+                        self.valid = False
+                        return
+                    self.update(position, data)
+                    position += len(data)
+        except OSError as e:
+            print(f"读取已下载部分失败: {e}")
+            self.valid = False
+
+    def hexdigest(self, total_size):
+        """
+        获取文件哈希
+        :param total_size: 文件总大小
+        :return: 十六进制哈希，数据不完整时返回None
+        """
+        if not self.valid or total_size <= 0:
+            return None
+        count = (total_size + self.block_size - 1) // self.block_size
+        digest = hashlib.sha1()
+        for index in range(count):
+            block = self._blocks.get(index)
+            expected = min(self.block_size, total_size - index * self.block_size)
+            if block is None or block[1] != expected:
+                return None
+            digest.update(block[0].digest())
+        return digest.hexdigest()
+
+    @classmethod
+    def file_hash(cls, path):
+        """
+        计算已有文件的哈希（需要读取整个文件）
+        :param path: 文件路径
+        :return: 十六进制哈希，读取失败返回None
+        """
+        hasher = cls()
+        try:
+            with open(path, 'rb') as f:
+                position = 0
+                while True:
+                    data = f.read(cls.READ_SIZE)
+                    if not data:
+                        break
+                    hasher.update(position, data)
+                    position += len(data)
+        except OSError as e:
+            print(f"计算文件哈希失败: {e}")
+            return None
+        return hasher.hexdigest(position)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import heapq
+import itertools
+import threading
+import traceback
+import contextlib
+from urllib.parse import urlparse
+
+from src.utils.job_journal import JobJournal
+from src.utils.downloader import DownloadCancelled
+
+
+class DownloadJob:
+    """下载任务"""
+
+    # 任务状态
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, api, song_id, save_path, priority=0, song=None, journal_id=None):
+        """
+        初始化下载任务
+        :param api: API实例，需实现download方法
+        :param song_id: 歌曲ID (可带 |max_br 后缀)
+        :param save_path: 保存路径
+        :param priority: 优先级，数值越小越先下载
+        :param song: 歌曲信息字典，仅用于回调时回传
+        :param journal_id: 任务日志中的任务ID，为None时不记录状态
+        """
+        self.api = api
+        self.song_id = song_id
+        self.save_path = save_path
+        self.priority = priority
+        self.song = song if song is not None else {}
+        self.status = DownloadJob.QUEUED
+        self.result_path = None
+        self.error = None
+        self.journal_id = journal_id
+
+
+class HostSlots:
+    """
+    按下载主机限制同时传输的任务数
+    下载链接在任务执行时才解析，因此在开始传输前按实际的下载主机获取名额，传输结束（包括读取响应体）后释放
+    """
+
+    # 等待名额时检查取消的间隔（秒）
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, max_per_host, is_cancelled=None):
+        """
+        :param max_per_host: 每个主机同时传输的任务数
+        :param is_cancelled: 返回是否已取消的函数，等待名额时取消则抛出DownloadCancelled
+        """
+        self.max_per_host = max(1, max_per_host)
+        self.is_cancelled = is_cancelled
+        self._active = {}
+        self._cond = threading.Condition()
+
+    @contextlib.contextmanager
+    def hold(self, url):
+        """
+        在传输期间占用下载链接所在主机的一个名额
+        :param url: 下载链接
+        """
+        host = urlparse(url).netloc.lower()
+        with self._cond:
+            while self._active.get(host, 0) >= self.max_per_host:
+                if self.is_cancelled and self.is_cancelled():
+                    raise DownloadCancelled()
+                self._cond.wait(self.POLL_INTERVAL)
+            self._active[host] = self._active.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[host] -= 1
+                if not self._active[host]:
+                    del self._active[host]
+                self._cond.notify_all()
+
+    def get_active(self, host):
+        """获取主机当前占用的名额数"""
+        with self._cond:
+            return self._active.get(host.lower(), 0)
+
+
+class DownloadScheduler:
+    """
+    批量下载调度器
+    使用固定数量的工作线程并发执行下载任务，任务按优先级出队，并汇总整体进度；
+    全局并发由工作线程数限制，每个下载主机同时传输的任务数由 HostSlots 按解析后的下载链接限制
+    （API会话的按主机限速器只在收到响应头前占用并发名额，不限制响应体的传输）
+    """
+
+    DEFAULT_MAX_WORKERS = 4
+    DEFAULT_MAX_PER_HOST = 2
+
+    def __init__(self, max_workers=None, max_per_host=None, max_retries=1,
+                 on_job_finished=None, on_job_failed=None, on_progress=None, journal=None, library=None,
+                 on_job_progress=None):
+        """
+        初始化调度器
+        :param max_workers: 全局并发下载数
+        :param max_per_host: 每个下载主机同时传输的任务数
+        :param max_retries: 单个任务的最大执行次数；网络错误已由API的重试策略处理，默认不再整体重跑
+        :param on_job_finished: 任务成功回调 (job)
+        :param on_job_failed: 任务失败回调 (job)
+        :param on_progress: 整体进度回调 (百分比)
+        :param journal: 任务日志 (JobJournal)，记录每个任务的状态以便重启后恢复
+        :param library: 本地曲库索引 (LibraryIndex)，已下载的歌曲直接跳过
+        :param on_job_progress: 单个任务的字节进度回调 (job, 已下载字节数, 总字节数)，每收到一块数据调用一次
+        """
+        self.max_workers = max(1, max_workers or self.DEFAULT_MAX_WORKERS)
+        self.max_per_host = max(1, max_per_host or self.DEFAULT_MAX_PER_HOST)
+        self.max_retries = max(1, max_retries)
+
+        self.on_job_finished = on_job_finished
+        self.on_job_failed = on_job_failed
+        self.on_progress = on_progress
+        self.on_job_progress = on_job_progress
+        self.journal = journal
+        self.library = library
+
+        # 优先级队列: (priority, seq, job)
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+        self._workers = []
+        self._running = 0
+        self._started = False
+        self._cancelled = False
+        self._closed = False
+        self.host_slots = HostSlots(self.max_per_host, lambda: self._cancelled)
+
+        self.jobs = []
+        self.finished_count = 0
+        self.failed_count = 0
+        self.skipped_count = 0
+        # 被取消的任务（包括尚未开始的），不计入失败
+        self.cancelled_count = 0
+
+    def add_job(self, api, song_id, save_path, priority=0, song=None, journal_id=None):
+        """
+        添加下载任务
+        :return: DownloadJob实例
+        """
+        job = DownloadJob(api, song_id, save_path, priority, song, journal_id)
+        with self._cond:
+            self.jobs.append(job)
+            heapq.heappush(self._queue, (job.priority, next(self._seq), job))
+            self._cond.notify()
+        return job
+
+    def start(self):
+        """启动工作线程"""
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"download-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def close(self):
+        """不再接受新任务，队列清空后工作线程自动退出"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def cancel(self):
+        """取消所有尚未开始的任务，正在下载的任务在收到下一块数据时中止（已下载的部分保留，下次继续）"""
+        with self._cond:
+            self._cancelled = True
+            self._closed = True
+            while self._queue:
+                _, _, job = heapq.heappop(self._queue)
+                job.status = DownloadJob.CANCELLED
+                self.cancelled_count += 1
+            self._cond.notify_all()
+
+    @property
+    def is_cancelled(self):
+        return self._cancelled
+
+    def wait(self, timeout=None):
+        """
+        等待所有任务完成
+        :param timeout: 超时时间（秒），None表示一直等待
+        :return: 是否全部完成
+        """
+        self.close()
+        deadline = None if timeout is None else time.time() + timeout
+        for worker in self._workers:
+            remaining = None if deadline is None else max(0, deadline - time.time())
+            worker.join(remaining)
+            if worker.is_alive():
+                return False
+        return True
+
+    def get_progress(self):
+        """
+        获取整体进度：已结束（完成、失败或取消）的任务占比
+        :return: 百分比 (0-100)
+        """
+        total = len(self.jobs)
+        if total == 0:
+            return 0
+        return int((self.finished_count + self.failed_count + self.cancelled_count) * 100 / total)
+
+    def _next_job(self):
+        """取出下一个任务，队列为空时等待"""
+        with self._cond:
+            while True:
+                if self._cancelled:
+                    return None
+
+                if self._queue:
+                    _, _, job = heapq.heappop(self._queue)
+                    self._running += 1
+                    job.status = DownloadJob.RUNNING
+                    return job
+
+                # 队列为空且不再接受新任务时退出
+                if self._closed and not self._queue:
+                    return None
+
+                self._cond.wait()
+
+    def _release(self, job):
+        """任务结束"""
+        with self._cond:
+            self._running -= 1
+            self._cond.notify_all()
+
+    def _worker_loop(self):
+        """工作线程主循环"""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._run_job(job)
+            finally:
+                self._release(job)
+
+    def _run_job(self, job):
+        """执行单个下载任务"""
+        save_dir = os.path.dirname(job.save_path)
+        if save_dir and not os.path.exists(save_dir):
+            os.makedirs(save_dir, exist_ok=True)
+
+        # 曲库中已有的歌曲不发送任何网络请求
+        existing = self.library.lookup(job.song_id, job.save_path, job.song) if self.library else None
+        if existing:
+            print(f"歌曲已存在，跳过下载: {existing}")
+            job.result_path = existing
+            job.status = DownloadJob.DONE
+            with self._cond:
+                self.skipped_count += 1
+        else:
+            self._download_job(job)
+
+        if job.status == DownloadJob.DONE:
+            self._record(job, JobJournal.DONE, result_path=job.result_path)
+            with self._cond:
+                self.finished_count += 1
+            self._notify(self.on_job_finished, job)
+        elif self._cancelled and job.status == DownloadJob.RUNNING and not job.error:
+            # 用户取消不算失败，任务在日志中保持排队状态，下次启动时继续下载
+            job.status = DownloadJob.CANCELLED
+            job.error = "下载已取消"
+            self._record(job, JobJournal.QUEUED)
+            with self._cond:
+                self.cancelled_count += 1
+        else:
+            job.status = DownloadJob.FAILED
+            self._record(job, JobJournal.FAILED, error=job.error)
+            with self._cond:
+                self.failed_count += 1
+            self._notify(self.on_job_failed, job)
+
+        self._notify(self.on_progress, self.get_progress())
+
+    def _download_job(self, job):
+        """下载任务，成功时设置任务状态为完成"""
+        self._record(job, JobJournal.RESOLVING)
+        downloading = []
+
+        def on_download_progress(downloaded, total):
+            # 收到第一块数据时，说明链接已解析完成并开始下载
+            if not downloading:
+                downloading.append(True)
+                self._record(job, JobJournal.DOWNLOADING)
+            self._notify(self.on_job_progress, job, downloaded, total)
+
+        for retry in range(self.max_retries):
+            if self._cancelled:
+                break
+            try:
+                saved_path = job.api.download(job.song_id, job.save_path, on_download_progress,
+                                               job.song.get('duration'), is_cancelled=lambda: self._cancelled,
+                                               host_slot=self.host_slots.hold)
+                if saved_path:
+                    job.result_path = saved_path
+                    job.status = DownloadJob.DONE
+                    if self.library is not None:
+                        self.library.add(saved_path, job.song_id, job.song)
+                    break
+                job.error = "下载失败，无法获取有效的音频文件"
+            except DownloadCancelled:
+                # 不设置错误，任务在日志中保持排队状态
+                break
+            except Exception as e:
+                print(f"下载任务出错 ({retry+1}/{self.max_retries}): {e}")
+                traceback.print_exc()
+                job.error = f"下载出错: {e}"
+
+            if retry < self.max_retries - 1 and not self._cancelled:
+                print(f"下载重试 ({retry+1}/{self.max_retries}): {job.song_id}")
+                time.sleep(1)
+
+    def _record(self, job, state, error=None, result_path=None):
+        """在任务日志中记录任务状态"""
+        if self.journal is not None and job.journal_id is not None:
+            self.journal.update(job.journal_id, state, error=error, result_path=result_path)
+
+    def _notify(self, callback, *args):
+        """安全调用回调函数"""
+        if not callback:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"调度器回调出错: {e}")
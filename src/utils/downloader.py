@@ -0,0 +1,445 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import threading
+
+import requests
+
+from src.utils.retry_policy import RetryPolicy
+from src.utils.content_hash import ContentHasher
+from src.utils.audio_verifier import InvalidAudio
+
+
+class DownloadCancelled(Exception):
+    """下载被取消"""
+    pass
+
+
+class Downloader:
+    """
+    支持断点续传的文件下载器
+    数据先写入 "保存路径.part"，并在 "保存路径.part.json" 中记录链接、ETag和文件大小，
+    重试或程序重启后通过 Range 请求从已下载的位置继续，完成后再重命名为目标文件。
+    服务器支持 Accept-Ranges 且文件较大时，将文件切分为多个区间并行下载，
+    各区间按偏移量写入预分配的临时文件。
+    下载的同时计算内容哈希 (content_hash)，用于识别重复的文件；
+    可选的音频校验器在数据到达时检查内容，发现不是有效音频时立即中止并删除临时文件
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    PART_SUFFIX = '.part'
+    META_SUFFIX = '.part.json'
+
+    # 分段下载参数
+    DEFAULT_SEGMENTS = 4
+    MIN_SEGMENT_SIZE = 1024 * 1024
+    SEGMENT_THRESHOLD = 2 * 1024 * 1024
+    # 分段进度写入断点信息的最小间隔（秒）
+    META_SAVE_INTERVAL = 1.0
+
+    # 收到响应后的处理方式（check_response的返回值）
+    # 从断点继续写入
+    RESUME = 'resume'
+    # 服务器返回了完整文件，从头写入
+    FRESH = 'fresh'
+    # 服务器返回的部分内容与断点不一致，丢弃临时文件后不带Range重新请求
+    RESTART = 'restart'
+
+    def __init__(self, session, chunk_size=None, max_segments=None, retry_policy=None):
+        """
+        初始化下载器
+        :param session: requests会话
+        :param chunk_size: 每次读取的块大小
+        :param max_segments: 最大分段数，1表示不分段
+        :param retry_policy: 断点续传的重试策略
+        """
+        self.session = session
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.max_segments = max(1, max_segments or self.DEFAULT_SEGMENTS)
+        # 最近一次下载完成的文件内容哈希，无法计算时为None
+        self.content_hash = None
+
+    @classmethod
+    def get_part_path(cls, save_path):
+        return save_path + cls.PART_SUFFIX
+
+    @classmethod
+    def get_meta_path(cls, save_path):
+        return save_path + cls.META_SUFFIX
+
+    @classmethod
+    def discard_partial(cls, save_path):
+        """删除未完成的临时文件"""
+        for path in (cls.get_part_path(save_path), cls.get_meta_path(save_path)):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError as e:
+                print(f"删除临时文件失败: {path}, {e}")
+
+    def download(self, url, save_path, headers=None, timeout=30, max_retries=3,
+                 progress_callback=None, is_cancelled=None, verifier=None):
+        """
+        下载文件，失败时自动从断点继续
+        :param url: 下载链接
+        :param save_path: 保存路径
+        :param headers: 额外的请求头
+        :param timeout: 超时时间
+        :param max_retries: 最大尝试次数，重试间隔由重试策略决定
+        :param progress_callback: 进度回调 (已下载字节数, 总字节数)，总大小未知时为0
+        :param is_cancelled: 返回是否已取消的函数
+        :param verifier: 音频校验器 (AudioVerifier)，校验失败时抛出InvalidAudio
+        :return: 文件大小（字节）
+        """
+        save_dir = os.path.dirname(save_path)
+        if save_dir and not os.path.exists(save_dir):
+            os.makedirs(save_dir, exist_ok=True)
+
+        self.content_hash = None
+        attempt = 0
+        while True:
+            attempt += 1
+            self.retry_policy.record_request()
+            try:
+                return self._download_once(url, save_path, headers, timeout, progress_callback, is_cancelled,
+                                           verifier)
+            except DownloadCancelled:
+                raise
+            except InvalidAudio as e:
+                # 内容无效，重试同一链接没有意义
+                print(f"下载内容无效: {e}")
+                self.discard_partial(save_path)
+                raise
+            except (requests.exceptions.RequestException, IOError) as e:
+                print(f"下载尝试 {attempt}/{max_retries} 失败: {e}")
+                delay = self.retry_policy.next_delay(attempt, e, max_retries)
+                if delay is None:
+                    raise
+                time.sleep(delay)  # 等待后从断点继续
+
+    @classmethod
+    def load_meta(cls, save_path):
+        """读取断点信息"""
+        part_path = cls.get_part_path(save_path)
+        meta_path = cls.get_meta_path(save_path)
+        if not os.path.exists(part_path) or not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            meta['offset'] = os.path.getsize(part_path)
+            return meta
+        except (OSError, ValueError) as e:
+            print(f"读取断点信息失败: {e}")
+            return None
+
+    @classmethod
+    def save_meta(cls, save_path, url, etag, length, segments=None):
+        """写入断点信息"""
+        meta = {'url': url, 'etag': etag, 'length': length}
+        if segments:
+            # 每个分段为 [起始位置, 结束位置(不含), 已下载字节数]
+            meta['segments'] = [list(segment) for segment in segments]
+        with open(cls.get_meta_path(save_path), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    @staticmethod
+    def can_resume(meta, url, status_code, response_headers):
+        """
+        判断服务器返回的是否为同一文件的剩余部分
+        :param meta: 断点信息
+        :param url: 本次请求的链接
+        :param status_code: 响应状态码
+        :param response_headers: 响应头
+        """
+        if status_code != 206:
+            return False
+
+        # Content-Range: bytes start-end/total
+        content_range = response_headers.get('Content-Range', '')
+        try:
+            range_part, total = content_range.split(' ', 1)[1].split('/')
+            start = int(range_part.split('-')[0])
+            total = int(total) if total != '*' else 0
+        except (IndexError, ValueError):
+            return False
+
+        if start != meta['offset']:
+            return False
+        if meta.get('length') and total and total != meta['length']:
+            return False
+
+        # 链接可能已重新解析，优先用ETag确认是同一文件
+        etag = response_headers.get('ETag')
+        if meta.get('etag') and etag:
+            return etag == meta['etag']
+        return url == meta.get('url')
+
+    @classmethod
+    def check_response(cls, meta, url, status_code, response_headers):
+        """
+        根据响应判断如何继续下载，同步和异步下载共用
+        :param meta: 断点信息，本次请求未带Range时为None
+        :param url: 本次请求的链接
+        :param status_code: 响应状态码
+        :param response_headers: 响应头
+        :return: RESUME、FRESH 或 RESTART
+        :raises IOError: 未请求范围时服务器返回了部分内容
+        """
+        if meta and cls.can_resume(meta, url, status_code, response_headers):
+            return cls.RESUME
+        if status_code == 200:
+            return cls.FRESH
+        if meta:
+            # 206但不是断点之后的内容（链接已变化或Content-Range起点不符），不能当作完整文件写入
+            return cls.RESTART
+        raise IOError(f"服务器返回了无法使用的响应: {status_code}")
+
+    def _download_once(self, url, save_path, headers, timeout, progress_callback, is_cancelled, verifier=None):
+        """执行一次下载（可能是续传）"""
+        part_path = self.get_part_path(save_path)
+        request_headers = dict(headers or {})
+
+        meta = self.load_meta(save_path)
+        if meta and meta.get('segments'):
+            if meta.get('etag') or url == meta.get('url'):
+                # 上次为分段下载，按分段继续
+                return self._download_segments(url, save_path, meta, headers, timeout, progress_callback, is_cancelled,
+                                               verifier=verifier)
+            # 无法确认是同一文件，重新下载
+            self.discard_partial(save_path)
+            meta = None
+
+        if meta and meta['offset'] > 0:
+            if meta.get('length') and meta['offset'] >= meta['length']:
+                # 上次已下载完整但未完成重命名
+                if verifier is not None:
+                    verifier.prime(part_path, meta['offset'])
+                    verifier.finish(meta['offset'])
+                self.content_hash = ContentHasher.file_hash(part_path)
+                os.replace(part_path, save_path)
+                self.discard_partial(save_path)
+                return meta['length']
+            request_headers['Range'] = f"bytes={meta['offset']}-"
+            if meta.get('etag'):
+                request_headers['If-Range'] = meta['etag']
+
+        with self.session.get(url, headers=request_headers, stream=True, timeout=timeout) as response:
+            if response.status_code == 416 and meta:
+                # 请求的范围无效，说明断点信息与服务器文件不一致，重新下载
+                print("断点续传范围无效，重新下载")
+                self.discard_partial(save_path)
+                raise IOError("断点续传范围无效")
+            response.raise_for_status()
+
+            action = self.check_response(meta if 'Range' in request_headers else None, url,
+                                         response.status_code, response.headers)
+            if action == self.RESTART:
+                print("续传内容与断点不一致，重新下载")
+            elif action == self.RESUME:
+                offset = meta['offset']
+                total_size = meta.get('length') or 0
+                mode = 'ab'
+                print(f"从断点继续下载: {offset}/{total_size} 字节")
+            else:
+                offset = 0
+                total_size = int(response.headers.get('Content-Length', 0))
+                mode = 'wb'
+
+                if self._should_segment(response, total_size):
+                    # 当前响应作为第一个分段继续读取，其余分段并行请求
+                    meta = self._init_segments(save_path, url, response.headers.get('ETag'), total_size)
+                    return self._download_segments(url, save_path, meta, headers, timeout,
+                                                   progress_callback, is_cancelled, first_response=response,
+                                                   verifier=verifier)
+
+                self.save_meta(save_path, url, response.headers.get('ETag'), total_size)
+
+            if action != self.RESTART:
+                hasher = ContentHasher()
+                hasher.prime(part_path, 0, offset)
+                if verifier is not None:
+                    verifier.prime(part_path, offset)
+                    verifier.set_total_size(total_size)
+                downloaded = offset
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if is_cancelled and is_cancelled():
+                            raise DownloadCancelled("下载已取消")
+                        if chunk:
+                            if verifier is not None:
+                                verifier.update(downloaded, chunk)
+                            f.write(chunk)
+                            hasher.update(downloaded, chunk)
+                            downloaded += len(chunk)
+                            if progress_callback:
+                                progress_callback(downloaded, total_size)
+
+        if action == self.RESTART:
+            # 丢弃临时文件后断点信息不存在，重新请求时不再带Range
+            self.discard_partial(save_path)
+            return self._download_once(url, save_path, headers, timeout, progress_callback, is_cancelled, verifier)
+
+        if total_size and downloaded < total_size:
+            raise IOError(f"下载不完整: {downloaded}/{total_size} 字节")
+
+        if verifier is not None:
+            verifier.finish(downloaded)
+        self.content_hash = hasher.hexdigest(downloaded)
+        os.replace(part_path, save_path)
+        self.discard_partial(save_path)
+        return downloaded
+
+    def _should_segment(self, response, total_size):
+        """判断是否使用分段下载"""
+        if self.max_segments <= 1 or response.status_code != 200:
+            return False
+        if total_size < self.SEGMENT_THRESHOLD:
+            return False
+        return 'bytes' in response.headers.get('Accept-Ranges', '').lower()
+
+    def _init_segments(self, save_path, url, etag, total_size):
+        """切分区间并预分配临时文件，区间边界与哈希分块对齐"""
+        count = min(self.max_segments, max(1, total_size // self.MIN_SEGMENT_SIZE))
+        block_size = ContentHasher.BLOCK_SIZE
+        segment_size = max(block_size, total_size // count // block_size * block_size)
+        segments = []
+        for i in range(count):
+            start = i * segment_size
+            end = total_size if i == count - 1 else start + segment_size
+            segments.append([start, end, 0])
+
+        with open(self.get_part_path(save_path), 'wb') as f:
+            f.truncate(total_size)
+        self.save_meta(save_path, url, etag, total_size, segments)
+        print(f"分段下载: {count} 段, 共 {total_size} 字节")
+
+        return {'url': url, 'etag': etag, 'length': total_size, 'segments': segments}
+
+    @staticmethod
+    def _write_at(fd, data, position):
+        """按偏移量写入数据"""
+        view = memoryview(data)
+        while view:
+            if hasattr(os, 'pwrite'):
+                written = os.pwrite(fd, view, position)
+            else:
+                # Windows没有pwrite，每个线程使用独立的文件描述符，可以安全地定位后写入
+                os.lseek(fd, position, os.SEEK_SET)
+                written = os.write(fd, view)
+            view = view[written:]
+            position += written
+
+    def _download_segments(self, url, save_path, meta, headers, timeout,
+                           progress_callback, is_cancelled, first_response=None, verifier=None):
+        """并行下载各个分段"""
+        part_path = self.get_part_path(save_path)
+        total_size = meta['length']
+        segments = meta['segments']
+        etag = meta.get('etag')
+
+        lock = threading.Lock()
+        abort = threading.Event()
+        errors = []
+        state = {'downloaded': sum(segment[2] for segment in segments), 'saved_at': time.time()}
+
+        # 各分段内数据按顺序到达，可以边下载边计算哈希；续传时先读取已下载的部分
+        hasher = ContentHasher()
+        for segment in segments:
+            hasher.prime(part_path, segment[0], segment[0] + segment[2])
+        if verifier is not None:
+            # 只有第一个分段的开头用于识别格式
+            verifier.prime(part_path, segments[0][2])
+            verifier.set_total_size(total_size)
+
+        def save_progress(force=False):
+            with lock:
+                now = time.time()
+                if force or now - state['saved_at'] >= self.META_SAVE_INTERVAL:
+                    state['saved_at'] = now
+                    self.save_meta(save_path, meta['url'], etag, total_size, segments)
+
+        def fetch(segment, response=None):
+            start, end = segment[0], segment[1]
+            own_response = response is None
+            fd = os.open(part_path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+            try:
+                if own_response:
+                    request_headers = dict(headers or {})
+                    request_headers['Range'] = f"bytes={start + segment[2]}-{end - 1}"
+                    if etag:
+                        request_headers['If-Range'] = etag
+                    response = self.session.get(url, headers=request_headers, stream=True, timeout=timeout)
+                    if response.status_code == 200:
+                        # If-Range不匹配时服务器返回整个文件，说明文件已变化
+                        self.discard_partial(save_path)
+                        raise IOError("服务器文件已变化，需要重新下载")
+                    response.raise_for_status()
+
+                position = start + segment[2]
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if abort.is_set():
+                        return
+                    if is_cancelled and is_cancelled():
+                        raise DownloadCancelled("下载已取消")
+                    if not chunk:
+                        continue
+                    chunk = chunk[:end - position]
+                    if verifier is not None:
+                        verifier.update(position, chunk)
+                    self._write_at(fd, chunk, position)
+                    hasher.update(position, chunk)
+                    position += len(chunk)
+                    segment[2] += len(chunk)
+                    with lock:
+                        state['downloaded'] += len(chunk)
+                        downloaded = state['downloaded']
+                    if progress_callback:
+                        progress_callback(downloaded, total_size)
+                    save_progress()
+                    if position >= end:
+                        break
+
+                if position < end:
+                    raise IOError(f"分段下载不完整: {position - start}/{end - start} 字节")
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                abort.set()
+            finally:
+                os.close(fd)
+                if own_response and response is not None:
+                    response.close()
+
+        threads = []
+        for segment in segments:
+            if segment[0] + segment[2] >= segment[1]:
+                continue
+            response = None
+            if first_response is not None and segment[0] == 0 and segment[2] == 0:
+                response = first_response
+            thread = threading.Thread(target=fetch, args=(segment, response), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            if os.path.exists(self.get_meta_path(save_path)):
+                save_progress(force=True)
+            for error in errors:
+                if isinstance(error, (DownloadCancelled, InvalidAudio)):
+                    raise error
+            raise errors[0]
+
+        if verifier is not None:
+            verifier.finish(total_size)
+        self.content_hash = hasher.hexdigest(total_size)
+        os.replace(part_path, save_path)
+        self.discard_partial(save_path)
+        return total_size
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from src.utils.tools import Tools
+
+
+class JobJournal:
+    """
+    批量下载任务日志
+    把每个批次中每首歌曲的状态 (queued/resolving/downloading/done/failed) 持久化到SQLite，
+    程序被关闭或崩溃后可以从日志恢复未完成的批次，已完成的歌曲不再下载
+    """
+
+    # 任务状态
+    QUEUED = 'queued'
+    RESOLVING = 'resolving'
+    DOWNLOADING = 'downloading'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    # 恢复时需要重新下载的状态
+    UNFINISHED = (QUEUED, RESOLVING, DOWNLOADING)
+
+    DB_FILENAME = 'download_jobs.db'
+
+    def __init__(self, db_path=None):
+        """
+        初始化任务日志
+        :param db_path: SQLite数据库路径，默认保存在应用数据目录
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disabled = False
+
+    def create_batch(self, platform, jobs):
+        """
+        记录一个新的下载批次，所有任务初始状态为 queued
+        :param platform: 平台名称，恢复时用于获取API实例
+        :param jobs: 任务列表 [(song, song_id, save_path), ...]
+        :return: (批次ID, [任务ID, ...])，日志不可用时返回 (None, [None, ...])
+        """
+        now = time.time()
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return None, [None] * len(jobs)
+            try:
+                with conn:
+                    cursor = conn.execute('INSERT INTO batches (platform, created_at) VALUES (?, ?)', (platform, now))
+                    batch_id = cursor.lastrowid
+                    job_ids = []
+                    for seq, (song, song_id, save_path) in enumerate(jobs):
+                        cursor = conn.execute(
+                            'INSERT INTO jobs (batch_id, seq, song, song_id, save_path, state, updated_at) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (batch_id, seq, json.dumps(song, ensure_ascii=False), str(song_id), save_path,
+                             self.QUEUED, now)
+                        )
+                        job_ids.append(cursor.lastrowid)
+                return batch_id, job_ids
+            except sqlite3.Error as e:
+                print(f"写入下载任务日志失败: {e}")
+                return None, [None] * len(jobs)
+
+    def update(self, job_id, state, error=None, result_path=None):
+        """
+        更新任务状态
+        :param job_id: 任务ID，为None时忽略
+        :param state: 新状态
+        :param error: 错误信息
+        :param result_path: 下载完成后的文件路径
+        """
+        if job_id is None:
+            return
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute(
+                        'UPDATE jobs SET state = ?, error = ?, result_path = ?, updated_at = ? WHERE id = ?',
+                        (state, error, result_path, time.time(), job_id)
+                    )
+            except sqlite3.Error as e:
+                print(f"更新下载任务日志失败: {e}")
+
+    def get_pending_batch(self):
+        """
+        获取最近一个有未完成任务的批次
+        :return: 批次ID，没有时返回None
+        """
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    'SELECT batch_id FROM jobs WHERE state IN (?, ?, ?) ORDER BY batch_id DESC LIMIT 1',
+                    self.UNFINISHED
+                ).fetchone()
+                return row[0] if row else None
+            except sqlite3.Error as e:
+                print(f"读取下载任务日志失败: {e}")
+                return None
+
+    def load_batch(self, batch_id):
+        """
+        读取批次中的所有任务
+        :param batch_id: 批次ID
+        :return: (平台名称, 任务列表)，任务为字典 (id, song, song_id, save_path, state, error, result_path)
+        """
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return None, []
+            try:
+                row = conn.execute('SELECT platform FROM batches WHERE id = ?', (batch_id,)).fetchone()
+                rows = conn.execute(
+                    'SELECT id, song, song_id, save_path, state, error, result_path FROM jobs '
+                    'WHERE batch_id = ? ORDER BY seq', (batch_id,)
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"读取下载任务日志失败: {e}")
+                return None, []
+
+        jobs = []
+        for job_id, song, song_id, save_path, state, error, result_path in rows:
+            jobs.append({
+                'id': job_id,
+                'song': json.loads(song),
+                'song_id': song_id,
+                'save_path': save_path,
+                'state': state,
+                'error': error,
+                'result_path': result_path,
+            })
+        return (row[0] if row else None), jobs
+
+    def remove_batch(self, batch_id):
+        """删除批次，批次全部结束后调用"""
+        if batch_id is None:
+            return
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute('DELETE FROM jobs WHERE batch_id = ?', (batch_id,))
+                    conn.execute('DELETE FROM batches WHERE id = ?', (batch_id,))
+            except sqlite3.Error as e:
+                print(f"删除下载任务日志失败: {e}")
+
+    def remove_pending(self):
+        """删除所有有未完成任务的批次，用户放弃恢复时调用"""
+        while True:
+            batch_id = self.get_pending_batch()
+            if batch_id is None:
+                return
+            self.remove_batch(batch_id)
+
+    def _get_conn(self):
+        """打开SQLite数据库（调用方需持有锁），失败时不记录日志"""
+        if self._conn is not None or self._disabled:
+            return self._conn
+        try:
+            if not self.db_path:
+                self.db_path = os.path.join(Tools.get_app_data_dir(), self.DB_FILENAME)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # WAL模式下每次状态更新只追加日志，崩溃后已提交的状态不会丢失
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS batches ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, platform TEXT, created_at REAL NOT NULL)'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, batch_id INTEGER NOT NULL, seq INTEGER NOT NULL, '
+                'song TEXT NOT NULL, song_id TEXT NOT NULL, save_path TEXT NOT NULL, '
+                'state TEXT NOT NULL, error TEXT, result_path TEXT, updated_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch_id, state)')
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"打开下载任务日志失败: {e}，批量下载将无法在重启后恢复")
+            self._conn = None
+            self._disabled = True
+        return self._conn
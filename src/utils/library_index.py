@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import sqlite3
+import threading
+
+from src.utils.tools import Tools
+from src.utils.content_hash import ContentHasher
+
+
+class LibraryIndex:
+    """
+    本地曲库索引
+    记录已下载歌曲的 (音源, 歌曲ID, 比特率, 路径, 大小, 哈希)，下载完成时更新，
+    并可增量扫描下载目录；下载前先查询索引，已存在的歌曲不再发送任何网络请求。
+    内容哈希相同的文件（不同音源或文件名下的同一录音）只保留一份数据，其余为硬链接
+    """
+
+    DB_FILENAME = 'library.db'
+    # 扫描时识别的音频文件扩展名
+    AUDIO_EXTENSIONS = ('.mp3', '.flac', '.m4a', '.ogg', '.wav', '.ape')
+
+    def __init__(self, db_path=None):
+        """
+        初始化曲库索引
+        :param db_path: SQLite数据库路径，默认保存在应用数据目录
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disabled = False
+
+    @staticmethod
+    def parse_song_id(song_id):
+        """
+        解析歌曲ID，与GD音乐API的ID格式一致
+        :param song_id: "id"、"id|br"、"source:id" 或 "source:id|br"
+        :return: (音源, 原始ID, 比特率)，没有音源时默认为网易云音乐，没有比特率时为None
+        """
+        song_id = str(song_id)
+        bitrate = None
+        if '|' in song_id:
+            song_id, br_str = song_id.split('|', 1)
+            try:
+                bitrate = int(br_str)
+            except ValueError:
+                bitrate = None
+
+        source = 'netease'
+        if ':' in song_id:
+            source, song_id = song_id.split(':', 1)
+        return source, song_id, bitrate
+
+    @staticmethod
+    def parse_filename(path):
+        """
+        从 "歌曲名 - 歌手.扩展名" 格式的文件名中解析歌曲名和歌手
+        :return: (歌曲名, 歌手)
+        """
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if ' - ' in stem:
+            name, singer = stem.split(' - ', 1)
+            return name.strip(), singer.strip()
+        return stem.strip(), ''
+
+    def add(self, path, song_id=None, song=None, file_hash=None):
+        """
+        记录下载完成的文件，未提供的字段保留索引中原有的值（文件大小未变时保留哈希）
+        :param path: 文件路径
+        :param song_id: 歌曲ID
+        :param song: 歌曲信息字典 (name, singer)
+        :param file_hash: 文件内容哈希
+        """
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            print(f"记录曲库索引失败: {e}")
+            return
+
+        path = os.path.abspath(path)
+        source, raw_id, bitrate = self.parse_song_id(song_id) if song_id else (None, None, None)
+        if song:
+            name, singer = song.get('name', ''), song.get('singer', '')
+        else:
+            name, singer = self.parse_filename(path)
+
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return
+            try:
+                old = conn.execute(
+                    'SELECT source, song_id, bitrate, size, hash FROM tracks WHERE path = ?', (path,)
+                ).fetchone()
+                if old is not None:
+                    if raw_id is None:
+                        source, raw_id, bitrate = old[0], old[1], old[2]
+                    if file_hash is None and old[3] == stat.st_size:
+                        file_hash = old[4]
+                with conn:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO tracks '
+                        '(path, source, song_id, bitrate, size, mtime, hash, name, singer, indexed_at) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (path, source, raw_id, bitrate, stat.st_size, stat.st_mtime,
+                         file_hash, name, singer, time.time())
+                    )
+            except sqlite3.Error as e:
+                print(f"写入曲库索引失败: {e}")
+
+    def remove(self, path):
+        """从索引中删除文件"""
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute('DELETE FROM tracks WHERE path = ?', (os.path.abspath(path),))
+            except sqlite3.Error as e:
+                print(f"删除曲库索引失败: {e}")
+
+    def lookup(self, song_id, save_path=None, song=None):
+        """
+        查找已下载的歌曲，只读取本地索引和文件状态，不发送网络请求
+        依次按 歌曲ID、保存路径、歌曲名和歌手 匹配，索引中已失效的记录会被删除；
+        请求的歌曲ID带比特率时，只接受音质相同或更好的文件，按歌曲名和歌手匹配时还要求已知比特率
+        :param song_id: 歌曲ID
+        :param save_path: 计划的保存路径
+        :param song: 歌曲信息字典 (name, singer)
+        :return: 已存在的文件路径，没有时返回None
+        """
+        source, raw_id, bitrate = self.parse_song_id(song_id)
+        # (查询, 参数, 是否接受比特率未知的文件)
+        queries = [('SELECT path, size, bitrate FROM tracks WHERE source = ? AND song_id = ?', (source, raw_id), True)]
+        if save_path:
+            queries.append(('SELECT path, size, bitrate FROM tracks WHERE path = ?', (os.path.abspath(save_path),),
+                            True))
+        if song and song.get('name'):
+            queries.append(('SELECT path, size, bitrate FROM tracks WHERE name = ? AND singer = ?',
+                            (song.get('name', ''), song.get('singer', '')), False))
+
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return None
+            try:
+                for sql, params, allow_unknown in queries:
+                    for path, size, existing_bitrate in conn.execute(sql, params).fetchall():
+                        if not self._is_present(path, size):
+                            print(f"曲库中的文件已失效: {path}")
+                            with conn:
+                                conn.execute('DELETE FROM tracks WHERE path = ?', (path,))
+                            continue
+                        if self._meets_bitrate(existing_bitrate, bitrate, allow_unknown):
+                            return path
+                        print(f"曲库中的文件音质低于请求的音质，重新下载: {path}")
+            except sqlite3.Error as e:
+                print(f"读取曲库索引失败: {e}")
+        return None
+
+    @staticmethod
+    def _meets_bitrate(existing, requested, allow_unknown):
+        """
+        已有文件的音质是否满足请求
+        :param existing: 已有文件的比特率，未知时为None
+        :param requested: 请求的比特率，未指定时为None
+        :param allow_unknown: 是否接受比特率未知的文件
+        """
+        if requested is None:
+            return True
+        if existing is None:
+            return allow_unknown
+        return existing >= requested
+
+    def find_duplicate(self, path, file_hash):
+        """
+        查找内容相同的其他文件；大小相同但尚未计算哈希的文件（例如扫描得到的）在此时计算并记录哈希
+        :param path: 新文件路径
+        :param file_hash: 新文件的内容哈希
+        :return: 内容相同的已有文件路径，没有时返回None
+        """
+        path = os.path.abspath(path)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return None
+            try:
+                rows = conn.execute(
+                    'SELECT path, hash FROM tracks WHERE size = ? AND path != ? AND (hash = ? OR hash IS NULL)',
+                    (size, path, file_hash)
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"读取曲库索引失败: {e}")
+                return None
+
+        for candidate, candidate_hash in rows:
+            if not self._is_present(candidate, size):
+                continue
+            if candidate_hash is None:
+                candidate_hash = ContentHasher.file_hash(candidate)
+                if candidate_hash is None:
+                    continue
+                self._set_hash(candidate, candidate_hash)
+            if candidate_hash == file_hash:
+                return candidate
+        return None
+
+    def deduplicate(self, path, file_hash):
+        """
+        下载完成后去重：曲库中已有内容相同的文件时，把新文件替换为指向已有文件的硬链接，
+        不支持硬链接时保留副本；并在索引中记录新文件的哈希
+        :param path: 新文件路径
+        :param file_hash: 下载时计算的内容哈希，为None时不去重
+        :return: 内容相同的已有文件路径，没有重复时返回None
+        """
+        if not file_hash or not os.path.exists(path):
+            return None
+
+        existing = self.find_duplicate(path, file_hash)
+        if existing is not None:
+            try:
+                if not os.path.samefile(existing, path):
+                    link_path = path + '.link'
+                    if os.path.exists(link_path):
+                        os.remove(link_path)
+                    os.link(existing, link_path)
+                    os.replace(link_path, path)
+                    print(f"重复的文件，已硬链接到: {existing}")
+            except OSError as e:
+                print(f"无法创建硬链接，保留重复的文件: {e}")
+
+        self.add(path, file_hash=file_hash)
+        return existing
+
+    def _set_hash(self, path, file_hash):
+        """记录文件哈希"""
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return
+            try:
+                with conn:
+                    conn.execute('UPDATE tracks SET hash = ? WHERE path = ?', (file_hash, path))
+            except sqlite3.Error as e:
+                print(f"写入曲库索引失败: {e}")
+
+    def scan(self, directory):
+        """
+        增量扫描目录：新增或修改过的音频文件写入索引，已删除的文件从索引中移除，
+        未变化的文件只比较大小和修改时间
+        :param directory: 目录路径
+        :return: (新增或更新的文件数, 删除的文件数)
+        """
+        if not directory or not os.path.isdir(directory):
+            return 0, 0
+        directory = os.path.abspath(directory)
+
+        found = {}
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if not filename.lower().endswith(self.AUDIO_EXTENSIONS):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found[path] = (stat.st_size, stat.st_mtime)
+
+        prefix = os.path.join(directory, '')
+        with self._lock:
+            conn = self._get_conn()
+            if conn is None:
+                return 0, 0
+            try:
+                indexed = {
+                    path: (size, mtime) for path, size, mtime in conn.execute(
+                        'SELECT path, size, mtime FROM tracks WHERE substr(path, 1, ?) = ?',
+                        (len(prefix), prefix)
+                    )
+                }
+                now = time.time()
+                changed = 0
+                with conn:
+                    for path, (size, mtime) in found.items():
+                        old = indexed.get(path)
+                        if old == (size, mtime):
+                            continue
+                        changed += 1
+                        if old is None:
+                            name, singer = self.parse_filename(path)
+                            conn.execute(
+                                'INSERT INTO tracks (path, size, mtime, name, singer, indexed_at) '
+                                'VALUES (?, ?, ?, ?, ?, ?)',
+                                (path, size, mtime, name, singer, now)
+                            )
+                        else:
+                            # 文件内容已变化，原来的哈希不再有效
+                            conn.execute(
+                                'UPDATE tracks SET size = ?, mtime = ?, hash = NULL, indexed_at = ? WHERE path = ?',
+                                (size, mtime, now, path)
+                            )
+                    removed = [path for path in indexed if path not in found]
+                    conn.executemany('DELETE FROM tracks WHERE path = ?', [(path,) for path in removed])
+            except sqlite3.Error as e:
+                print(f"扫描曲库失败: {e}")
+                return 0, 0
+
+        if changed or removed:
+            print(f"曲库扫描完成: {directory}，更新 {changed} 个文件，移除 {len(removed)} 个文件")
+        return changed, len(removed)
+
+    @staticmethod
+    def _is_present(path, size):
+        """文件是否仍然存在且大小与索引一致"""
+        try:
+            return os.path.getsize(path) == size
+        except OSError:
+            return False
+
+    def _get_conn(self):
+        """打开SQLite数据库（调用方需持有锁），失败时不使用索引"""
+        if self._conn is not None or self._disabled:
+            return self._conn
+        try:
+            if not self.db_path:
+                self.db_path = os.path.join(Tools.get_app_data_dir(), self.DB_FILENAME)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS tracks ('
+                'path TEXT PRIMARY KEY, source TEXT, song_id TEXT, bitrate INTEGER, '
+                'size INTEGER NOT NULL, mtime REAL NOT NULL, hash TEXT, '
+                'name TEXT, singer TEXT, indexed_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_tracks_song ON tracks (source, song_id)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_tracks_name ON tracks (name, singer)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_tracks_size ON tracks (size)')
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"打开曲库索引失败: {e}，下载前不检查已有文件")
+            self._conn = None
+            self._disabled = True
+        return self._conn
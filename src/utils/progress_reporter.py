@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+from collections import deque
+
+
+class ProgressReporter:
+    """
+    下载进度汇总与节流
+    下载线程每收到一块数据就调用update，这里合并为最多每秒20次、且百分比有变化时才回调，
+    避免大量跨线程信号阻塞界面；同时按最近几秒的数据量计算下载速度和剩余时间。
+    可同时汇总多个任务（批量下载），单个下载时任务键为None
+    """
+
+    # 两次回调的最小间隔（秒），即最高20Hz
+    MIN_INTERVAL = 0.05
+    # 百分比变化小于该值时不回调
+    MIN_DELTA = 1
+    # 百分比不变时，仍按该间隔刷新速度和剩余时间（秒）
+    STATS_INTERVAL = 1.0
+    # 计算速度使用的时间窗口（秒）
+    SPEED_WINDOW = 3.0
+
+    def __init__(self, callback, total_jobs=1, done_jobs=0, min_interval=None, min_delta=None):
+        """
+        :param callback: 进度回调 (百分比, 速度 字节/秒, 剩余秒数)，剩余时间未知时为-1
+        :param total_jobs: 任务总数
+        :param done_jobs: 已完成的任务数（恢复批量下载时）
+        :param min_interval: 两次回调的最小间隔（秒）
+        :param min_delta: 触发回调的最小百分比变化
+        """
+        self.callback = callback
+        self.total_jobs = max(1, total_jobs)
+        self.done_jobs = done_jobs
+        self.min_interval = self.MIN_INTERVAL if min_interval is None else min_interval
+        self.min_delta = self.MIN_DELTA if min_delta is None else min_delta
+
+        # 任务键 -> [已下载字节数, 总字节数]
+        self._jobs = {}
+        # 已完成任务的总字节数，用于估算尚未开始的任务大小
+        self._finished_bytes = 0
+        self._finished_sized = 0
+        # (时间, 累计字节数) 采样
+        self._samples = deque()
+        self._transferred = 0
+        self._lock = threading.Lock()
+
+        self._last_time = 0
+        self._last_percent = -1
+
+    def update(self, downloaded, total, job=None):
+        """
+        记录任务的下载进度，可在任意线程调用
+        :param downloaded: 已下载字节数
+        :param total: 总字节数，未知时为0
+        :param job: 任务键
+        """
+        with self._lock:
+            state = self._jobs.setdefault(job, [downloaded, total])
+            self._transferred += max(0, downloaded - state[0])
+            state[0], state[1] = downloaded, total
+            self._sample(time.monotonic())
+        self._maybe_emit()
+
+    def job_finished(self, job=None):
+        """任务结束（成功、失败或跳过），并立即回调"""
+        with self._lock:
+            state = self._jobs.pop(job, None)
+            if state is not None and state[1] > 0:
+                self._finished_bytes += state[1]
+                self._finished_sized += 1
+            self.done_jobs += 1
+        self._maybe_emit(force=True)
+
+    @property
+    def speed(self):
+        """当前下载速度（字节/秒）"""
+        with self._lock:
+            return self._speed(time.monotonic())
+
+    def _sample(self, now):
+        """记录采样点，丢弃窗口外的旧采样（调用方需持有锁）"""
+        self._samples.append((now, self._transferred))
+        while len(self._samples) > 2 and now - self._samples[1][0] > self.SPEED_WINDOW:
+            self._samples.popleft()
+
+    def _speed(self, now):
+        """按时间窗口内的采样计算速度（调用方需持有锁）"""
+        if len(self._samples) < 2:
+            return 0.0
+        start_time, start_bytes = self._samples[0]
+        elapsed = now - start_time
+        if elapsed <= 0:
+            return 0.0
+        return (self._transferred - start_bytes) / elapsed
+
+    def _snapshot(self, now):
+        """
+        计算整体进度
+        :return: (百分比, 速度, 剩余秒数)
+        """
+        fraction = 0.0
+        remaining = 0
+        unknown = False
+        for downloaded, total in self._jobs.values():
+            if total > 0:
+                fraction += min(downloaded / total, 1.0)
+                remaining += max(0, total - downloaded)
+            else:
+                unknown = True
+
+        # 尚未开始的任务按已完成任务的平均大小估算
+        pending = max(0, self.total_jobs - self.done_jobs - len(self._jobs))
+        if pending:
+            sizes = [total for _, total in self._jobs.values() if total > 0]
+            known = self._finished_bytes + sum(sizes)
+            count = self._finished_sized + len(sizes)
+            if count:
+                remaining += pending * known / count
+            else:
+                unknown = True
+
+        percent = int(min(self.done_jobs + fraction, self.total_jobs) * 100 / self.total_jobs)
+        speed = self._speed(now)
+        eta = remaining / speed if speed > 0 and not unknown else -1
+        return percent, speed, eta
+
+    def _maybe_emit(self, force=False):
+        """满足节流条件时回调"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_time
+            if not force and elapsed < self.min_interval:
+                return
+            percent, speed, eta = self._snapshot(now)
+            if not force and abs(percent - self._last_percent) < self.min_delta and elapsed < self.STATS_INTERVAL:
+                return
+            self._last_time = now
+            self._last_percent = percent
+
+        try:
+            self.callback(percent, speed, eta)
+        except Exception as e:
+            print(f"进度回调出错: {e}")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def first_acceptable(candidates, resolve, accept):
+    """
+    并发解析所有候选项，按优先级顺序返回第一个可接受的结果
+    优先级最高的候选项一旦可接受就立即返回，不等待其余候选项；
+    尚未开始的解析会被取消，已发出的请求在后台结束（结果仍会写入各自的缓存）
+    :param candidates: 按优先级从高到低排列的候选项，例如比特率列表
+    :param resolve: 解析函数 candidate -> result，在工作线程中执行
+    :param accept: 判断结果是否可接受的函数 result -> bool，在调用线程中执行
+    :return: (候选项, 结果)，都不可接受时返回 (None, None)
+    """
+    candidates = list(candidates)
+    if not candidates:
+        return None, None
+
+    executor = ThreadPoolExecutor(max_workers=len(candidates))
+    futures = [executor.submit(resolve, candidate) for candidate in candidates]
+    try:
+        for candidate, future in zip(candidates, futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"解析 {candidate} 出错: {e}")
+                continue
+            if accept(result):
+                return candidate, result
+        return None, None
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def hedged_first(candidates, resolve, hedge_delay=1.0, timeout=None):
+    """
+    对冲请求：先请求第一个候选项，若在等待时间内没有结果或已失败，再同时请求下一个，
+    返回最先得到的有效结果，其余请求在后台结束
+    :param candidates: 按优先级从高到低排列的候选项
+    :param resolve: 解析函数 candidate -> result，返回None表示没有结果
+    :param hedge_delay: 等待时间（秒），或函数 candidate -> 等待时间
+    :param timeout: 总超时时间（秒），None表示等待所有候选项结束
+    :return: (候选项, 结果)，都没有结果时返回 (None, None)
+    """
+    remaining = list(candidates)
+    if not remaining:
+        return None, None
+
+    get_delay = hedge_delay if callable(hedge_delay) else (lambda candidate: hedge_delay)
+    deadline = time.time() + timeout if timeout else None
+
+    executor = ThreadPoolExecutor(max_workers=len(remaining))
+    pending = {}
+    try:
+        while remaining or pending:
+            wait_time = None
+            if remaining:
+                candidate = remaining.pop(0)
+                pending[executor.submit(resolve, candidate)] = candidate
+                wait_time = get_delay(candidate)
+
+            if deadline is not None:
+                left = deadline - time.time()
+                if left <= 0:
+                    print("对冲请求超时")
+                    break
+                wait_time = left if wait_time is None else min(wait_time, left)
+
+            done, _ = wait(list(pending), timeout=wait_time, return_when=FIRST_COMPLETED)
+            for future in done:
+                candidate = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"请求 {candidate} 出错: {e}")
+                    result = None
+                if result:
+                    return candidate, result
+        return None, None
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
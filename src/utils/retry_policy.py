@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+import requests
+
+
+class RetryBudget:
+    """
+    全局重试预算
+    每个请求存入 ratio 个令牌，每次重试消耗一个令牌，另外每秒固定补充少量令牌；
+    上游大面积故障时重试次数被限制在请求量的一定比例内，避免重试风暴
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, capacity=20):
+        """
+        :param ratio: 每个请求允许的重试比例
+        :param min_per_second: 每秒固定补充的令牌数，保证低流量时也能重试
+        :param capacity: 令牌上限
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        """按时间补充令牌（调用方需持有锁）"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.min_per_second)
+        self.updated = now
+
+    def record_request(self):
+        """记录一次请求"""
+        with self._lock:
+            self._refill(time.time())
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_spend(self):
+        """
+        申请一次重试
+        :return: 预算是否足够
+        """
+        with self._lock:
+            self._refill(time.time())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class RetryPolicy:
+    """
+    重试策略：指数退避 + 随机抖动，遵守服务器的 Retry-After，并受全局重试预算限制
+    只在一个层级（API的 _safe_request 和下载器的断点续传）使用，调用方不再叠加重试
+    """
+
+    # 可重试的HTTP状态码
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0,
+                 respect_retry_after=True, max_retry_after=30.0, budget=None):
+        """
+        :param max_attempts: 最大尝试次数（含第一次）
+        :param base_delay: 第一次重试前的最大等待时间（秒）
+        :param max_delay: 单次等待时间上限（秒）
+        :param respect_retry_after: 是否按 Retry-After 响应头等待
+        :param max_retry_after: Retry-After 超过该值时不再重试（秒）
+        :param budget: 重试预算，默认创建独立的预算
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.budget = budget or RetryBudget()
+
+    def record_request(self):
+        """每次发送请求（包括重试）前调用"""
+        self.budget.record_request()
+
+    def is_retryable(self, error):
+        """判断错误是否值得重试"""
+        if isinstance(error, requests.exceptions.HTTPError):
+            response = error.response
+            return response is not None and response.status_code in self.RETRY_STATUS
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                              requests.exceptions.ChunkedEncodingError)):
+            return True
+        if isinstance(error, requests.exceptions.RequestException):
+            return False
+        # 下载不完整等传输错误
+        return isinstance(error, IOError)
+
+    def next_delay(self, attempt, error, max_attempts=None):
+        """
+        计算下一次重试前的等待时间
+        :param attempt: 已完成的尝试次数（从1开始）
+        :param error: 本次尝试的错误
+        :param max_attempts: 覆盖默认的最大尝试次数
+        :return: 等待秒数，不应重试时返回None
+        """
+        max_attempts = max_attempts or self.max_attempts
+        if attempt >= max_attempts or not self.is_retryable(error):
+            return None
+
+        delay = self.backoff(attempt)
+
+        response = getattr(error, 'response', None)
+        if self.respect_retry_after and response is not None:
+            retry_after = self.parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    print(f"服务器要求等待 {retry_after:.0f} 秒，不再重试")
+                    return None
+                delay = max(delay, retry_after)
+
+        if not self.budget.try_spend():
+            print("重试预算已用尽，不再重试")
+            return None
+        return delay
+
+    def backoff(self, attempt):
+        """
+        指数退避加完全随机抖动：在 [0, min(上限, 基础时间 × 2^(attempt-1))] 中随机取值，
+        避免大量客户端在同一时刻重试
+        :param attempt: 已完成的尝试次数（从1开始）
+        :return: 等待秒数
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    @staticmethod
+    def parse_retry_after(value):
+        """
+        解析 Retry-After 响应头
+        :param value: 秒数或HTTP日期
+        :return: 等待秒数，无法解析返回None
+        """
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
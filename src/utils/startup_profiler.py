@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+
+
+class StartupProfiler:
+    """
+    启动耗时统计
+    记录从程序开始运行到窗口可以响应操作（第一次进入事件循环）各阶段的耗时
+    """
+
+    # 设置该环境变量时，把统计结果写入指定的JSON文件，并在窗口可交互后立即退出（用于启动基准测试）
+    OUTPUT_ENV = 'MUSIC_DOWNLOADER_STARTUP_PROFILE'
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self._last = self.start_time
+        # [(阶段名称, 耗时秒数), ...]
+        self.phases = []
+        self.time_to_interactive = None
+
+    def mark(self, name):
+        """
+        记录一个阶段结束，阶段耗时为距上一次记录的时间
+        :param name: 阶段名称
+        """
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def finish(self):
+        """
+        窗口已可交互：记录可交互耗时并输出报告
+        :return: 是否应立即退出（基准测试模式）
+        """
+        if self.time_to_interactive is not None:
+            return False
+        self.mark('进入事件循环')
+        self.time_to_interactive = self._last - self.start_time
+        self.report()
+
+        output = os.environ.get(self.OUTPUT_ENV)
+        if not output:
+            return False
+        try:
+            with open(output, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'time_to_interactive': self.time_to_interactive,
+                    'phases': [{'name': name, 'seconds': seconds} for name, seconds in self.phases],
+                }, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"写入启动耗时统计失败: {e}")
+        return True
+
+    def report(self):
+        """打印各阶段耗时"""
+        print("====== 启动耗时 ======")
+        for name, seconds in self.phases:
+            print(f"{name}: {seconds * 1000:.1f} ms")
+        print(f"可交互耗时: {self.time_to_interactive * 1000:.1f} ms")
+
+
+# 进程内共享的启动耗时统计，需在导入PyQt5等较慢的模块之前导入
+startup_profiler = StartupProfiler()
@@ -127,6 +127,27 @@ class Tools:
                 os.makedirs(fallback_path)
             return fallback_path
     
+    @staticmethod
+    def get_app_data_dir():
+        """
+        获取应用数据目录，用于保存缓存等数据
+        :return: 应用数据目录路径
+        """
+        if platform.system() == 'Windows' and os.environ.get('APPDATA'):
+            data_dir = os.path.join(os.environ['APPDATA'], 'MusicDownloader')
+        else:
+            data_dir = os.path.join(os.path.expanduser("~"), '.music_downloader')
+        
+        try:
+            if not os.path.exists(data_dir):
+                os.makedirs(data_dir)
+        except Exception as e:
+            print(f"创建应用数据目录失败: {e}")
+            data_dir = os.path.join(os.getcwd(), '.music_downloader')
+            os.makedirs(data_dir, exist_ok=True)
+        
+        return data_dir
+    
     @staticmethod
     def generate_filename(song_info):
         """
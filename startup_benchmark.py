@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+启动耗时基准测试
+每次在新的进程中冷启动程序（使用临时的用户目录，不读取已有的缓存和任务日志），
+窗口可交互后立即退出，统计可交互耗时的中位数，超出预算时返回非零退出码
+
+用法:
+    python startup_benchmark.py [--runs 5] [--budget 0.5] [--show]
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+from src.utils.startup_profiler import StartupProfiler
+
+# 默认的可交互耗时预算（秒）
+DEFAULT_BUDGET = 0.5
+
+
+def run_once(show=False, timeout=60):
+    """
+    冷启动一次程序
+    :param show: 是否在真实的显示设备上显示窗口，默认使用offscreen平台
+    :param timeout: 超时时间（秒）
+    :return: 启动耗时统计字典，启动失败返回None
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    temp_dir = tempfile.mkdtemp(prefix='startup_benchmark_')
+    output = os.path.join(temp_dir, 'profile.json')
+
+    env = dict(os.environ)
+    env['HOME'] = temp_dir
+    env['APPDATA'] = temp_dir
+    env[StartupProfiler.OUTPUT_ENV] = output
+    if not show:
+        env['QT_QPA_PLATFORM'] = 'offscreen'
+
+    try:
+        subprocess.run([sys.executable, os.path.join(root, 'main.py')], cwd=temp_dir, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+        with open(output, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError, subprocess.TimeoutExpired) as e:
+        print(f"启动失败: {e}")
+        return None
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动耗时基准测试')
+    parser.add_argument('--runs', type=int, default=5, help='冷启动次数')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help=f'可交互耗时预算，秒 (默认: {DEFAULT_BUDGET})')
+    parser.add_argument('--show', action='store_true', help='在真实的显示设备上显示窗口')
+    args = parser.parse_args()
+
+    results = []
+    for i in range(args.runs):
+        result = run_once(args.show)
+        if result is None:
+            return 2
+        results.append(result)
+        print(f"第{i+1}次: {result['time_to_interactive'] * 1000:.1f} ms")
+
+    # 各阶段耗时的中位数
+    print("\n各阶段耗时（中位数）:")
+    for index, phase in enumerate(results[0]['phases']):
+        seconds = statistics.median(result['phases'][index]['seconds'] for result in results)
+        print(f"  {phase['name']}: {seconds * 1000:.1f} ms")
+
+    median = statistics.median(result['time_to_interactive'] for result in results)
+    print(f"\n可交互耗时中位数: {median * 1000:.1f} ms，预算: {args.budget * 1000:.0f} ms")
+    if median > args.budget:
+        print("超出启动耗时预算")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
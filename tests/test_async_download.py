@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+
+from src.api.async_api import AsyncMusicAPI, AsyncNeteaseAPI
+from src.utils.downloader import Downloader
+
+
+class NullVerifier:
+    """不校验内容的音频校验器"""
+
+    def prime(self, path, size):
+        pass
+
+    def set_total_size(self, total_size):
+        pass
+
+    def update(self, position, data):
+        pass
+
+    def finish(self, size):
+        pass
+
+
+CONTENT = bytes(range(256)) * 400
+
+
+async def handle(request):
+    """总是从第2000字节返回206，模拟与断点不一致的续传响应"""
+    if 'Range' not in request.headers:
+        return web.Response(body=CONTENT)
+    body = CONTENT[2000:]
+    return web.Response(status=206, body=body, headers={
+        'Content-Range': f"bytes 2000-{len(CONTENT) - 1}/{len(CONTENT)}",
+    })
+
+
+async def download(save_path):
+    app = web.Application()
+    app.router.add_get('/a.mp3', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    api = AsyncNeteaseAPI()
+    try:
+        return await api._download_once(f'http://127.0.0.1:{port}/a.mp3', save_path, None, 5, None, None,
+                                        NullVerifier())
+    finally:
+        await api.close()
+        await AsyncMusicAPI.close_connector()
+        await runner.cleanup()
+
+
+def test_mismatched_content_range_restarts(tmp_path):
+    save_path = str(tmp_path / 'song.mp3')
+    with open(Downloader.get_part_path(save_path), 'wb') as f:
+        f.write(CONTENT[:1000])
+    Downloader.save_meta(save_path, 'http://127.0.0.1/a.mp3', None, len(CONTENT))
+
+    size = asyncio.run(download(save_path))
+
+    assert size == len(CONTENT)
+    with open(save_path, 'rb') as f:
+        assert f.read() == CONTENT
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import struct
+
+import pytest
+
+from src.utils.audio_verifier import AudioVerifier, InvalidAudio
+
+# MPEG1 Layer III, 128kbps, 44100Hz, 立体声
+FRAME_HEADER = b'\xff\xfb\x90\x00'
+FRAME_LENGTH = 417
+FRAME_DURATION = 1152 / 44100
+
+
+def make_mp3(seconds, xing=False):
+    """生成指定时长的固定码率MP3数据，xing为True时第一帧包含Xing头"""
+    frames = int(seconds / FRAME_DURATION)
+    frame = FRAME_HEADER + bytes(FRAME_LENGTH - 4)
+    if not xing:
+        return frame * frames
+    first = FRAME_HEADER + bytes(32) + b'Xing' + struct.pack('>III', 0x03, frames, frames * FRAME_LENGTH)
+    first += bytes(FRAME_LENGTH - len(first))
+    return first + frame * (frames - 1)
+
+
+def feed(verifier, data, chunk_size=4096):
+    """按块写入数据并完成检查"""
+    verifier.set_total_size(len(data))
+    for i in range(0, len(data), chunk_size):
+        verifier.update(i, data[i:i + chunk_size])
+    verifier.finish(len(data))
+
+
+def test_html_is_rejected_early():
+    verifier = AudioVerifier()
+    with pytest.raises(InvalidAudio):
+        verifier.update(0, b'  <!DOCTYPE html><html><body>404</body></html>')
+
+
+def test_mp3_frame_header_parsed():
+    verifier = AudioVerifier(expected_duration=200)
+    feed(verifier, make_mp3(200))
+
+    assert verifier.format == 'mp3'
+    assert verifier.bitrate == 128
+
+
+def test_id3_tag_skipped():
+    tag = b'ID3\x04\x00\x00' + bytes([0, 0, 0, 100]) + bytes(100)
+    verifier = AudioVerifier()
+    feed(verifier, tag + make_mp3(10))
+
+    assert verifier.format == 'mp3'
+    assert verifier.audio_offset == 110
+
+
+def test_preview_clip_rejected():
+    """30秒的试听片段与200秒的歌曲时长不符"""
+    with pytest.raises(InvalidAudio):
+        feed(AudioVerifier(expected_duration=200), make_mp3(30))
+
+
+def test_xing_duration():
+    verifier = AudioVerifier(expected_duration=120)
+    feed(verifier, make_mp3(120, xing=True))
+
+    assert verifier.duration == pytest.approx(120, abs=1)
+
+
+def test_truncated_vbr_file_detected(tmp_path):
+    """Xing头记录的字节数大于实际大小时判定为截断"""
+    data = make_mp3(120, xing=True)
+    path = tmp_path / 'song.mp3'
+    path.write_bytes(data[:len(data) // 2])
+
+    assert AudioVerifier.verify_file(str(path)) is not None
+    path.write_bytes(data)
+    assert AudioVerifier.verify_file(str(path)) is None
+
+
+def test_unknown_format_rejected(tmp_path):
+    path = tmp_path / 'song.mp3'
+    path.write_bytes(bytes(range(1, 128)) * 100)
+
+    assert AudioVerifier.verify_file(str(path)) is not None
+
+
+def test_check_size():
+    # 200秒 320kbps 约8MB
+    assert AudioVerifier.check_size(8000000, 200, 320000) is None
+    assert AudioVerifier.check_size(1000000, 200, 320000) is not None
+    assert AudioVerifier.check_size(40000000, 200, 320000) is not None
+    assert AudioVerifier.check_size(None, 200, 320000) is None
+    assert AudioVerifier.check_size(1000000, None, 320000) is None
+
+
+def test_check_size_unknown_bitrate():
+    """比特率未知时只按最低比特率检查是否过小"""
+    assert AudioVerifier.check_size(1200000, 240, None) is not None
+    assert AudioVerifier.check_size(40000000, 240, None) is None
+
+
+def test_check_link():
+    # 60秒128kbps的短歌曲不足1MB，仍然有效
+    assert AudioVerifier.check_link(960000, 'audio/mpeg', 60, 128000) is None
+    # 240秒歌曲的30秒320kbps试听片段超过1MB，仍然识别为试听
+    assert AudioVerifier.check_link(1200000, 'audio/mpeg', 240, 320000) is not None
+    assert AudioVerifier.check_link(1200000, 'audio/mpeg', 240) is not None
+    assert AudioVerifier.check_link(1200000, 'audio/mpeg') is None
+    assert AudioVerifier.check_link(50000, 'text/html; charset=utf-8') is not None
+    assert AudioVerifier.check_link(0, 'audio/mpeg') is not None
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import threading
+
+from src.utils.download_scheduler import DownloadScheduler
+
+
+class FakeAPI:
+    """按歌曲ID选择下载主机，记录每个主机同时传输的任务数"""
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.active = {}
+        self.peak = {}
+        self.peak_total = 0
+        self._lock = threading.Lock()
+
+    def download(self, song_id, save_path, progress_callback=None, duration=None, is_cancelled=None,
+                 host_slot=None):
+        host = self.hosts[int(song_id) % len(self.hosts)]
+        # 解析链接不占用主机名额
+        time.sleep(0.01)
+        with host_slot(f'http://{host}/{song_id}.mp3'):
+            with self._lock:
+                self.active[host] = self.active.get(host, 0) + 1
+                self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+                self.peak_total = max(self.peak_total, sum(self.active.values()))
+            time.sleep(0.05)
+            with self._lock:
+                self.active[host] -= 1
+        return save_path
+
+
+def run(api, count, max_workers, max_per_host):
+    scheduler = DownloadScheduler(max_workers=max_workers, max_per_host=max_per_host)
+    for i in range(count):
+        scheduler.add_job(api, str(i), f'/tmp/{i}.mp3', priority=i)
+    scheduler.start()
+    assert scheduler.wait(timeout=30)
+    return scheduler
+
+
+def test_single_host_limited():
+    api = FakeAPI(['m701.music.126.net'])
+    scheduler = run(api, 10, max_workers=6, max_per_host=2)
+
+    assert scheduler.finished_count == 10
+    assert api.peak['m701.music.126.net'] == 2
+
+
+def test_hosts_limited_independently():
+    api = FakeAPI(['m701.music.126.net', 'm801.music.126.net'])
+    scheduler = run(api, 12, max_workers=6, max_per_host=2)
+
+    assert scheduler.finished_count == 12
+    assert max(api.peak.values()) <= 2
+    assert api.peak_total == 4
+    assert not scheduler.host_slots.get_active('m701.music.126.net')
+
+
+def test_cancel_while_waiting_for_slot():
+    api = FakeAPI(['m701.music.126.net'])
+    scheduler = DownloadScheduler(max_workers=4, max_per_host=1)
+    for i in range(4):
+        scheduler.add_job(api, str(i), f'/tmp/{i}.mp3', priority=i)
+    scheduler.start()
+    time.sleep(0.03)
+    scheduler.cancel()
+
+    assert scheduler.wait(timeout=5)
+    assert scheduler.finished_count < 4
+    # 取消的任务不计入失败
+    assert scheduler.failed_count == 0
+    assert scheduler.finished_count + scheduler.cancelled_count == 4
+    assert scheduler.get_progress() == 100
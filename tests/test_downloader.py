@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+from src.utils.downloader import Downloader
+from src.utils.content_hash import ContentHasher
+
+
+class FakeResponse:
+    """模拟requests的流式响应"""
+
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.headers.setdefault('Content-Length', str(len(body)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise IOError(f"HTTP {self.status_code}")
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """
+    模拟支持Range请求的服务器
+    :param content: 文件内容
+    :param etag: 响应的ETag
+    :param range_start: 指定时忽略请求的范围，总是从该位置返回206
+    """
+
+    def __init__(self, content, etag='"v1"', accept_ranges=True, range_start=None):
+        self.content = content
+        self.etag = etag
+        self.accept_ranges = accept_ranges
+        self.range_start = range_start
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        headers = dict(headers or {})
+        self.requests.append(headers)
+        base_headers = {'ETag': self.etag} if self.etag else {}
+        if self.accept_ranges:
+            base_headers['Accept-Ranges'] = 'bytes'
+
+        range_header = headers.get('Range')
+        if not range_header:
+            return FakeResponse(200, self.content, base_headers)
+
+        start, _, end = range_header.split('=', 1)[1].partition('-')
+        start = int(start) if self.range_start is None else self.range_start
+        end = int(end) if end else len(self.content) - 1
+        body = self.content[start:end + 1]
+        base_headers['Content-Range'] = f"bytes {start}-{start + len(body) - 1}/{len(self.content)}"
+        return FakeResponse(206, body, base_headers)
+
+
+def make_partial(save_path, content, offset, url='http://example.com/a.mp3', etag='"v1"'):
+    """写入模拟上次中断留下的临时文件"""
+    with open(Downloader.get_part_path(save_path), 'wb') as f:
+        f.write(content[:offset])
+    Downloader.save_meta(save_path, url, etag, len(content))
+
+
+@pytest.fixture
+def content():
+    return bytes(range(256)) * 400
+
+
+@pytest.fixture
+def save_path(tmp_path):
+    return str(tmp_path / 'song.mp3')
+
+
+def test_fresh_download(content, save_path):
+    session = FakeSession(content)
+    size = Downloader(session, max_segments=1).download('http://example.com/a.mp3', save_path)
+
+    assert size == len(content)
+    with open(save_path, 'rb') as f:
+        assert f.read() == content
+    assert not os.path.exists(Downloader.get_part_path(save_path))
+    assert not os.path.exists(Downloader.get_meta_path(save_path))
+
+
+def test_resume_from_offset(content, save_path):
+    make_partial(save_path, content, 1000)
+    session = FakeSession(content)
+    Downloader(session, max_segments=1).download('http://example.com/a.mp3', save_path)
+
+    assert session.requests[0]['Range'] == 'bytes=1000-'
+    with open(save_path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_mismatched_content_range_restarts(content, save_path):
+    """206的Content-Range起点与断点不一致时，不能把尾部当作完整文件"""
+    make_partial(save_path, content, 1000)
+    session = FakeSession(content, range_start=2000)
+    size = Downloader(session, max_segments=1).download('http://example.com/a.mp3', save_path)
+
+    assert size == len(content)
+    assert len(session.requests) == 2
+    assert 'Range' not in session.requests[1]
+    with open(save_path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_changed_url_without_etag_restarts(content, save_path):
+    """链接已重新解析且没有ETag时无法确认是同一文件，重新下载"""
+    make_partial(save_path, content, 1000, url='http://example.com/old.mp3', etag=None)
+    session = FakeSession(content, etag=None)
+    Downloader(session, max_segments=1).download('http://example.com/new.mp3', save_path)
+
+    assert 'Range' not in session.requests[-1]
+    with open(save_path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_check_response():
+    meta = {'url': 'u', 'etag': '"v1"', 'length': 100, 'offset': 10}
+    resumable = {'Content-Range': 'bytes 10-99/100', 'ETag': '"v1"'}
+    mismatched = {'Content-Range': 'bytes 20-99/100', 'ETag': '"v1"'}
+
+    assert Downloader.check_response(meta, 'u', 206, resumable) == Downloader.RESUME
+    assert Downloader.check_response(meta, 'u', 206, mismatched) == Downloader.RESTART
+    assert Downloader.check_response(meta, 'u', 200, {}) == Downloader.FRESH
+    assert Downloader.check_response(None, 'u', 200, {}) == Downloader.FRESH
+    with pytest.raises(IOError):
+        Downloader.check_response(None, 'u', 206, resumable)
+
+
+def test_segmented_download_reassembles(tmp_path):
+    content = os.urandom(3 * ContentHasher.BLOCK_SIZE + 12345)
+    save_path = str(tmp_path / 'big.mp3')
+    session = FakeSession(content)
+    downloader = Downloader(session, chunk_size=64 * 1024, max_segments=4)
+    size = downloader.download('http://example.com/a.mp3', save_path)
+
+    assert size == len(content)
+    assert any('Range' in headers for headers in session.requests)
+    with open(save_path, 'rb') as f:
+        assert f.read() == content
+    assert downloader.content_hash == ContentHasher.file_hash(save_path)
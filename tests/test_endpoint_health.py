@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from src.api.endpoint_health import CircuitBreaker, EndpointHealth
+from src.api.gdmusic_api import GDMusicAPI
+
+
+def trip(health, name):
+    """让熔断器断开后立即进入半开状态"""
+    for _ in range(CircuitBreaker.CONSECUTIVE_FAILURES):
+        health.allow_request(name)
+        health.record_failure(name, 'timeout')
+    breaker = health._get(name).breaker
+    breaker._opened_at -= breaker._open_duration
+
+
+def test_half_open_allows_single_probe():
+    health = EndpointHealth()
+    trip(health, 'a')
+
+    assert health.allow_request('a')
+    assert not health.allow_request('a')
+    health.record_success('a', 0.1)
+    assert health.get_stats()['a']['state'] == CircuitBreaker.CLOSED
+
+
+def test_release_returns_unused_probe():
+    health = EndpointHealth()
+    trip(health, 'a')
+
+    assert health.allow_request('a')
+    health.release('a')
+    assert health.allow_request('a')
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = GDMusicAPI()
+    health = EndpointHealth()
+    monkeypatch.setattr(api, 'endpoint_health', health)
+    monkeypatch.setattr(api, 'url_cache', type(api.url_cache)())
+    return api
+
+
+def test_unexpected_error_reports_probe_failure(api, monkeypatch):
+    """解析时的非网络错误也要报告结果，否则熔断器一直停在半开状态"""
+    endpoint = api.get_endpoint_name()
+    trip(api.endpoint_health, endpoint)
+
+    def broken_request(*args, **kwargs):
+        raise ValueError("unexpected")
+
+    monkeypatch.setattr(api, '_safe_request', broken_request)
+    assert api._resolve_url('netease', '1', 320).url is None
+    assert api.endpoint_health.get_stats()[endpoint]['state'] == CircuitBreaker.OPEN
+
+
+def test_get_song_url_releases_probe_on_cache_hit(api, monkeypatch):
+    endpoint = api.get_endpoint_name()
+    trip(api.endpoint_health, endpoint)
+    for br in (320, 192, 128):
+        api.url_cache.put('gd:netease', '1', br * 1000, None)
+    monkeypatch.setattr(api, '_fallback_get_song_url', lambda *args: None)
+
+    assert api.get_song_url('netease:1') is None
+    assert api.endpoint_health.allow_request(endpoint)
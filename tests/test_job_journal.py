@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from src.utils.job_journal import JobJournal
+from src.utils.download_scheduler import DownloadScheduler
+from src.utils.downloader import DownloadCancelled
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return JobJournal(db_path=str(tmp_path / 'jobs.db'))
+
+
+def make_jobs(tmp_path, count):
+    return [({'name': f'歌曲{i}'}, str(i), str(tmp_path / f'{i}.mp3')) for i in range(count)]
+
+
+def test_create_and_load_batch(journal, tmp_path):
+    jobs = make_jobs(tmp_path, 3)
+    batch_id, job_ids = journal.create_batch('网易云音乐', jobs)
+
+    assert len(job_ids) == 3
+    platform, loaded = journal.load_batch(batch_id)
+    assert platform == '网易云音乐'
+    assert [job['song_id'] for job in loaded] == ['0', '1', '2']
+    assert loaded[0]['song'] == {'name': '歌曲0'}
+    assert all(job['state'] == JobJournal.QUEUED for job in loaded)
+
+
+def test_state_transitions(journal, tmp_path):
+    batch_id, job_ids = journal.create_batch('网易云音乐', make_jobs(tmp_path, 2))
+
+    journal.update(job_ids[0], JobJournal.RESOLVING)
+    journal.update(job_ids[0], JobJournal.DOWNLOADING)
+    journal.update(job_ids[0], JobJournal.DONE, result_path='/music/0.mp3')
+    journal.update(job_ids[1], JobJournal.FAILED, error='下载失败')
+
+    _, loaded = journal.load_batch(batch_id)
+    assert loaded[0]['state'] == JobJournal.DONE
+    assert loaded[0]['result_path'] == '/music/0.mp3'
+    assert loaded[1]['state'] == JobJournal.FAILED
+    assert loaded[1]['error'] == '下载失败'
+    # 没有未完成的任务
+    assert journal.get_pending_batch() is None
+
+    journal.update(job_ids[1], JobJournal.QUEUED)
+    assert journal.get_pending_batch() == batch_id
+
+
+def test_pending_survives_reopen(journal, tmp_path):
+    batch_id, job_ids = journal.create_batch('GD音乐台', make_jobs(tmp_path, 2))
+    journal.update(job_ids[0], JobJournal.DOWNLOADING)
+
+    reopened = JobJournal(db_path=journal.db_path)
+    assert reopened.get_pending_batch() == batch_id
+
+
+def test_remove_batch(journal, tmp_path):
+    first, _ = journal.create_batch('网易云音乐', make_jobs(tmp_path, 1))
+    second, _ = journal.create_batch('网易云音乐', make_jobs(tmp_path, 1))
+
+    assert journal.get_pending_batch() == second
+    journal.remove_batch(second)
+    assert journal.get_pending_batch() == first
+    assert journal.load_batch(second) == (None, [])
+
+    journal.remove_pending()
+    assert journal.get_pending_batch() is None
+
+
+class FakeAPI:
+    """第0首下载成功，第1首失败，其余等待取消"""
+
+    def __init__(self, scheduler_ref):
+        self.scheduler_ref = scheduler_ref
+
+    def download(self, song_id, save_path, progress_callback=None, duration=None, is_cancelled=None,
+                 host_slot=None):
+        progress_callback(1, 2)
+        if song_id == '0':
+            return save_path
+        if song_id == '1':
+            return None
+        self.scheduler_ref[0].cancel()
+        if is_cancelled():
+            raise DownloadCancelled()
+        return save_path
+
+
+def test_scheduler_records_states(journal, tmp_path):
+    jobs = make_jobs(tmp_path, 3)
+    batch_id, job_ids = journal.create_batch('网易云音乐', jobs)
+    scheduler_ref = []
+    failed = []
+    scheduler = DownloadScheduler(max_workers=1, journal=journal, on_job_failed=failed.append)
+    scheduler_ref.append(scheduler)
+    api = FakeAPI(scheduler_ref)
+    for priority, ((song, song_id, save_path), job_id) in enumerate(zip(jobs, job_ids)):
+        scheduler.add_job(api, song_id, save_path, priority=priority, song=song, journal_id=job_id)
+    scheduler.start()
+    scheduler.close()
+    scheduler.wait()
+
+    states = [job['state'] for job in journal.load_batch(batch_id)[1]]
+    # 被取消的任务保持排队状态，下次启动时继续
+    assert states == [JobJournal.DONE, JobJournal.FAILED, JobJournal.QUEUED]
+    assert [job.song_id for job in failed] == ['1']
+    assert (scheduler.failed_count, scheduler.cancelled_count) == (1, 1)
+    assert journal.get_pending_batch() == batch_id
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from src.utils.library_index import LibraryIndex
+
+
+@pytest.fixture
+def library(tmp_path):
+    return LibraryIndex(db_path=str(tmp_path / 'library.db'))
+
+
+SONG = {'name': '晴天', 'singer': '周杰伦'}
+
+
+def add_file(library, tmp_path, filename, song_id=None):
+    path = tmp_path / filename
+    path.write_bytes(b'audio')
+    library.add(str(path), song_id, SONG)
+    return str(path)
+
+
+def test_lookup_by_song_id(library, tmp_path):
+    path = add_file(library, tmp_path, 'a.mp3', '186016|320000')
+
+    assert library.lookup('186016|320000') == path
+    assert library.lookup('186016|128000') == path
+    assert library.lookup('186016') == path
+
+
+def test_lower_quality_not_reused(library, tmp_path):
+    """已有的128k文件不能代替请求的无损下载"""
+    add_file(library, tmp_path, 'a.mp3', 'kuwo:123|128000')
+
+    assert library.lookup('netease:186016|999000', song=SONG) is None
+    assert library.lookup('kuwo:123|320000') is None
+
+
+def test_name_fallback_requires_same_or_better_quality(library, tmp_path):
+    path = add_file(library, tmp_path, 'a.flac', 'kuwo:123|999000')
+
+    assert library.lookup('netease:186016|320000', song=SONG) == path
+    assert library.lookup('netease:186016', song=SONG) == path
+
+
+def test_name_fallback_skips_unknown_quality(library, tmp_path):
+    path = tmp_path / '晴天 - 周杰伦.mp3'
+    path.write_bytes(b'audio')
+    library.scan(str(tmp_path))
+
+    assert library.lookup('186016|320000', song=SONG) is None
+    assert library.lookup('186016', song=SONG) == str(path)
+    # 计划的保存路径上已有文件
+    assert library.lookup('186016|320000', save_path=str(path)) == str(path)
+
+
+def test_missing_file_removed(library, tmp_path):
+    path = add_file(library, tmp_path, 'a.mp3', '186016|320000')
+    (tmp_path / 'a.mp3').unlink()
+
+    assert library.lookup('186016|320000') is None
+    assert library.lookup('186016', save_path=path) is None
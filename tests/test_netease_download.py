@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from src.api.netease_api import NeteaseAPI
+from src.utils.downloader import Downloader
+
+
+def test_failed_download_keeps_existing_files(tmp_path, monkeypatch):
+    """下载出错时不删除保存路径上已有的完整文件，.part文件保留用于续传"""
+    save_path = tmp_path / 'song.mp3'
+    save_path.write_bytes(b'existing')
+    part_path = Downloader.get_part_path(str(save_path))
+    with open(part_path, 'wb') as f:
+        f.write(b'partial')
+
+    api = NeteaseAPI()
+
+    def broken_download(*args, **kwargs):
+        raise IOError("connection reset")
+
+    monkeypatch.setattr(api, '_resolve_song_url', lambda *args: None)
+    monkeypatch.setattr(api, '_get_alt_song_url', lambda *args: 'http://m701.music.126.net/test/a.mp3')
+    monkeypatch.setattr(api, '_download_file', broken_download)
+
+    assert api.download('1', str(save_path)) is None
+    assert save_path.read_bytes() == b'existing'
+    with open(part_path, 'rb') as f:
+        assert f.read() == b'partial'
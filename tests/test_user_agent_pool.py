@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import requests
+
+from src.api.rate_limiter import RateLimiter
+from src.api.transport import Transport
+from src.api.user_agent_pool import UserAgentPool
+
+
+class RecordingAdapter(requests.adapters.BaseAdapter):
+    """记录请求头并返回空响应的适配器"""
+
+    def __init__(self):
+        super().__init__()
+        self.user_agents = []
+
+    def send(self, request, **kwargs):
+        self.user_agents.append(request.headers.get('User-Agent'))
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response._content = b''
+        return response
+
+    def close(self):
+        pass
+
+
+def make_session(pool):
+    session = Transport(RateLimiter(), pool).create_session({'Referer': 'https://music.163.com/'})
+    adapter = RecordingAdapter()
+    session.mount('http://', adapter)
+    return session, adapter
+
+
+def test_sticky_host_keeps_user_agent(tmp_path):
+    pool = UserAgentPool(str(tmp_path / 'missing.txt'))
+    session, adapter = make_session(pool)
+    for _ in range(3):
+        session.get('http://music.163.com/api', headers={'Accept': '*/*'})
+
+    assert len(set(adapter.user_agents)) == 1
+    assert adapter.user_agents[0] in UserAgentPool.FALLBACK_USER_AGENTS
+
+
+def test_rotating_host_uses_pool(tmp_path):
+    pool = UserAgentPool(str(tmp_path / 'missing.txt'))
+    session, adapter = make_session(pool)
+    for _ in range(len(UserAgentPool.FALLBACK_USER_AGENTS)):
+        session.head('http://m701.music.126.net/a.mp3')
+        session.get('http://m701.music.126.net/a.mp3', headers={'Referer': 'https://music.163.com/'})
+
+    assert set(adapter.user_agents) == set(UserAgentPool.FALLBACK_USER_AGENTS)
+
+
+def test_rotate_changes_sticky_user_agent(tmp_path):
+    pool = UserAgentPool(str(tmp_path / 'missing.txt'))
+    first = pool.get('music.163.com')
+    pool.rotate('music.163.com')
+
+    assert pool.get('music.163.com') != first
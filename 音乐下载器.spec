@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('D:\\Program Files\\Python\\Python313\\Lib\\site-packages\\fake_useragent\\data', 'fake_useragent\\data'), ('D:\\Program Files\\Python\\Python313\\Lib\\site-packages\\PyQt5\\Qt5\\plugins\\platforms', 'PyQt5\\Qt5\\plugins\\platforms'), ('D:\\Program Files\\Python\\Python313\\Lib\\site-packages\\PyQt5\\Qt5\\bin', 'PyQt5\\Qt5\\bin')],
+    datas=[('src\\api\\user_agents.txt', 'src\\api'), ('D:\\Program Files\\Python\\Python313\\Lib\\site-packages\\PyQt5\\Qt5\\plugins\\platforms', 'PyQt5\\Qt5\\plugins\\platforms'), ('D:\\Program Files\\Python\\Python313\\Lib\\site-packages\\PyQt5\\Qt5\\bin', 'PyQt5\\Qt5\\bin')],
     hiddenimports=['PyQt5.sip', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PyQt5.QtWidgets', 'requests', 'bs4', 'lxml', 'Crypto'],
     hookspath=[],
     hooksconfig={},